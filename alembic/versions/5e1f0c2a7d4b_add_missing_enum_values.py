@@ -0,0 +1,48 @@
+depends_on = None
+"""Add missing enum values for occupancy, loan purpose and guideline category
+
+The earlier "update enum values" revisions were generated empty, so a freshly
+migrated database rejects INVESTOR, SECOND_LIEN and the newer guideline
+categories that db/models.py and db/data.json use.
+
+Revision ID: 5e1f0c2a7d4b
+Revises: 2ff9739e891b
+Create Date: 2026-10-18 20:40:12.118532
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e1f0c2a7d4b'
+down_revision: Union[str, Sequence[str], None] = '2ff9739e891b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+NEW_VALUES = {
+    'occupancytype': ['INVESTOR'],
+    'loanpurposetype': ['SECOND_LIEN'],
+    'guidelinecategory': [
+        'STATE_SPECIFIC', 'ESCROWS', 'SECONDARY_FINANCING', 'BORROWER_ELIGIBILITY',
+        'NON_ARM_LENGTH', 'DELAYED_FINANCING', 'LEASE_PURCHASE', 'DU_RULES',
+        'ITIN_SPECIFICS', 'DSCR_HIGHLIGHTS', 'SECOND_LIEN_LIMITS', 'DSCR_MULTI_RULES',
+        'DSCR_RULES',
+    ],
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # IF NOT EXISTS keeps this safe on databases where the values were added by hand.
+    for enum_name, values in NEW_VALUES.items():
+        for value in values:
+            op.execute(f"ALTER TYPE {enum_name} ADD VALUE IF NOT EXISTS '{value}'")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # PostgreSQL cannot drop values from an enum type; leave them in place.
+    pass
@@ -0,0 +1,61 @@
+depends_on = None
+"""Add FICO/loan amount range columns and scenario indexes to matrix rules
+
+Adds stored generated int4range/numrange columns for the FICO and loan amount
+bounds with GiST indexes, so scenario searches can use range containment,
+plus a composite index on (occupancyType, loanPurpose).
+
+Revision ID: 8b2d4f6a1c3e
+Revises: 5e1f0c2a7d4b
+Create Date: 2026-10-18 21:02:37.410935
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b2d4f6a1c3e'
+down_revision: Union[str, Sequence[str], None] = '5e1f0c2a7d4b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # A missing lower bound (or an inverted pair) yields a NULL range so the
+    # rule never matches, as with the old "min <= x" predicates; a missing
+    # upper bound is unbounded.
+    op.add_column('eligibility_matrix_rule', sa.Column(
+        'ficoRange', postgresql.INT4RANGE(),
+        sa.Computed(
+            'CASE WHEN "minFicoScore" IS NULL OR "minFicoScore" > "maxFicoScore" THEN NULL '
+            'ELSE int4range("minFicoScore", "maxFicoScore", \'[]\') END',
+            persisted=True,
+        ),
+        nullable=True,
+    ))
+    op.add_column('eligibility_matrix_rule', sa.Column(
+        'loanAmountRange', postgresql.NUMRANGE(),
+        sa.Computed(
+            'CASE WHEN "minLoanAmount" IS NULL OR "minLoanAmount" > "maxLoanAmount" THEN NULL '
+            'ELSE numrange("minLoanAmount", "maxLoanAmount", \'[]\') END',
+            persisted=True,
+        ),
+        nullable=True,
+    ))
+    op.create_index('idx_matrix_fico_range', 'eligibility_matrix_rule', ['ficoRange'], unique=False, postgresql_using='gist')
+    op.create_index('idx_matrix_loan_amount_range', 'eligibility_matrix_rule', ['loanAmountRange'], unique=False, postgresql_using='gist')
+    op.create_index('idx_matrix_occupancy_purpose', 'eligibility_matrix_rule', ['occupancyType', 'loanPurpose'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_matrix_occupancy_purpose', table_name='eligibility_matrix_rule')
+    op.drop_index('idx_matrix_loan_amount_range', table_name='eligibility_matrix_rule', postgresql_using='gist')
+    op.drop_index('idx_matrix_fico_range', table_name='eligibility_matrix_rule', postgresql_using='gist')
+    op.drop_column('eligibility_matrix_rule', 'loanAmountRange')
+    op.drop_column('eligibility_matrix_rule', 'ficoRange')
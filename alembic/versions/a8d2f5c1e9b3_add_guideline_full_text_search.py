@@ -0,0 +1,38 @@
+"""Add full-text search over guideline content
+
+Adds a stored generated tsvector column (english configuration) on
+guideline.content with a GIN index, for ranked keyword search.
+
+Revision ID: a8d2f5c1e9b3
+Revises: f3b9d1e7a2c6
+Create Date: 2026-10-18 23:31:47.208519
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8d2f5c1e9b3'
+down_revision: Union[str, Sequence[str], None] = 'f3b9d1e7a2c6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('guideline', sa.Column(
+        'contentTsv', postgresql.TSVECTOR(),
+        sa.Computed("to_tsvector('english', content)", persisted=True),
+        nullable=True,
+    ))
+    op.create_index('idx_guideline_content_tsv', 'guideline', ['contentTsv'], unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_guideline_content_tsv', table_name='guideline', postgresql_using='gin')
+    op.drop_column('guideline', 'contentTsv')
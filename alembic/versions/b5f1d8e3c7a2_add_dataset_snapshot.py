@@ -0,0 +1,41 @@
+"""Add dataset_snapshot table
+
+Records each delta import of a catalog file: its hash, the catalog version it
+produced and the per-table insert/update/delete counts.
+
+Revision ID: b5f1d8e3c7a2
+Revises: e7b2c9d4a1f6
+Create Date: 2026-10-19 14:06:52.904417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5f1d8e3c7a2'
+down_revision: Union[str, Sequence[str], None] = 'e7b2c9d4a1f6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'dataset_snapshot',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('sourcePath', sa.String(), nullable=False),
+        sa.Column('sourceHash', sa.String(), nullable=False),
+        sa.Column('catalogVersion', sa.BigInteger(), nullable=False),
+        sa.Column('changes', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column('createdAt', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('dataset_snapshot')
@@ -0,0 +1,62 @@
+depends_on = None
+"""Add scenario_search materialized view
+
+Denormalizes each eligibility_matrix_rule with its lender and program names,
+indexed for the scenario predicates, so find_programs_by_scenario reads one
+relation instead of joining three. db/import_data.py refreshes it.
+
+Revision ID: b7e3a9c1d2f4
+Revises: 8b2d4f6a1c3e
+Create Date: 2026-10-18 21:48:10.552310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e3a9c1d2f4'
+down_revision: Union[str, Sequence[str], None] = '8b2d4f6a1c3e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("""
+        CREATE MATERIALIZED VIEW scenario_search AS
+        SELECT
+            r.id,
+            r."loanProgramId",
+            p."lenderId",
+            l.name AS "lenderName",
+            p.name AS "programName",
+            r."occupancyType",
+            r."loanPurpose",
+            r."ficoRange",
+            r."loanAmountRange",
+            r."minFicoScore",
+            r."maxFicoScore",
+            r."minLoanAmount",
+            r."maxLoanAmount",
+            r."dscrValue",
+            r."maxLtv",
+            r."reservesMonths",
+            r.notes
+        FROM eligibility_matrix_rule r
+        JOIN loan_program p ON p.id = r."loanProgramId"
+        JOIN lender l ON l.id = p."lenderId"
+        WITH DATA
+    """)
+    # The unique index is required for REFRESH ... CONCURRENTLY
+    op.create_index('uq_scenario_search_id', 'scenario_search', ['id'], unique=True)
+    op.create_index('idx_scenario_search_occupancy_purpose', 'scenario_search', ['occupancyType', 'loanPurpose'], unique=False)
+    op.create_index('idx_scenario_search_fico_range', 'scenario_search', ['ficoRange'], unique=False, postgresql_using='gist')
+    op.create_index('idx_scenario_search_loan_amount_range', 'scenario_search', ['loanAmountRange'], unique=False, postgresql_using='gist')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS scenario_search")
@@ -0,0 +1,44 @@
+"""Add guideline_digest table
+
+Stores a compact per-program (and per-category) digest of the guidelines,
+built by db/guideline_digest.py after imports and served by
+get_program_guidelines by default.
+
+Revision ID: c4e7a1b9d3f2
+Revises: a8d2f5c1e9b3
+Create Date: 2026-10-19 00:12:08.551734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e7a1b9d3f2'
+down_revision: Union[str, Sequence[str], None] = 'a8d2f5c1e9b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'guideline_digest',
+        sa.Column('loanProgramId', sa.String(), nullable=False),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('categories', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column('sourceHash', sa.String(), nullable=False),
+        sa.Column('guidelineCount', sa.Integer(), nullable=False),
+        sa.Column('sourceChars', sa.Integer(), nullable=False),
+        sa.Column('updatedAt', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['loanProgramId'], ['loan_program.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('loanProgramId'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('guideline_digest')
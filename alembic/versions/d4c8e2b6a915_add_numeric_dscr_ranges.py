@@ -0,0 +1,114 @@
+depends_on = None
+"""Add numeric DSCR bounds to matrix rules
+
+Parses the free-text dscrValue into numeric minDscr/maxDscr columns, adds a
+generated dscrRange (numrange) column with a GiST index for DSCR-aware
+scenario searches, and rebuilds scenario_search to carry it.
+
+dscrValue holds the minimum DSCR ("1.0"); ranges ("1.00-1.24"), ">=1.25",
+"1.25+" and "<1.0" are also understood. Anything else is left NULL.
+
+Revision ID: d4c8e2b6a915
+Revises: b7e3a9c1d2f4
+Create Date: 2026-10-18 22:15:44.908127
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4c8e2b6a915'
+down_revision: Union[str, Sequence[str], None] = 'b7e3a9c1d2f4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+NUMBER = r'\d+(?:\.\d+)?'
+
+SCENARIO_SEARCH_COLUMNS = """
+            r.id,
+            r."loanProgramId",
+            p."lenderId",
+            l.name AS "lenderName",
+            p.name AS "programName",
+            r."occupancyType",
+            r."loanPurpose",
+            r."ficoRange",
+            r."loanAmountRange",
+            r."minFicoScore",
+            r."maxFicoScore",
+            r."minLoanAmount",
+            r."maxLoanAmount",
+            r."dscrValue",
+            r."maxLtv",
+            r."reservesMonths",
+            r.notes"""
+
+
+def _create_scenario_search(extra_columns: str = "") -> None:
+    op.execute(f"""
+        CREATE MATERIALIZED VIEW scenario_search AS
+        SELECT{SCENARIO_SEARCH_COLUMNS}{extra_columns}
+        FROM eligibility_matrix_rule r
+        JOIN loan_program p ON p.id = r."loanProgramId"
+        JOIN lender l ON l.id = p."lenderId"
+        WITH DATA
+    """)
+    op.create_index('uq_scenario_search_id', 'scenario_search', ['id'], unique=True)
+    op.create_index('idx_scenario_search_occupancy_purpose', 'scenario_search', ['occupancyType', 'loanPurpose'], unique=False)
+    op.create_index('idx_scenario_search_fico_range', 'scenario_search', ['ficoRange'], unique=False, postgresql_using='gist')
+    op.create_index('idx_scenario_search_loan_amount_range', 'scenario_search', ['loanAmountRange'], unique=False, postgresql_using='gist')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('eligibility_matrix_rule', sa.Column('minDscr', sa.Numeric(), nullable=True))
+    op.add_column('eligibility_matrix_rule', sa.Column('maxDscr', sa.Numeric(), nullable=True))
+
+    # Backfill from the free-text column
+    op.execute(f"""
+        UPDATE eligibility_matrix_rule SET
+            "minDscr" = CASE
+                WHEN "dscrValue" ~ '^\\s*{NUMBER}\\s*-\\s*{NUMBER}\\s*$'
+                    THEN trim(split_part("dscrValue", '-', 1))::numeric
+                WHEN "dscrValue" ~ '^\\s*(>=?)?\\s*{NUMBER}\\s*\\+?\\s*$'
+                    THEN substring("dscrValue" from '{NUMBER}')::numeric
+            END,
+            "maxDscr" = CASE
+                WHEN "dscrValue" ~ '^\\s*{NUMBER}\\s*-\\s*{NUMBER}\\s*$'
+                    THEN trim(split_part("dscrValue", '-', 2))::numeric
+                WHEN "dscrValue" ~ '^\\s*<=?\\s*{NUMBER}\\s*$'
+                    THEN substring("dscrValue" from '{NUMBER}')::numeric
+            END
+        WHERE "dscrValue" IS NOT NULL
+    """)
+
+    # Rules without DSCR bounds don't constrain DSCR, so their range is unbounded
+    op.add_column('eligibility_matrix_rule', sa.Column(
+        'dscrRange', postgresql.NUMRANGE(),
+        sa.Computed(
+            'CASE WHEN "minDscr" > "maxDscr" THEN NULL '
+            'ELSE numrange("minDscr", "maxDscr", \'[]\') END',
+            persisted=True,
+        ),
+        nullable=True,
+    ))
+    op.create_index('idx_matrix_dscr_range', 'eligibility_matrix_rule', ['dscrRange'], unique=False, postgresql_using='gist')
+
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS scenario_search")
+    _create_scenario_search(',\n            r."minDscr",\n            r."maxDscr",\n            r."dscrRange"')
+    op.create_index('idx_scenario_search_dscr_range', 'scenario_search', ['dscrRange'], unique=False, postgresql_using='gist')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS scenario_search")
+    _create_scenario_search()
+
+    op.drop_index('idx_matrix_dscr_range', table_name='eligibility_matrix_rule', postgresql_using='gist')
+    op.drop_column('eligibility_matrix_rule', 'dscrRange')
+    op.drop_column('eligibility_matrix_rule', 'maxDscr')
+    op.drop_column('eligibility_matrix_rule', 'minDscr')
@@ -0,0 +1,38 @@
+"""Add catalog_version table
+
+A single-row counter bumped (with a NOTIFY on the catalog_changed channel) by
+every write to lender data, so each worker can refresh its in-memory catalog.
+
+Revision ID: e7b2c9d4a1f6
+Revises: c4e7a1b9d3f2
+Create Date: 2026-10-19 09:41:27.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7b2c9d4a1f6'
+down_revision: Union[str, Sequence[str], None] = 'c4e7a1b9d3f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'catalog_version',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.BigInteger(), server_default='0', nullable=False),
+        sa.Column('updatedAt', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.execute('INSERT INTO catalog_version (id, version) VALUES (1, 0)')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('catalog_version')
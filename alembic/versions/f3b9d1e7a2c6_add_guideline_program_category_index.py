@@ -0,0 +1,34 @@
+"""Index guidelines by (loanProgramId, category)
+
+Batched guideline lookups filter on a set of programs and categories. The
+composite index serves them and also every lookup by program alone, so it
+replaces idx_guideline_programId.
+
+Revision ID: f3b9d1e7a2c6
+Revises: d4c8e2b6a915
+Create Date: 2026-10-18 23:05:12.614382
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b9d1e7a2c6'
+down_revision: Union[str, Sequence[str], None] = 'd4c8e2b6a915'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('idx_guideline_program_category', 'guideline', ['loanProgramId', 'category'], unique=False)
+    op.drop_index('idx_guideline_programId', table_name='guideline')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index('idx_guideline_programId', 'guideline', ['loanProgramId'], unique=False)
+    op.drop_index('idx_guideline_program_category', table_name='guideline')
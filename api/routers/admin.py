@@ -0,0 +1,88 @@
+# api/routers/admin.py
+import hmac
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.settings import settings
+from db import catalog, query_stats
+from db.models import DatasetSnapshot
+from db.session import get_db_session
+
+
+def require_admin_key(x_admin_key: Optional[str] = Header(default=None)):
+    """Checks the X-Admin-Key header. Without ADMIN_API_KEY the admin endpoints are closed."""
+    if not settings.ADMIN_API_KEY:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (ADMIN_API_KEY is not set)")
+    if not hmac.compare_digest((x_admin_key or "").encode(), settings.ADMIN_API_KEY.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin key")
+
+
+router = APIRouter(dependencies=[Depends(require_admin_key)])
+
+
+@router.get("/queries")
+async def get_top_queries(
+    limit: int = Query(20, ge=1, le=500),
+    order_by: Literal["total_ms", "mean_ms", "max_ms", "calls"] = "total_ms",
+):
+    """
+    Top SQL statements by normalized fingerprint, with call counts, timings
+    and the CRUD functions or tools that issued them.
+    """
+    return {
+        "enabled": settings.QUERY_STATS_ENABLED,
+        "slow_query_ms": settings.SLOW_QUERY_MS,
+        "statements": query_stats.top_statements(limit, order_by),
+    }
+
+
+@router.delete("/queries", status_code=204)
+async def reset_query_stats():
+    """Clears the aggregated statement stats."""
+    query_stats.reset()
+    return Response(status_code=204)
+
+
+@router.get("/catalog")
+async def get_catalog_status():
+    """Version and size of this worker's in-memory lender/program catalog."""
+    snapshot = catalog.current()
+    if snapshot is None:
+        return {"loaded": False}
+    return {
+        "loaded": True,
+        "version": snapshot.version,
+        "loaded_at": snapshot.loaded_at,
+        "lenders": len(snapshot.lenders),
+        "programs": len(snapshot.programs),
+    }
+
+
+@router.post("/catalog/reload")
+async def reload_catalog():
+    """Publishes a catalog change so every worker reloads its snapshot, and reloads this one."""
+    snapshot = await catalog.publish_reload()
+    return {"version": snapshot.version, "lenders": len(snapshot.lenders), "programs": len(snapshot.programs)}
+
+
+@router.get("/datasets")
+async def get_dataset_snapshots(
+    limit: int = Query(20, ge=1, le=200),
+    db: AsyncSession = Depends(get_db_session),
+):
+    """The most recent delta imports, newest first, with their per-table change counts."""
+    result = await db.execute(select(DatasetSnapshot).order_by(DatasetSnapshot.id.desc()).limit(limit))
+    return [
+        {
+            "id": snapshot.id,
+            "source_path": snapshot.sourcePath,
+            "source_hash": snapshot.sourceHash,
+            "catalog_version": snapshot.catalogVersion,
+            "changes": snapshot.changes,
+            "created_at": snapshot.createdAt,
+        }
+        for snapshot in result.scalars()
+    ]
@@ -6,6 +6,8 @@ from fastapi.responses import StreamingResponse
 from db.session import get_db_session
 from core.schemas import ChatRequest
 from core.services import stream_chat_message
+from core import metrics, tracing
+import time
 from db import crud
 from core.schemas import (
     ChatRequest, 
@@ -27,8 +29,16 @@ async def chat_with_agent(
     """
     try:
         async def response_generator():
-            async for chunk in stream_chat_message(request, db, background_tasks):
-                yield f"{chunk}\n"
+            # The request span is the root of the turn's trace
+            start = time.perf_counter()
+            metrics.CHAT_STREAMS_IN_FLIGHT.inc()
+            try:
+                with tracing.span("POST /api/v1/chat", kind=tracing.SPAN_KIND_SERVER, **{"http.route": "/api/v1/chat"}):
+                    async for chunk in stream_chat_message(request, db, background_tasks):
+                        yield f"{chunk}\n"
+            finally:
+                metrics.CHAT_STREAMS_IN_FLIGHT.dec()
+                metrics.CHAT_TURN_SECONDS.observe(time.perf_counter() - start)
 
         return StreamingResponse(
             response_generator(),
@@ -0,0 +1,94 @@
+# api/routers/scenarios.py
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+
+from config.settings import settings
+from core import scenario_batch, sensitivity
+from core.schemas import SensitivityBand, SensitivityCell, SensitivityCurveResponse
+from db.models import Lender, LoanProgram, LoanPurposeType, OccupancyType
+from db.session import AsyncSessionFactory
+
+router = APIRouter()
+
+
+@router.post("/scenarios/batch")
+async def evaluate_scenarios_batch(request: Request):
+    """
+    Checks eligibility for many borrower scenarios at once.
+
+    The body is a JSON array of scenarios (or {"scenarios": [...]}) or, with
+    Content-Type: text/csv, a CSV with a header row. Fields: fico_score,
+    loan_amount, ltv, occupancy, loan_purpose, optional dscr and id. Streams
+    one NDJSON 'result' line per scenario in input order, then a 'summary'
+    line with scenarios per second.
+    """
+    body = await request.body()
+    try:
+        parsed = scenario_batch.parse_scenarios(body, request.headers.get("content-type", ""))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if len(parsed) > settings.SCENARIO_BATCH_MAX:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch has {len(parsed)} scenarios; the limit is {settings.SCENARIO_BATCH_MAX}",
+        )
+
+    async def result_generator():
+        # The session lives as long as the stream, not the request handler
+        async with AsyncSessionFactory() as session:
+            async for line in scenario_batch.evaluate_scenarios(session, parsed):
+                yield f"{line}\n"
+
+    return StreamingResponse(result_generator(), media_type="application/x-json-stream")
+
+
+@router.get("/programs/{program_id}/sensitivity", response_model=SensitivityCurveResponse)
+async def get_sensitivity_curve(program_id: str, occupancy: str, loan_purpose: str, dscr: Optional[float] = None):
+    """
+    Max LTV and reserves for a program across its FICO and loan-amount
+    breakpoints, for one occupancy and purpose (and optionally a DSCR).
+    """
+    try:
+        occ_enum = OccupancyType[occupancy.strip().upper()]
+        lp_enum = LoanPurposeType[loan_purpose.strip().upper()]
+    except KeyError:
+        raise HTTPException(
+            status_code=400,
+            detail=f"occupancy must be one of {', '.join(e.name for e in OccupancyType)}; "
+                   f"loan_purpose one of {', '.join(e.name for e in LoanPurposeType)}",
+        )
+
+    async with AsyncSessionFactory() as session:
+        program = (await session.execute(
+            select(LoanProgram.id, LoanProgram.name, Lender.name.label("lender_name"))
+            .join(Lender, Lender.id == LoanProgram.lenderId)
+            .where(LoanProgram.id == program_id)
+        )).one_or_none()
+        if program is None:
+            raise HTTPException(status_code=404, detail="Loan program not found")
+        curve = await sensitivity.load_curve(session, program_id, occ_enum, lp_enum, dscr)
+
+    def bands(items, step, label):
+        return [
+            SensitivityBand(min=b.start, max=round(b.end - step, 2) if b.end is not None else None, label=label(b))
+            for b in items
+        ]
+
+    return SensitivityCurveResponse(
+        program_id=program.id,
+        program=program.name,
+        lender=program.lender_name,
+        occupancy=occ_enum.name,
+        loan_purpose=lp_enum.name,
+        dscr=dscr,
+        rules=curve.rule_count,
+        fico_bands=bands(curve.fico_bands, sensitivity.FICO_STEP, sensitivity.fico_label),
+        loan_amount_bands=bands(curve.amount_bands, sensitivity.AMOUNT_STEP, sensitivity.amount_label),
+        cells=[
+            [SensitivityCell(max_ltv=c[0], reserves_months=c[1]) if c is not None else None for c in row]
+            for row in curve.cells
+        ],
+    )
@@ -0,0 +1,164 @@
+# bench/explain_check.py
+"""
+EXPLAIN-based check that the hot tool queries can use their indexes.
+
+Each check compiles the query a tool actually runs, EXPLAINs it and fails
+(exit code 1) if the target relation is read with a sequential scan or none of
+the expected indexes appear in the plan.
+
+    python -m bench.explain_check --database-url postgresql+asyncpg://localhost/mortgage_bench
+
+On small catalogs the planner rightly prefers a sequential scan, so by
+default sequential scans are disabled for the session: the check then proves
+the indexes are *usable* for the predicates. Pass --natural to check the plan
+the planner would pick on its own (meaningful on a 100x+ catalog from
+db/generate_data.py).
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Set
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+
+class Check:
+    """
+    A query, the relation it must not seq-scan and the indexes it should use.
+    Usability-only checks test a single unselective predicate and are skipped
+    with --natural, where a sequential scan is the right plan.
+    """
+
+    def __init__(self, name: str, build: Callable[[], Any], relation: str, indexes: Set[str], usability_only: bool = False):
+        self.name = name
+        self.build = build
+        self.relation = relation
+        self.indexes = indexes
+        self.usability_only = usability_only
+
+
+def build_checks() -> List[Check]:
+    from sqlalchemy import cast, Numeric, select
+    from core import tools
+    from db.models import EligibilityMatrixRule, GuidelineCategory, LoanPurposeType, OccupancyType
+
+    return [
+        Check(
+            "find_programs_by_scenario",
+            lambda: tools._scenario_query(720, 500000, 70, OccupancyType.INVESTMENT, LoanPurposeType.PURCHASE, dscr=1.1),
+            "scenario_search",
+            {"idx_scenario_search_occupancy_purpose", "idx_scenario_search_fico_range",
+             "idx_scenario_search_loan_amount_range", "idx_scenario_search_dscr_range"},
+        ),
+        Check(
+            "fico range containment",
+            lambda: select(EligibilityMatrixRule.id).where(EligibilityMatrixRule.ficoRange.contains(720)),
+            "eligibility_matrix_rule",
+            {"idx_matrix_fico_range"},
+            usability_only=True,
+        ),
+        Check(
+            "loan amount range containment",
+            lambda: select(EligibilityMatrixRule.id).where(
+                EligibilityMatrixRule.loanAmountRange.contains(cast(500000, Numeric))
+            ),
+            "eligibility_matrix_rule",
+            {"idx_matrix_loan_amount_range"},
+            usability_only=True,
+        ),
+        Check(
+            "dscr range containment",
+            lambda: select(EligibilityMatrixRule.id).where(EligibilityMatrixRule.dscrRange.contains(cast(1.1, Numeric))),
+            "eligibility_matrix_rule",
+            {"idx_matrix_dscr_range"},
+            usability_only=True,
+        ),
+        Check(
+            "get_guidelines_for_programs",
+            lambda: tools._guidelines_query(
+                ["00000000-0000-0000-0000-000000000001", "00000000-0000-0000-0000-000000000002"], None,
+                [GuidelineCategory.GIFT_FUNDS, GuidelineCategory.RESERVES],
+            ),
+            "guideline",
+            {"idx_guideline_program_category"},
+        ),
+        Check(
+            "search_guidelines",
+            lambda: tools._guideline_search_query("non-warrantable condo"),
+            "guideline",
+            {"idx_guideline_content_tsv"},
+        ),
+    ]
+
+
+def walk_plan(node: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    yield node
+    for child in node.get("Plans", []):
+        yield from walk_plan(child)
+
+
+def evaluate(plan: Dict[str, Any], check: Check) -> List[str]:
+    """Returns the problems found in an EXPLAIN (FORMAT JSON) plan."""
+    problems = []
+    used = set()
+    for node in walk_plan(plan):
+        if node.get("Index Name"):
+            used.add(node["Index Name"])
+        if node.get("Node Type") == "Seq Scan" and node.get("Relation Name") == check.relation:
+            problems.append(f"sequential scan on {check.relation}")
+    if not used & check.indexes:
+        problems.append(f"none of {sorted(check.indexes)} used (plan used {sorted(used) or 'no indexes'})")
+    return problems
+
+
+async def run_checks(natural: bool, verbose: bool) -> int:
+    from sqlalchemy import text
+    from db.session import engine
+
+    failures = 0
+    try:
+        async with engine.connect() as conn:
+            if not natural:
+                await conn.execute(text("SET enable_seqscan = off"))
+            for check in build_checks():
+                if natural and check.usability_only:
+                    continue
+                compiled = check.build().compile(engine.sync_engine, compile_kwargs={"literal_binds": True})
+                result = await conn.execute(text(f"EXPLAIN (FORMAT JSON) {compiled}"))
+                raw = result.scalar()
+                plan = (json.loads(raw) if isinstance(raw, str) else raw)[0]["Plan"]
+                problems = evaluate(plan, check)
+                if problems:
+                    failures += 1
+                    print(f"❌ {check.name}: {'; '.join(problems)}")
+                else:
+                    indexes = sorted({n["Index Name"] for n in walk_plan(plan) if n.get("Index Name")})
+                    print(f"✅ {check.name}: uses {', '.join(indexes)}")
+                if verbose:
+                    print(json.dumps(plan, indent=2))
+    finally:
+        await engine.dispose()
+    return 1 if failures else 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Check that tool queries use their indexes.")
+    parser.add_argument("--database-url", default=os.environ.get("BENCH_DATABASE_URL"),
+                        help="Migrated and seeded database. Defaults to $BENCH_DATABASE_URL.")
+    parser.add_argument("--natural", action="store_true", help="Don't disable sequential scans.")
+    parser.add_argument("--verbose", action="store_true", help="Print the full plans.")
+    args = parser.parse_args(argv)
+
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("LLM_PROVIDER", "stub")
+    return asyncio.run(run_checks(args.natural, args.verbose))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,453 @@
+# bench/loadtest.py
+"""
+End-to-end load test for the /api/v1/chat NDJSON stream.
+
+Drives many concurrent multi-turn conversations, either in-process against
+`main.app` (no server needed) or over HTTP against a running server, and
+reports throughput, time-to-first-chunk (the first "chunk" line, i.e. the
+first model token, not the "info" line sent before the graph runs), turn
+latency, DB pool wait and error rate. Results can be saved as JSON and compared against a previous run.
+
+In-process runs use the stub LLM (see core/llm.py) by default, so only the
+graph, tools, DB and streaming are measured:
+
+    python -m bench.loadtest --sessions 200 --concurrency 20 --output results.json
+    python -m bench.loadtest --url http://localhost:8085 --compare results.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+BENCH_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = BENCH_DIR.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+DEFAULT_CONVERSATIONS = BENCH_DIR / "conversations.json"
+DEFAULT_STUB_SCRIPT = BENCH_DIR / "stub_script.json"
+CHAT_PATH = "/api/v1/chat"
+
+# Metrics compared by --compare; higher is worse for all except throughput.
+# error_rate is shown but gated by --max-error-rate (absolute): a percent change of a ~0 baseline means nothing.
+COMPARED_METRICS = [
+    ("requests_per_second", None),
+    ("ttfc_ms", "p50"), ("ttfc_ms", "p95"), ("ttfc_ms", "p99"),
+    ("turn_latency_ms", "p50"), ("turn_latency_ms", "p95"), ("turn_latency_ms", "p99"),
+    ("error_rate", None),
+]
+
+
+# --- Statistics ---
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile. Returns None for an empty list."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(values_s: List[float]) -> Optional[Dict[str, float]]:
+    """Summarizes a list of durations (seconds) as milliseconds."""
+    if not values_s:
+        return None
+    ms = [v * 1000 for v in values_s]
+    return {
+        "count": len(ms),
+        "mean": round(statistics.fmean(ms), 2),
+        "p50": round(percentile(ms, 50), 2),
+        "p95": round(percentile(ms, 95), 2),
+        "p99": round(percentile(ms, 99), 2),
+        "max": round(max(ms), 2),
+    }
+
+
+# --- Transports ---
+
+class TurnResult:
+    """Timing and outcome of a single chat turn."""
+
+    def __init__(self):
+        self.status: Optional[int] = None
+        self.ttfc: Optional[float] = None
+        self.total: Optional[float] = None
+        self.payloads: List[Dict[str, Any]] = []
+        self.error: Optional[str] = None
+        self._partial = b""
+
+    def feed(self, data: bytes, elapsed: float):
+        """Records time-to-first-chunk when the first complete "chunk" line arrives."""
+        if self.ttfc is not None:
+            return
+        lines = (self._partial + data).split(b"\n")
+        self._partial = lines.pop()
+        for line in lines:
+            try:
+                if json.loads(line).get("type") == "chunk":
+                    self.ttfc = elapsed
+                    self._partial = b""
+                    return
+            except (json.JSONDecodeError, AttributeError):
+                continue
+
+    @property
+    def conversation_id(self) -> Optional[str]:
+        for payload in self.payloads:
+            if payload.get("type") == "info":
+                return payload.get("conversation_id")
+        return None
+
+    def parse_body(self, body: bytes):
+        for line in body.decode("utf-8").splitlines():
+            if not line.strip():
+                continue
+            try:
+                payload = json.loads(line)
+            except json.JSONDecodeError:
+                self.error = f"Invalid NDJSON line: {line[:200]}"
+                continue
+            self.payloads.append(payload)
+            if payload.get("type") == "error" and not self.error:
+                self.error = payload.get("content") or "error payload"
+        if self.status != 200 and not self.error:
+            self.error = f"HTTP {self.status}"
+
+
+class InProcessTransport:
+    """
+    Calls the ASGI app directly. Body chunks are timed as the app sends them,
+    so time-to-first-chunk reflects the real streaming behaviour.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._lifespan_task = None
+        self._lifespan_queue: asyncio.Queue = asyncio.Queue()
+        self._lifespan_events: asyncio.Queue = asyncio.Queue()
+
+    async def start(self):
+        """Runs the app's lifespan startup, as a server would."""
+
+        async def receive():
+            return await self._lifespan_queue.get()
+
+        async def send(message):
+            await self._lifespan_events.put(message)
+
+        self._lifespan_task = asyncio.create_task(
+            self.app({"type": "lifespan", "asgi": {"version": "3.0"}}, receive, send)
+        )
+        await self._lifespan_queue.put({"type": "lifespan.startup"})
+        message = await self._lifespan_events.get()
+        if message["type"] != "lifespan.startup.complete":
+            raise RuntimeError(f"App startup failed: {message.get('message')}")
+
+    async def post_chat(self, payload: Dict[str, Any]) -> TurnResult:
+        result = TurnResult()
+        body = json.dumps(payload).encode("utf-8")
+        chunks: List[bytes] = []
+        finished = asyncio.Event()
+        request_sent = False
+
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "POST",
+            "scheme": "http",
+            "path": CHAT_PATH,
+            "raw_path": CHAT_PATH.encode(),
+            "root_path": "",
+            "query_string": b"",
+            "headers": [
+                (b"host", b"loadtest"),
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+            ],
+            "client": ("127.0.0.1", 0),
+            "server": ("loadtest", 80),
+        }
+
+        async def receive():
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            # Only report a disconnect once the response is complete, otherwise
+            # StreamingResponse would cancel the stream.
+            await finished.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            now = time.perf_counter()
+            if message["type"] == "http.response.start":
+                result.status = message["status"]
+            elif message["type"] == "http.response.body":
+                chunk = message.get("body", b"")
+                if chunk:
+                    result.feed(chunk, now - start)
+                    chunks.append(chunk)
+                if not message.get("more_body", False):
+                    result.total = now - start
+                    finished.set()
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            finished.set()
+        if result.total is None:
+            result.total = time.perf_counter() - start
+        result.parse_body(b"".join(chunks))
+        return result
+
+    async def close(self):
+        if self._lifespan_task is None:
+            return
+        await self._lifespan_queue.put({"type": "lifespan.shutdown"})
+        await self._lifespan_events.get()
+        await self._lifespan_task
+
+
+class HttpTransport:
+    """Streams the chat endpoint of a running server over HTTP."""
+
+    def __init__(self, base_url: str, timeout: float):
+        import httpx
+
+        self.client = httpx.AsyncClient(base_url=base_url.rstrip("/"), timeout=timeout)
+
+    async def post_chat(self, payload: Dict[str, Any]) -> TurnResult:
+        result = TurnResult()
+        chunks: List[bytes] = []
+        start = time.perf_counter()
+        async with self.client.stream("POST", CHAT_PATH, json=payload) as response:
+            result.status = response.status_code
+            async for chunk in response.aiter_bytes():
+                if chunk:
+                    result.feed(chunk, time.perf_counter() - start)
+                    chunks.append(chunk)
+        result.total = time.perf_counter() - start
+        result.parse_body(b"".join(chunks))
+        return result
+
+    async def close(self):
+        await self.client.aclose()
+
+
+# --- DB Pool Wait ---
+
+def instrument_pool_wait(samples: List[float]):
+    """
+    Times how long each connection checkout waits on the engine's pool.
+    SQLAlchemy has no 'before checkout' event, so the pool's internal getter
+    is wrapped. Only meaningful for in-process runs.
+    """
+    from db.session import engine
+
+    pool = engine.sync_engine.pool
+    original_do_get = pool._do_get
+
+    def timed_do_get():
+        start = time.perf_counter()
+        try:
+            return original_do_get()
+        finally:
+            samples.append(time.perf_counter() - start)
+
+    pool._do_get = timed_do_get
+
+
+# --- Runner ---
+
+async def run_session(transport, turns: List[str], results: List[TurnResult], timeout: float):
+    """Plays one scripted multi-turn conversation, reusing the conversation id."""
+    conversation_id = None
+    for message in turns:
+        payload = {"message": message, "conversation_id": conversation_id}
+        try:
+            turn = await asyncio.wait_for(transport.post_chat(payload), timeout)
+        except Exception as e:
+            turn = TurnResult()
+            turn.error = f"{type(e).__name__}: {e}"
+        results.append(turn)
+        if turn.error:
+            # Later turns depend on this one, so abandon the session
+            return
+        conversation_id = turn.conversation_id or conversation_id
+
+
+async def run_load_test(
+    transport,
+    conversations: List[List[str]],
+    sessions: int,
+    concurrency: int,
+    timeout: float,
+    pool_wait_samples: Optional[List[float]] = None,
+) -> Dict[str, Any]:
+    results: List[TurnResult] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def worker(i: int):
+        async with semaphore:
+            await run_session(transport, conversations[i % len(conversations)], results, timeout)
+
+    started_at = datetime.now(timezone.utc)
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(sessions)))
+    duration = time.perf_counter() - start
+
+    ok = [r for r in results if not r.error]
+    errors = [r for r in results if r.error]
+    return {
+        "started_at": started_at.isoformat(),
+        "duration_s": round(duration, 3),
+        "sessions": sessions,
+        "concurrency": concurrency,
+        "turns": len(results),
+        "errors": len(errors),
+        "error_rate": round(len(errors) / len(results), 4) if results else 0.0,
+        "requests_per_second": round(len(ok) / duration, 2) if duration else 0.0,
+        "ttfc_ms": summarize([r.ttfc for r in ok if r.ttfc is not None]),
+        "turn_latency_ms": summarize([r.total for r in ok if r.total is not None]),
+        "db_pool_wait_ms": summarize(pool_wait_samples) if pool_wait_samples is not None else None,
+        "error_samples": sorted({r.error for r in errors})[:10],
+    }
+
+
+def compare_results(baseline: Dict[str, Any], current: Dict[str, Any], max_regression: Optional[float],
+                    max_error_rate: Optional[float] = None) -> bool:
+    """
+    Prints metric deltas against a baseline. Returns False if a regression
+    exceeds the limit or the error rate exceeds max_error_rate (absolute).
+    """
+    print("\nComparison against baseline:")
+    passed = True
+    for metric, field in COMPARED_METRICS:
+        old = baseline.get(metric)
+        new = current.get(metric)
+        if field:
+            old = old.get(field) if old else None
+            new = new.get(field) if new else None
+        label = f"{metric}.{field}" if field else metric
+        if old is None or new is None:
+            print(f"  {label:<24} n/a")
+            continue
+        delta_pct = ((new - old) / old * 100) if old else 0.0
+        # Throughput regresses when it drops, everything else when it grows
+        regression = -delta_pct if metric == "requests_per_second" else delta_pct
+        flag = ""
+        if max_regression is not None and metric != "error_rate" and regression > max_regression:
+            flag = "  <-- REGRESSION"
+            passed = False
+        print(f"  {label:<24} {old:>10} -> {new:>10} ({delta_pct:+.1f}%){flag}")
+    if max_error_rate is not None and current.get("error_rate", 0.0) > max_error_rate:
+        print(f"  error_rate {current['error_rate']:.2%} exceeds --max-error-rate {max_error_rate:.2%}  <-- REGRESSION")
+        passed = False
+    return passed
+
+
+def print_report(report: Dict[str, Any]):
+    print(f"\nTurns: {report['turns']} ({report['errors']} errors, rate {report['error_rate']:.2%})")
+    print(f"Duration: {report['duration_s']}s | Throughput: {report['requests_per_second']} turns/s")
+    for key, label in [
+        ("ttfc_ms", "Time to first chunk"),
+        ("turn_latency_ms", "Turn latency"),
+        ("db_pool_wait_ms", "DB pool wait"),
+    ]:
+        stats = report.get(key)
+        if stats:
+            print(
+                f"{label:<20} p50 {stats['p50']}ms | p95 {stats['p95']}ms | "
+                f"p99 {stats['p99']}ms | max {stats['max']}ms"
+            )
+    for sample in report["error_samples"]:
+        print(f"  error: {sample}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the /api/v1/chat streaming endpoint.")
+    parser.add_argument("--url", help="Base URL of a running server. Omit to run in-process against main.app.")
+    parser.add_argument("--sessions", type=int, default=50, help="Total conversations to play.")
+    parser.add_argument("--concurrency", type=int, default=10, help="Conversations in flight at once.")
+    parser.add_argument("--conversations", default=str(DEFAULT_CONVERSATIONS),
+                        help="JSON file with a list of conversations (each a list of user messages).")
+    parser.add_argument("--llm", choices=["stub", "configured"], default="stub",
+                        help="In-process only: use the stub LLM (default) or the provider from settings.")
+    parser.add_argument("--stub-latency-ms", type=int, default=None, help="In-process only: stub LLM latency.")
+    parser.add_argument("--stub-script", default=str(DEFAULT_STUB_SCRIPT), help="In-process only: stub LLM script.")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-turn timeout in seconds.")
+    parser.add_argument("--output", help="Write the results JSON to this path.")
+    parser.add_argument("--compare", help="Baseline results JSON to compare against.")
+    parser.add_argument("--max-regression", type=float, default=None,
+                        help="With --compare, exit non-zero if a latency/throughput metric regresses by more than this percent.")
+    parser.add_argument("--max-error-rate", type=float, default=0.01,
+                        help="With --compare, exit non-zero if more than this fraction of turns fail (default 0.01; negative disables).")
+    return parser.parse_args(argv)
+
+
+async def main(argv=None) -> int:
+    args = parse_args(argv)
+
+    with open(args.conversations, "r", encoding="utf-8") as f:
+        conversations = json.load(f)
+
+    pool_wait_samples = None
+    if args.url:
+        transport = HttpTransport(args.url, args.timeout)
+        mode = "http"
+    else:
+        # Settings are read at import time, so configure the stub before importing the app
+        if args.llm == "stub":
+            os.environ["LLM_PROVIDER"] = "stub"
+            os.environ["LLM_STUB_SCRIPT"] = args.stub_script
+            if args.stub_latency_ms is not None:
+                os.environ["LLM_STUB_LATENCY_MS"] = str(args.stub_latency_ms)
+        from main import app
+
+        pool_wait_samples = []
+        instrument_pool_wait(pool_wait_samples)
+        transport = InProcessTransport(app)
+        await transport.start()
+        mode = "in-process"
+
+    print(f"Running {args.sessions} sessions ({args.concurrency} concurrent, {mode})...")
+    try:
+        report = await run_load_test(
+            transport, conversations, args.sessions, args.concurrency, args.timeout, pool_wait_samples
+        )
+    finally:
+        await transport.close()
+
+    report["config"] = {
+        "mode": mode,
+        "url": args.url,
+        "llm": args.llm if not args.url else None,
+        "stub_latency_ms": args.stub_latency_ms,
+        "conversations": args.conversations,
+    }
+    print_report(report)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+        print(f"\nResults written to {args.output}")
+
+    max_error_rate = args.max_error_rate if args.max_error_rate >= 0 else None
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        if not compare_results(baseline, report, args.max_regression, max_error_rate):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,78 @@
+# bench/template_check.py
+"""
+Regression cases for the analytics templates in core/sql_templates.py.
+
+Each case is a question and either the template it must match (with
+fragments its SQL must contain) or None when it must fall back to LLM SQL.
+Prints every failing case and exits with code 1 if there is one. No database
+is needed.
+
+    python -m bench.template_check
+"""
+import sys
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+LENDERS = ["ARC Home", "Acra Lending", "Deephaven"]
+
+
+class Case:
+    def __init__(self, question: str, template: Optional[str], sql: Sequence[str] = ()):
+        self.question = question
+        self.template = template
+        self.sql = sql
+
+
+CASES: List[Case] = [
+    # "max LTV" is the column; without another aggregate word it means its maximum
+    Case("What is the max LTV for ARC Home investment cash-out?", "max_ltv",
+         ['MAX("maxLtv")', '"lenderName" = :lender', '"loanPurpose"']),
+    Case("What is the average max LTV by lender?", "max_ltv", ['AVG("maxLtv")', 'GROUP BY "lenderName"']),
+    Case("Lowest minimum FICO per program for second homes", "min_fico", ['MIN("minFicoScore")', '"programName"']),
+    Case("How many programs does Acra Lending offer?", "program_count", ["l.name = :lender"]),
+    Case("How many 'ITIN' programs per lender?", "program_count", ["ILIKE :name_pattern", "GROUP BY l.name"]),
+    # Occupancy questions, as in the query_database_assistant docstring
+    Case("Count all programs that allow 'INVESTMENT' occupancy.", "program_count",
+         ['"occupancyType" = ANY(']),
+    Case("How many programs allow second homes?", "program_count", ['"occupancyType" = ANY(']),
+    Case("How many programs allow investment properties?", "program_count", ['"occupancyType" = ANY(']),
+    Case("How many programs per occupancy?", None),
+    # Qualifiers no template understands must not be dropped
+    Case("What is the max LTV for DSCR loans?", None),
+    Case("how many programs have no prepayment penalty", None),
+    Case("what fico score do I need for the Flex Select program", None),
+    Case("What is the max LTV for investment or primary?", None),
+    Case("What is the max LTV above 80%?", None),
+]
+
+
+def run_cases(cases: List[Case]) -> List[str]:
+    from core.sql_templates import match_template
+
+    failures = []
+    for case in cases:
+        match = match_template(case.question, LENDERS)
+        name = match.name if match else None
+        if name != case.template:
+            failures.append(f"{case.question!r}: expected {case.template or 'fallback'}, got {name or 'fallback'}")
+            continue
+        missing = [fragment for fragment in case.sql if fragment not in match.sql]
+        if missing:
+            failures.append(f"{case.question!r}: SQL lacks {missing}: {match.sql}")
+    return failures
+
+
+def main() -> int:
+    failures = run_cases(CASES)
+    for failure in failures:
+        print(f"❌ {failure}")
+    print(f"{'✅' if not failures else '⚠️ '} {len(CASES) - len(failures)}/{len(CASES)} template cases passed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
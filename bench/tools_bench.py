@@ -0,0 +1,344 @@
+# bench/tools_bench.py
+"""
+Microbenchmarks for the agent's hot tool paths in core/tools.py.
+
+For each data scale the runner resets a scratch database, migrates it to
+head, loads a synthetic catalog from db/generate_data.py and then times every
+benchmark case over a number of rounds, pytest-benchmark style. Each call is
+split into DB time (cursor execution), fuzzy-matching time (thefuzz) and the
+remaining Python time (session and connection handling, query compilation and
+output formatting).
+
+    python -m bench.tools_bench --database-url postgresql+asyncpg://localhost/mortgage_bench \\
+        --scales 1,10,100 --output bench_tools.json
+    python -m bench.tools_bench --database-url ... --baseline bench_tools.json
+
+With --baseline the run fails (exit code 1) when a case's median regresses by
+more than the threshold configured in bench/thresholds.json.
+
+WARNING: the target database is wiped. Never point this at a real database.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+BENCH_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = BENCH_DIR.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from bench.loadtest import percentile
+
+DEFAULT_THRESHOLDS = BENCH_DIR / "thresholds.json"
+
+
+# --- Time Accounting ---
+
+class Breakdown:
+    """Accumulates DB and fuzzy-matching time for the call being measured."""
+
+    def __init__(self):
+        self.db = 0.0
+        self.fuzzy = 0.0
+
+    def reset(self):
+        self.db = 0.0
+        self.fuzzy = 0.0
+
+
+BREAKDOWN = Breakdown()
+
+
+def instrument(engine, tools_module):
+    """Adds statement timing to the engine's shared hook and wraps thefuzz in core.tools."""
+    from db import statement_hooks
+
+    def _db_time(statement, elapsed_ms, rowcount, error, executemany):
+        BREAKDOWN.db += elapsed_ms / 1000
+
+    statement_hooks.add_handler(engine, _db_time)
+
+    fuzz_process = tools_module.process
+
+    class TimedProcess:
+        def __getattr__(self, name):
+            return getattr(fuzz_process, name)
+
+        def extractOne(self, *args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fuzz_process.extractOne(*args, **kwargs)
+            finally:
+                BREAKDOWN.fuzzy += time.perf_counter() - start
+
+    tools_module.process = TimedProcess()
+
+
+# --- Database Seeding ---
+
+def reset_and_migrate():
+    """Drops everything in the public schema and runs the Alembic migrations to head."""
+    from alembic import command
+    from alembic.config import Config
+
+    async def _reset():
+        from sqlalchemy import text
+        from db.session import engine
+
+        async with engine.begin() as conn:
+            await conn.execute(text("DROP SCHEMA public CASCADE"))
+            await conn.execute(text("CREATE SCHEMA public"))
+        await engine.dispose()
+
+    asyncio.run(_reset())
+    command.upgrade(Config(str(PROJECT_ROOT / "alembic.ini")), "head")
+
+
+def seed(scale: float, seed_value: int) -> Dict[str, int]:
+    from db.generate_data import write_catalog
+    from db.import_data import import_data
+
+    from db.session import engine
+
+    async def _import(path: str):
+        try:
+            await import_data(path)
+        finally:
+            await engine.dispose()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, f"data_{scale:g}x.json")
+        counts = write_catalog(path, scale, seed_value)
+        asyncio.run(_import(path))
+    return counts
+
+
+# --- Benchmark Cases ---
+
+async def load_fixtures() -> Dict[str, Any]:
+    """Picks representative ids and names from the seeded catalog."""
+    from sqlalchemy import func, select
+    from db.models import EligibilityMatrixRule, LoanProgram
+    from db.session import AsyncSessionFactory
+
+    async with AsyncSessionFactory() as session:
+        # The program with the most rules is the worst case for rule lookups
+        row = (await session.execute(
+            select(LoanProgram.id, LoanProgram.name, LoanProgram.lenderId, func.count(EligibilityMatrixRule.id).label("n"))
+            .join(EligibilityMatrixRule, EligibilityMatrixRule.loanProgramId == LoanProgram.id)
+            .group_by(LoanProgram.id)
+            .order_by(func.count(EligibilityMatrixRule.id).desc())
+            .limit(1)
+        )).one()
+        rule = (await session.execute(
+            select(EligibilityMatrixRule).where(EligibilityMatrixRule.loanProgramId == row.id).limit(1)
+        )).scalar_one()
+
+    return {
+        "program_id": row.id,
+        "program_name": row.name,
+        "lender_id": row.lenderId,
+        "fico_score": (rule.minFicoScore or 700) + 5,
+        "loan_amount": float(rule.minLoanAmount or 500000) + 1000,
+        "occupancy": rule.occupancyType.name if rule.occupancyType else "PRIMARY",
+        "loan_purpose": rule.loanPurpose.name if rule.loanPurpose else "PURCHASE",
+    }
+
+
+def build_cases(fixtures: Dict[str, Any]) -> Dict[str, Callable[[], Awaitable[Any]]]:
+    from core import tools
+
+    async def find_program_by_name():
+        return await tools._find_program_by_name(fixtures["program_name"].lower())
+
+    cases = {
+        "find_programs_by_scenario": lambda: tools.find_programs_by_scenario.ainvoke({
+            "fico_score": fixtures["fico_score"],
+            "loan_amount": fixtures["loan_amount"],
+            "ltv": 60,
+            "loan_purpose": fixtures["loan_purpose"],
+            "occupancy": fixtures["occupancy"],
+        }),
+        "find_eligibility_rules": lambda: tools.find_eligibility_rules.ainvoke({
+            "program_name": fixtures["program_name"],
+            "fico_score": fixtures["fico_score"],
+            "occupancy": fixtures["occupancy"],
+        }),
+        "get_eligibility_curve": lambda: tools.get_eligibility_curve.ainvoke({
+            "program_name": fixtures["program_name"],
+            "occupancy": fixtures["occupancy"],
+            "loan_purpose": fixtures["loan_purpose"],
+        }),
+        "_find_program_by_name": find_program_by_name,
+        "get_program_guidelines": lambda: tools.get_program_guidelines.ainvoke({
+            "program_id": fixtures["program_id"],
+        }),
+        "get_loan_programs_by_lender": lambda: tools.get_loan_programs_by_lender.ainvoke({
+            "lenderId": fixtures["lender_id"],
+        }),
+        "search_guidelines": lambda: tools.search_guidelines.ainvoke({
+            "query": "gift funds reserves",
+        }),
+        "get_guidelines_for_programs": lambda: tools.get_guidelines_for_programs.ainvoke({
+            "lender_id": fixtures["lender_id"],
+            "categories": ["RESERVES", "GIFT_FUNDS"],
+        }),
+    }
+
+    try:
+        from core.tools1 import query_document_vector_store
+    except ImportError as e:
+        print(f"⚠️  Skipping query_document_vector_store: {e}")
+    else:
+        cases["query_document_vector_store"] = lambda: query_document_vector_store.ainvoke({
+            "query": f"{fixtures['program_name']} reserve requirements", "k": 5,
+        })
+
+    return cases
+
+
+# --- Runner ---
+
+def _ms(values: List[float]) -> float:
+    return round(statistics.median(values) * 1000, 3)
+
+
+async def run_case(fn: Callable[[], Awaitable[Any]], rounds: int, warmup: int) -> Dict[str, Any]:
+    for _ in range(warmup):
+        await fn()
+
+    totals, db, fuzzy = [], [], []
+    for _ in range(rounds):
+        BREAKDOWN.reset()
+        start = time.perf_counter()
+        await fn()
+        totals.append(time.perf_counter() - start)
+        db.append(BREAKDOWN.db)
+        fuzzy.append(BREAKDOWN.fuzzy)
+
+    python = [max(0.0, t - d - f) for t, d, f in zip(totals, db, fuzzy)]
+    ms = [t * 1000 for t in totals]
+    return {
+        "rounds": rounds,
+        "min_ms": round(min(ms), 3),
+        "median_ms": round(statistics.median(ms), 3),
+        "mean_ms": round(statistics.fmean(ms), 3),
+        "p95_ms": round(percentile(ms, 95), 3),
+        "max_ms": round(max(ms), 3),
+        "db_ms": _ms(db),
+        "fuzzy_ms": _ms(fuzzy),
+        "python_ms": _ms(python),
+    }
+
+
+async def run_scale(rounds: int, warmup: int, only: Optional[List[str]]) -> Dict[str, Any]:
+    from db.session import engine
+
+    try:
+        fixtures = await load_fixtures()
+        results = {}
+        for name, fn in build_cases(fixtures).items():
+            if only and name not in only:
+                continue
+            results[name] = await run_case(fn, rounds, warmup)
+        return results
+    finally:
+        await engine.dispose()
+
+
+def print_table(scale: float, results: Dict[str, Any]):
+    print(f"\n--- Scale {scale:g}x ---")
+    print(f"{'case':<30} {'min':>9} {'median':>9} {'p95':>9} {'db':>9} {'fuzzy':>9} {'python':>9}  (ms)")
+    for name, r in results.items():
+        print(
+            f"{name:<30} {r['min_ms']:>9} {r['median_ms']:>9} {r['p95_ms']:>9} "
+            f"{r['db_ms']:>9} {r['fuzzy_ms']:>9} {r['python_ms']:>9}"
+        )
+
+
+def check_regressions(baseline: Dict[str, Any], current: Dict[str, Any], thresholds: Dict[str, Any]) -> List[str]:
+    """Returns a message per case whose median exceeds its baseline by more than its threshold."""
+    default_pct = thresholds.get("max_regression_pct", 25)
+    per_case = thresholds.get("cases", {})
+    failures = []
+    for scale, cases in current["scales"].items():
+        for name, result in cases.items():
+            old = baseline.get("scales", {}).get(scale, {}).get(name)
+            if not old:
+                continue
+            limit = per_case.get(name, {}).get("max_regression_pct", default_pct)
+            delta_pct = (result["median_ms"] - old["median_ms"]) / old["median_ms"] * 100
+            if delta_pct > limit:
+                failures.append(
+                    f"{name} @ {scale}x: median {old['median_ms']}ms -> {result['median_ms']}ms "
+                    f"(+{delta_pct:.1f}%, limit {limit}%)"
+                )
+    return failures
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark core/tools.py against a seeded scratch database.")
+    parser.add_argument("--database-url", default=os.environ.get("BENCH_DATABASE_URL"),
+                        help="Scratch database URL (wiped!). Defaults to $BENCH_DATABASE_URL.")
+    parser.add_argument("--scales", default="1,10,100", help="Comma-separated data scale factors.")
+    parser.add_argument("--rounds", type=int, default=30)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--only", default=None, help="Comma-separated case names to run.")
+    parser.add_argument("--output", help="Write results JSON to this path.")
+    parser.add_argument("--baseline", help="Results JSON to check for regressions against.")
+    parser.add_argument("--thresholds", default=str(DEFAULT_THRESHOLDS), help="Regression threshold config.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    if not args.database_url:
+        print("❌ A scratch database is required: pass --database-url or set BENCH_DATABASE_URL.")
+        return 2
+
+    # Settings are read at import time, so point everything at the scratch DB first
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("LLM_PROVIDER", "stub")
+
+    from core import tools
+    from db.session import engine
+
+    instrument(engine, tools)
+
+    only = args.only.split(",") if args.only else None
+    report = {"rounds": args.rounds, "seed": args.seed, "datasets": {}, "scales": {}}
+    for scale in (float(s) for s in args.scales.split(",")):
+        key = f"{scale:g}"
+        print(f"Seeding scale {key}x...")
+        reset_and_migrate()
+        report["datasets"][key] = seed(scale, args.seed)
+        report["scales"][key] = asyncio.run(run_scale(args.rounds, args.warmup, only))
+        print_table(scale, report["scales"][key])
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+        print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        thresholds = json.loads(Path(args.thresholds).read_text())
+        failures = check_regressions(baseline, report, thresholds)
+        if failures:
+            print("\n❌ Regressions over threshold:")
+            for failure in failures:
+                print(f"  - {failure}")
+            return 1
+        print("\n✅ No regressions over threshold.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
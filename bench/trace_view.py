@@ -0,0 +1,110 @@
+# bench/trace_view.py
+"""
+Prints traces exported by core/tracing.py (OTLP/JSON lines) as indented span
+trees with durations, slowest trace first.
+
+    python -m bench.trace_view traces.jsonl
+    python -m bench.trace_view traces.jsonl --trace <trace_id>
+    python -m bench.trace_view traces.jsonl --last 3
+"""
+import argparse
+import json
+import sys
+from collections import defaultdict
+from typing import Any, Dict, List
+
+
+def load_spans(path: str) -> List[Dict[str, Any]]:
+    spans = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            payload = json.loads(line)
+            for resource_spans in payload.get("resourceSpans", []):
+                for scope_spans in resource_spans.get("scopeSpans", []):
+                    spans.extend(scope_spans.get("spans", []))
+    return spans
+
+
+def _attr(span: Dict[str, Any], key: str):
+    for attr in span.get("attributes", []):
+        if attr["key"] == key:
+            return next(iter(attr["value"].values()))
+    return None
+
+
+def _duration_ms(span: Dict[str, Any]) -> float:
+    return (int(span["endTimeUnixNano"]) - int(span["startTimeUnixNano"])) / 1e6
+
+
+def _label(span: Dict[str, Any]) -> str:
+    details = []
+    for key in ("gen_ai.usage.input_tokens", "gen_ai.usage.output_tokens", "gen_ai.response.tool_calls", "db.rowcount"):
+        value = _attr(span, key)
+        if value is not None:
+            details.append(f"{key.rsplit('.', 1)[-1]}={value}")
+    statement = _attr(span, "db.statement")
+    if statement:
+        details.append(" ".join(statement.split())[:80])
+    if span.get("status", {}).get("code") == 2:
+        details.append(f"ERROR {span['status'].get('message', '')}")
+    return f"{span['name']}" + (f"  [{'; '.join(details)}]" if details else "")
+
+
+def print_trace(spans: List[Dict[str, Any]]):
+    by_id = {s["spanId"]: s for s in spans}
+    children = defaultdict(list)
+    roots = []
+    for s in spans:
+        parent = s.get("parentSpanId")
+        if parent and parent in by_id:
+            children[parent].append(s)
+        else:
+            roots.append(s)
+
+    trace_start = min(int(s["startTimeUnixNano"]) for s in spans)
+
+    def walk(s, depth):
+        offset = (int(s["startTimeUnixNano"]) - trace_start) / 1e6
+        print(f"{offset:>9.1f}ms {_duration_ms(s):>9.1f}ms  {'  ' * depth}{_label(s)}")
+        for child in sorted(children[s["spanId"]], key=lambda c: int(c["startTimeUnixNano"])):
+            walk(child, depth + 1)
+
+    for root in sorted(roots, key=lambda r: int(r["startTimeUnixNano"])):
+        walk(root, 0)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Print exported traces as span trees.")
+    parser.add_argument("path", help="Trace file written by the 'file' exporter.")
+    parser.add_argument("--trace", help="Only print this trace id.")
+    parser.add_argument("--last", type=int, default=None, help="Only print the N most recent traces.")
+    args = parser.parse_args(argv)
+
+    traces = defaultdict(list)
+    for s in load_spans(args.path):
+        traces[s["traceId"]].append(s)
+
+    if args.trace:
+        if args.trace not in traces:
+            print(f"Trace '{args.trace}' not found.")
+            return 1
+        selected = [args.trace]
+    else:
+        # Most recent traces when --last is given, otherwise slowest first
+        by_start = sorted(traces, key=lambda t: min(int(s["startTimeUnixNano"]) for s in traces[t]))
+        selected = by_start[-args.last:] if args.last else by_start
+        if not args.last:
+            selected.sort(key=lambda t: -max(_duration_ms(s) for s in traces[t]))
+
+    for trace_id in selected:
+        spans = traces[trace_id]
+        total = max(_duration_ms(s) for s in spans)
+        print(f"\n=== Trace {trace_id} ({len(spans)} spans, {total:.1f}ms) ===")
+        print_trace(spans)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
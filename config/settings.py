@@ -4,12 +4,74 @@ from pathlib import Path
 CROMA_DB_DIR = Path("./cromaDb")
 class Settings(BaseSettings):
     DATABASE_URL: str
-    GROQ_API_KEY: str
+    # Only required when LLM_PROVIDER is "groq".
+    GROQ_API_KEY: str = ""
+
+    # LLM provider used to build the agent, summarizer and SQL-generator models.
+    # "groq" talks to the Groq API; "stub" is a deterministic offline model for
+    # load tests and benchmarks (see core/llm.py).
+    LLM_PROVIDER: str = "groq"
+    LLM_MODEL: str = "openai/gpt-oss-20b"
+    # Simulated per-call latency of the stub provider, in milliseconds.
+    LLM_STUB_LATENCY_MS: int = 0
+    # Optional JSON file with scripted stub replies and tool calls.
+    LLM_STUB_SCRIPT: str | None = None
+
+    # Span tracing (see core/tracing.py). TRACE_EXPORTER is "file" or "otlp".
+    TRACING_ENABLED: bool = False
+    TRACE_EXPORTER: str = "file"
+    TRACE_FILE: str = "traces.jsonl"
+    TRACE_OTLP_ENDPOINT: str = "http://localhost:4318/v1/traces"
+    TRACE_SERVICE_NAME: str = "mortgage-chatbot"
+
+    # Prometheus metrics served at /metrics (see core/metrics.py).
+    METRICS_ENABLED: bool = True
+
+    # Per-statement SQL stats and slow-query log (see db/query_stats.py).
+    # SLOW_QUERY_LOG is a JSON-lines file; when unset slow queries are printed.
+    QUERY_STATS_ENABLED: bool = True
+    SLOW_QUERY_MS: float = 200
+    SLOW_QUERY_LOG: str | None = None
+    # /api/v1/admin endpoints require this value in X-Admin-Key; unset, they are disabled.
+    ADMIN_API_KEY: str | None = None
+
+    # Guardrails for LLM-generated SQL (see db/sql_guard.py). Queries run
+    # read-only, are cancelled after SQL_ASSISTANT_TIMEOUT_MS, return at most
+    # SQL_ASSISTANT_MAX_ROWS rows and are refused when EXPLAIN estimates a
+    # cost above SQL_ASSISTANT_MAX_COST (0 disables the cost check).
+    SQL_ASSISTANT_TIMEOUT_MS: int = 5000
+    SQL_ASSISTANT_MAX_ROWS: int = 200
+    SQL_ASSISTANT_MAX_COST: float = 100000
+    # Try the pre-written analytics templates (core/sql_templates.py) before
+    # asking the LLM to write SQL.
+    SQL_TEMPLATES_ENABLED: bool = True
+
+    # In-process DuckDB replica of the catalog tables for LLM-generated
+    # analytics SQL (see db/analytics_replica.py; needs `pip install duckdb`).
+    ANALYTICS_REPLICA_ENABLED: bool = False
+    ANALYTICS_REPLICA_PATH: str = "analytics_replica.duckdb"
+    ANALYTICS_REPLICA_MEMORY_LIMIT: str = "512MB"
+    ANALYTICS_REPLICA_THREADS: int = 2
+
+    # Largest batch accepted by POST /api/v1/scenarios/batch.
+    SCENARIO_BATCH_MAX: int = 50000
+
+    # In-memory lender/program catalog (db/catalog.py): how often each worker
+    # checks the catalog fingerprint and reloads on change (0 disables), and
+    # whether it LISTENs for changes published by writers in other processes.
+    CATALOG_REFRESH_SECONDS: int = 60
+    CATALOG_LISTEN_ENABLED: bool = True
 
     VSTORE_DIR: str = str(CROMA_DB_DIR)
     COLLECTION_NAME: str = "loan_guidelines"
     EMBEDDING_MODEL: str = "sentence-transformers/all-MiniLM-L6-v2"
 
+    # Vector store behind query_document_vector_store (see core/vector_store.py):
+    # "chroma" (VSTORE_DIR) or "memmap", an exact-search float16 index in
+    # VECTOR_INDEX_DIR shared by workers through the page cache (pip install numpy).
+    VECTOR_BACKEND: str = "chroma"
+    VECTOR_INDEX_DIR: str = "vectorIndex"
+
     # Allow extra keys in the .env (like PROJECT_NAME, PORT) so Alembic
     # and other tools can load the file without raising validation errors.
     model_config = SettingsConfigDict(env_file=".env", extra="allow")
@@ -1,19 +1,21 @@
 # core/agent.py
-import os
 from typing import Annotated, Literal
 from typing_extensions import TypedDict
-from langchain_groq import ChatGroq
 from langchain_core.messages import BaseMessage
 from langgraph.graph import StateGraph, START, END
 # from langgraph.tool_executor import ToolExecutor
 from langgraph.prebuilt import ToolNode
 
-from config.settings import settings
+from core.llm import get_chat_model, AGENT
 from core.tools import (
     get_available_lenders,
     get_loan_programs_by_lender,
     get_program_guidelines,
+    get_guidelines_for_programs,
+    search_guidelines,
     find_eligibility_rules,
+    get_eligibility_curve,
+    compare_programs,
     query_database_assistant,
     find_programs_by_scenario
 )
@@ -22,20 +24,19 @@ from core.tools1 import (
     query_document_vector_store
 )
 # 1. Define the LLM
-# We use a model that is good at tool calling, as recommended by Groq docs.
-# 'llama3-70b-8192' is a great choice.
-llm = ChatGroq(
-    model="openai/gpt-oss-20b",
-    groq_api_key=settings.GROQ_API_KEY,
-    temperature=0.0
-)
+# The provider (Groq or the offline stub) is selected by settings.LLM_PROVIDER.
+llm = get_chat_model(AGENT)
 
 # 2. Define the list of available tools
 tools = [
     get_available_lenders,
     get_loan_programs_by_lender,
     get_program_guidelines,
+    get_guidelines_for_programs,
+    search_guidelines,
     find_eligibility_rules,
+    get_eligibility_curve,
+    compare_programs,
     query_database_assistant,
     find_programs_by_scenario,
     get_conversation_history,
@@ -86,18 +87,23 @@ If the summary is empty or the previous turn ended, use this to find the *new* i
 
 1.  **Scenario Intent (HIGHEST PRIORITY):**
     * If the user's query contains borrower qualifications (FICO, loan amount, LTV, etc.), your tool is `find_programs_by_scenario`.
+    * For investor DSCR scenarios, pass the property's DSCR as `dscr` instead of searching documents for DSCR minimums.
     * If parameters are missing, your **ONLY** action is to ask for them. (This sets the "Scenario Intent" that the Core Directive above will stick to).
 
 2.  **Program-Specific Intent:**
     * If the user asks about a *specific program name* (e.g., "What are the rules for DSCR Plus?"), your tool is `find_eligibility_rules`.
+    * For "what if" questions about a program (e.g., "What if the FICO were 20 points higher?", "How much LTV do I gain under $1M?"), call `get_eligibility_curve` once instead of calling `find_eligibility_rules` for each value.
+    * To compare several named programs (e.g., "DSCR Plus vs Flex Select at 700 FICO"), call `compare_programs` once with all the names instead of calling `find_eligibility_rules` per program.
 
 3.  **General Question Intent:**
     * If the user asks a general, open-ended question (e.g., "What's the policy on gift funds?"), use `query_document_vector_store` directly.
+    * For keyword-heavy questions that name specific terms (e.g., "Which programs allow non-warrantable condos?"), use `search_guidelines` first; it searches all guideline text, optionally within a lender, program or category.
 
 **Step 2: Use Structured Tools (After Triage & Parameter Collection)**
 * Use `find_programs_by_scenario` for scenarios (once all parameters are collected).
 * Use `find_eligibility_rules` for program-specific questions.
 * Use `get_program_guidelines` for questions about a specific program's rules.
+* Use `get_guidelines_for_programs` for guideline questions across several programs or a whole lender (e.g., "gift fund rules for all ARC Home programs") instead of calling `get_program_guidelines` per program.
 * Use `get_available_lenders` or `get_loan_programs_by_lender` for lists.
 
 **Step 3: Enhance with Vector Store**
@@ -120,7 +126,7 @@ class AgentState(TypedDict):
 # Nodes are the "steps" in our agent's logic.
 
 async def call_model(state: AgentState) -> dict:
-    """The node that calls the Groq LLM."""
+    """The node that calls the LLM."""
     messages = state['messages']
     # Invoke the LLM with the current list of messages
     response = await llm_with_tools.ainvoke(messages)
@@ -171,4 +177,4 @@ workflow.add_edge("tools", "agent")
 # This creates the runnable `chain` object.
 chain = workflow.compile()
 
-# Note: We still export 'llm' for the summary service in 'services.py'.
\ No newline at end of file
+# Note: The summary service in 'services.py' builds its own model via core.llm.
\ No newline at end of file
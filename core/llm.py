@@ -0,0 +1,209 @@
+# core/llm.py
+"""
+LLM provider layer.
+
+Every chat model the app uses (the agent, the conversation summarizer and the
+SQL generator behind `query_database_assistant`) is built here, from the
+provider selected by `settings.LLM_PROVIDER`:
+
+- "groq": the production ChatGroq model.
+- "stub": a deterministic, offline model with configurable latency and
+  scripted tool calls, so the graph, DB tools and streaming can be load-tested
+  and benchmarked without a Groq key or network access.
+"""
+import asyncio
+import json
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from config.settings import settings
+
+# The roles a model can be built for.
+AGENT = "agent"
+SUMMARIZER = "summarizer"
+SQL_GENERATOR = "sql"
+
+ROLES = (AGENT, SUMMARIZER, SQL_GENERATOR)
+
+# --- Stub Provider ---
+
+DEFAULT_STUB_SUMMARY = "Active Intent: General Question. Topic: stub conversation summary."
+DEFAULT_STUB_SQL = 'SELECT COUNT(*) AS lender_count FROM lender'
+
+
+def _approx_tokens(text: str) -> int:
+    """Rough token estimate (~4 characters per token) used for stub usage metadata."""
+    return max(1, len(text) // 4) if text else 0
+
+
+def _message_text(message: BaseMessage) -> str:
+    content = message.content
+    if isinstance(content, str):
+        return content
+    return json.dumps(content, default=str)
+
+
+class StubChatModel(BaseChatModel):
+    """
+    A deterministic chat model for offline runs.
+
+    The reply only depends on the input messages and the script, never on
+    call order, so many concurrent conversations can share one instance.
+
+    Script format (JSON), all keys optional:
+
+        {
+          "agent": [
+            {"match": "fico", "steps": [
+              {"tool_calls": [{"name": "find_programs_by_scenario",
+                               "args": {"fico_score": 720, ...}}]},
+              {"content": "Here are the matching programs..."}
+            ]}
+          ],
+          "summarizer": "fixed summary text",
+          "sql": "SELECT ..."
+        }
+
+    For the agent role, the first script whose `match` substring appears in the
+    latest user message is used (a script without `match` matches anything).
+    The step to play is the number of AI messages already produced since that
+    user message, so a two-step script issues its tool calls, receives the tool
+    results, and then answers. Once the steps run out the model answers with a
+    short deterministic echo of the question.
+    """
+
+    role: str = AGENT
+    latency_ms: int = 0
+    script: Dict[str, Any] = {}
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    def bind_tools(self, tools, *, tool_choice: Optional[str] = None, **kwargs):
+        # Tool calls come from the script, so the schemas are not needed.
+        return self
+
+    # --- Reply selection ---
+
+    def _agent_reply(self, messages: List[BaseMessage]) -> AIMessage:
+        last_human_idx = -1
+        for i, msg in enumerate(messages):
+            if isinstance(msg, HumanMessage):
+                last_human_idx = i
+        question = _message_text(messages[last_human_idx]) if last_human_idx >= 0 else ""
+        step_idx = sum(
+            1 for msg in messages[last_human_idx + 1:] if isinstance(msg, AIMessage)
+        )
+
+        steps: List[Dict[str, Any]] = []
+        for entry in self.script.get(AGENT, []):
+            match = entry.get("match")
+            if not match or match.lower() in question.lower():
+                steps = entry.get("steps", [])
+                break
+
+        if step_idx < len(steps):
+            step = steps[step_idx]
+            tool_calls = [
+                {
+                    "name": call["name"],
+                    "args": call.get("args", {}),
+                    # Deterministic ids keep repeated runs comparable
+                    "id": call.get("id") or f"stub_call_{step_idx}_{n}",
+                }
+                for n, call in enumerate(step.get("tool_calls", []))
+            ]
+            return AIMessage(content=step.get("content", ""), tool_calls=tool_calls)
+
+        return AIMessage(content=f"[stub] Answer to: {question}")
+
+    def _reply(self, messages: List[BaseMessage]) -> AIMessage:
+        if self.role == SUMMARIZER:
+            reply = AIMessage(content=self.script.get(SUMMARIZER, DEFAULT_STUB_SUMMARY))
+        elif self.role == SQL_GENERATOR:
+            reply = AIMessage(content=self.script.get(SQL_GENERATOR, DEFAULT_STUB_SQL))
+        else:
+            reply = self._agent_reply(messages)
+
+        input_tokens = sum(_approx_tokens(_message_text(m)) for m in messages)
+        output_tokens = _approx_tokens(_message_text(reply))
+        reply.usage_metadata = {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        }
+        reply.response_metadata = {"model_name": f"stub-{self.role}"}
+        return reply
+
+    # --- BaseChatModel interface ---
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
+
+
+def load_stub_script(path: Optional[str]) -> Dict[str, Any]:
+    """Loads a stub script from a JSON file. Returns an empty script if no path is set."""
+    if not path:
+        return {}
+    with open(Path(path), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+# --- Provider Registry ---
+
+def _build_groq(role: str) -> BaseChatModel:
+    from langchain_groq import ChatGroq
+
+    return ChatGroq(
+        model=settings.LLM_MODEL,
+        groq_api_key=settings.GROQ_API_KEY,
+        temperature=0.0
+    )
+
+
+def _build_stub(role: str) -> BaseChatModel:
+    return StubChatModel(
+        role=role,
+        latency_ms=settings.LLM_STUB_LATENCY_MS,
+        script=load_stub_script(settings.LLM_STUB_SCRIPT),
+    )
+
+
+PROVIDERS: Dict[str, Callable[[str], BaseChatModel]] = {
+    "groq": _build_groq,
+    "stub": _build_stub,
+}
+
+
+@lru_cache(maxsize=None)
+def get_chat_model(role: str) -> BaseChatModel:
+    """
+    Returns the chat model for a role ("agent", "summarizer" or "sql"), built
+    from the configured provider. Models are cached per role, so callers share
+    one client instead of constructing a new one per request.
+    """
+    if role not in ROLES:
+        raise ValueError(f"Unknown LLM role '{role}'. Valid roles: {', '.join(ROLES)}")
+
+    provider = settings.LLM_PROVIDER.lower()
+    try:
+        builder = PROVIDERS[provider]
+    except KeyError:
+        raise ValueError(
+            f"Unknown LLM_PROVIDER '{settings.LLM_PROVIDER}'. Valid providers: {', '.join(PROVIDERS)}"
+        )
+    return builder(role)
@@ -0,0 +1,366 @@
+# core/metrics.py
+"""
+Prometheus metrics for the chat service, served as text at GET /metrics.
+
+Histograms cover chat turn latency, time to the first answer chunk, tool
+latency, LLM call latency and token counts, and SQL statement latency. Gauges
+report saturation (in-flight chat streams, DB pool usage, queued summarizer
+runs) so autoscaling can key off real load rather than CPU, and counters track
+stream and per-tool errors.
+
+Metrics are kept in-process and rendered in the Prometheus text exposition
+format, so no client library is needed. With several uvicorn workers each
+worker reports its own series; scrape them individually. `setup_metrics()`
+(called from main.py) installs the SQLAlchemy hooks and pool gauges.
+"""
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import AsyncCallbackHandler
+
+from config.settings import settings
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+TOKEN_BUCKETS = (16, 64, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768)
+
+_registry: List["_Metric"] = []
+_installed = False
+
+
+# --- Metric Types ---
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_str(names: Iterable[str], values: Iterable[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    """Base for a named metric family with optional labels."""
+
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children: Dict[Tuple[str, ...], object] = {}
+        if not self.labelnames:
+            # Unlabelled series are exported as zero from the start
+            self.labels()
+        _registry.append(self)
+
+    def labels(self, *values: str):
+        key = tuple(str(v) for v in values)
+        if len(key) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _default(self):
+        return self.labels()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class _Value:
+    def __init__(self):
+        self.value = 0.0
+        self.lock = threading.Lock()
+
+    def inc(self, amount: float = 1):
+        with self.lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1):
+        with self.lock:
+            self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1):
+        self._default().inc(amount)
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_label_str(self.labelnames, key)} {_format_value(child.value)}"
+            for key, child in list(self._children.items())
+        ]
+
+
+class Gauge(_Metric):
+    """A gauge that is either set directly or read from a callback at scrape time."""
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._function: Optional[Callable[[], float]] = None
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1):
+        self._default().inc(amount)
+
+    def dec(self, amount: float = 1):
+        self._default().dec(amount)
+
+    def set(self, value: float):
+        self._default().set(value)
+
+    def set_function(self, fn: Callable[[], float]):
+        self._function = fn
+
+    def samples(self) -> List[str]:
+        if self._function is not None:
+            try:
+                return [f"{self.name} {_format_value(self._function())}"]
+            except Exception:
+                return []
+        return [
+            f"{self.name}{_label_str(self.labelnames, key)} {_format_value(child.value)}"
+            for key, child in list(self._children.items())
+        ]
+
+
+class _HistogramValue:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self.lock:
+            self.sum += value
+            self.count += 1
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.counts[i] += 1
+                    break
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (), buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float):
+        self._default().observe(value)
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, child in list(self._children.items()):
+            with child.lock:
+                counts, total, count = list(child.counts), child.sum, child.count
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                labels = _label_str(self.labelnames, key, ("le", _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _label_str(self.labelnames, key, ("le", "+Inf"))
+            lines.append(f"{self.name}_bucket{labels} {count}")
+            lines.append(f"{self.name}_sum{_label_str(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_label_str(self.labelnames, key)} {count}")
+        return lines
+
+
+def render() -> str:
+    """Renders every registered metric in the Prometheus text format."""
+    return "\n".join(metric.render() for metric in _registry) + "\n"
+
+
+# --- Metrics ---
+
+CHAT_TURN_SECONDS = Histogram(
+    "chat_turn_duration_seconds", "Time from request to the end of the chat stream."
+)
+CHAT_FIRST_CHUNK_SECONDS = Histogram(
+    "chat_time_to_first_chunk_seconds", "Time from request to the first answer chunk."
+)
+CHAT_STREAMS_IN_FLIGHT = Gauge(
+    "chat_streams_in_flight", "Chat streams currently being generated."
+)
+CHAT_ERRORS = Counter(
+    "chat_stream_errors_total", "Chat turns that ended with an error payload."
+)
+
+TOOL_SECONDS = Histogram(
+    "tool_call_duration_seconds", "Agent tool call latency.", ("tool",)
+)
+TOOL_ERRORS = Counter(
+    "tool_errors_total", "Tool calls that raised or returned an error message.", ("tool",)
+)
+
+LLM_SECONDS = Histogram(
+    "llm_call_duration_seconds", "LLM call latency.", ("model",)
+)
+LLM_TOKENS = Histogram(
+    "llm_call_tokens", "Tokens per LLM call.", ("model", "direction"), buckets=TOKEN_BUCKETS
+)
+
+DB_QUERY_SECONDS = Histogram(
+    "db_query_duration_seconds", "SQL statement latency.", ("operation",), buckets=DB_BUCKETS
+)
+DB_POOL_SIZE = Gauge("db_pool_size", "Configured DB connection pool size.")
+DB_POOL_CHECKED_OUT = Gauge("db_pool_checked_out", "DB connections currently checked out.")
+DB_POOL_OVERFLOW = Gauge("db_pool_overflow", "DB connections open beyond the pool size.")
+
+SUMMARIZER_QUEUE_DEPTH = Gauge(
+    "summarizer_queue_depth", "Background conversation summaries queued or running."
+)
+
+SQL_ASSISTANT_QUERIES = Counter(
+    "sql_assistant_queries_total", "query_database_assistant questions by template name, or llm.", ("source",)
+)
+
+
+def enabled() -> bool:
+    return settings.METRICS_ENABLED
+
+
+# How core/tools.py failure strings start (after their 💥/❌ marker): exceptions,
+# invalid arguments and names that matched nothing. "⚠️ No ... found" is an answer.
+TOOL_ERROR_PREFIXES = ("Error", "Invalid", "Could not find", "Provide")
+
+
+def is_tool_error(output) -> bool:
+    """Tools catch their own exceptions and return an error string instead."""
+    text = str(getattr(output, "content", output)).lstrip("💥❌⚠️ ")
+    return text.startswith(TOOL_ERROR_PREFIXES)
+
+
+# --- LangChain / LangGraph Instrumentation ---
+
+class MetricsCallbackHandler(AsyncCallbackHandler):
+    """Times tool and LLM runs from LangChain callbacks."""
+
+    run_inline = True
+
+    def __init__(self):
+        self.started: Dict[UUID, Tuple[str, float]] = {}
+
+    async def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        name = (serialized or {}).get("name") or kwargs.get("name") or "tool"
+        self.started[run_id] = (name, time.perf_counter())
+
+    async def on_tool_end(self, output, *, run_id, **kwargs):
+        started = self.started.pop(run_id, None)
+        if started is None:
+            return
+        name, start = started
+        TOOL_SECONDS.labels(name).observe(time.perf_counter() - start)
+        if is_tool_error(output):
+            TOOL_ERRORS.labels(name).inc()
+
+    async def on_tool_error(self, error, *, run_id, **kwargs):
+        started = self.started.pop(run_id, None)
+        if started is not None:
+            name, start = started
+            TOOL_SECONDS.labels(name).observe(time.perf_counter() - start)
+            TOOL_ERRORS.labels(name).inc()
+
+    async def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        model = (metadata or {}).get("ls_model_name") or (serialized or {}).get("name") or "llm"
+        self.started[run_id] = (model, time.perf_counter())
+
+    async def on_llm_start(self, serialized, prompts, *, run_id, metadata=None, **kwargs):
+        model = (metadata or {}).get("ls_model_name") or "llm"
+        self.started[run_id] = (model, time.perf_counter())
+
+    async def on_llm_end(self, response, *, run_id, **kwargs):
+        from core.tracing import llm_usage
+
+        started = self.started.pop(run_id, None)
+        if started is None:
+            return
+        model, start = started
+        LLM_SECONDS.labels(model).observe(time.perf_counter() - start)
+        usage = llm_usage(response)
+        LLM_TOKENS.labels(model, "input").observe(usage["input_tokens"])
+        LLM_TOKENS.labels(model, "output").observe(usage["output_tokens"])
+
+    async def on_llm_error(self, error, *, run_id, **kwargs):
+        started = self.started.pop(run_id, None)
+        if started is not None:
+            model, start = started
+            LLM_SECONDS.labels(model).observe(time.perf_counter() - start)
+
+
+# --- SQLAlchemy Instrumentation ---
+
+def instrument_engine(engine):
+    """Times every statement and reports pool usage at scrape time."""
+    from db import statement_hooks
+
+    def _record(statement, elapsed_ms, rowcount, error, executemany):
+        if error is None:
+            operation = statement.split(None, 1)[0].upper() if statement else "SQL"
+            DB_QUERY_SECONDS.labels(operation).observe(elapsed_ms / 1000)
+
+    statement_hooks.add_handler(engine, _record)
+
+    pool = engine.sync_engine.pool
+    if hasattr(pool, "checkedout"):
+        DB_POOL_SIZE.set_function(pool.size)
+        DB_POOL_CHECKED_OUT.set_function(pool.checkedout)
+        DB_POOL_OVERFLOW.set_function(lambda: max(0, pool.overflow()))
+
+
+# --- Setup ---
+
+def setup_metrics(engine=None):
+    """Installs the engine hooks when settings.METRICS_ENABLED is set."""
+    global _installed
+    if not settings.METRICS_ENABLED or _installed:
+        return
+    _installed = True
+    if engine is not None:
+        instrument_engine(engine)
+    print("✅ Metrics enabled at /metrics")
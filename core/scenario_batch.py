@@ -0,0 +1,298 @@
+# core/scenario_batch.py
+"""
+Bulk eligibility checks for POST /api/v1/scenarios/batch.
+
+Scenarios arrive as a JSON array or CSV, with the same fields as
+find_programs_by_scenario. Instead of one join per scenario, the batch reads
+the eligibility matrix (the scenario_search view) once and evaluates every
+scenario against an in-memory index of it:
+
+- rules are grouped by (occupancy, purpose);
+- within a group, each rule's FICO and loan-amount bounds become indices into
+  the group's sorted breakpoints, so "does the rule contain this FICO" is an
+  integer comparison on the scenario's region;
+- the programs accepted by a (FICO region, amount region[, DSCR]) cell are
+  computed once, keeping each program's best rule sorted by max LTV, so a
+  scenario's matches are a bisect on its LTV.
+
+Match semantics are the same as tools._scenario_query.
+
+The index stays resident between batches and is rebuilt when the catalog
+snapshot changes (db/catalog.py), which happens in every worker whenever a
+change to lender data is published.
+
+Results stream back as NDJSON, one 'result' line per input in input order
+(invalid rows carry an 'error'), then a 'summary' line with the throughput.
+"""
+import csv
+import io
+import json
+import math
+import time
+from bisect import bisect_left, bisect_right
+from typing import AsyncGenerator, Dict, List, Optional, Sequence, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.schemas import ScenarioInput, StreamScenarioResult, StreamScenarioSummary
+from db import catalog
+from db.models import LoanPurposeType, OccupancyType
+from db.views import scenario_search
+
+# Result lines are flushed to the response in groups of this many
+FLUSH_EVERY = 500
+
+# Per (occupancy, purpose) limit on memoized cells; DSCR values make the key space open-ended
+MAX_CACHED_CELLS = 100_000
+
+# (index, scenario, error): exactly one of scenario / error is set
+ParsedScenario = Tuple[int, Optional[ScenarioInput], Optional[str]]
+
+
+# --- Parsing ---
+
+def _validate(index: int, raw: Dict) -> ParsedScenario:
+    try:
+        scenario = ScenarioInput.model_validate(raw)
+    except ValidationError as e:
+        problems = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+        return index, None, problems
+    try:
+        scenario.occupancy = OccupancyType[scenario.occupancy.strip().upper()].value
+    except KeyError:
+        return index, None, f"Invalid occupancy '{scenario.occupancy}'. Valid types are: {', '.join(e.name for e in OccupancyType)}"
+    try:
+        scenario.loan_purpose = LoanPurposeType[scenario.loan_purpose.strip().upper()].value
+    except KeyError:
+        return index, None, f"Invalid loan purpose '{scenario.loan_purpose}'. Valid types are: {', '.join(e.name for e in LoanPurposeType)}"
+    return index, scenario, None
+
+
+def parse_scenarios(body: bytes, content_type: str) -> List[ParsedScenario]:
+    """
+    Parses a JSON array (or {"scenarios": [...]}) or a CSV with a header row.
+    Raises ValueError when the body as a whole can't be read; per-row problems
+    are returned as errors so the rest of the batch still runs.
+    """
+    text_body = body.decode("utf-8-sig")
+    if "csv" in content_type:
+        reader = csv.DictReader(io.StringIO(text_body))
+        if not reader.fieldnames:
+            raise ValueError("CSV body needs a header row")
+        rows = [{k.strip(): (v.strip() or None) for k, v in row.items() if k} for row in reader]
+    else:
+        try:
+            data = json.loads(text_body)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON: {e}")
+        rows = data.get("scenarios") if isinstance(data, dict) else data
+        if not isinstance(rows, list):
+            raise ValueError('Expected a JSON array of scenarios or {"scenarios": [...]}')
+    return [
+        _validate(i, row) if isinstance(row, dict) else (i, None, "Scenario must be an object")
+        for i, row in enumerate(rows)
+    ]
+
+
+# --- Matrix index ---
+
+def _bound(value) -> Optional[float]:
+    return float(value) if value is not None else None
+
+
+def _region(bounds: Sequence[float], value: float) -> int:
+    """
+    Breakpoints b0 < b1 < ... split the axis into regions: 2j+1 is the point
+    bj and 2j the open interval just below it. A rule whose inclusive bounds
+    are breakpoints lo..hi (hi past the end when unbounded) covers the point
+    regions lo <= j <= hi and the interval regions lo < j <= hi.
+    """
+    j = bisect_left(bounds, value)
+    return 2 * j + 1 if j < len(bounds) and bounds[j] == value else 2 * j
+
+
+class _Rule:
+    __slots__ = (
+        "program_id", "sort_key", "max_ltv", "min_dscr", "max_dscr", "fico", "amount", "reserves_months", "_fragment"
+    )
+
+    def __init__(self, row):
+        self.program_id = row.loanProgramId
+        self.sort_key = (row.lenderName, row.programName)
+        # NULL max LTV means no limit
+        self.max_ltv = _bound(row.maxLtv) if row.maxLtv is not None else math.inf
+        self.min_dscr = _bound(row.minDscr)
+        self.max_dscr = _bound(row.maxDscr)
+        self.fico = (row.minFicoScore, row.maxFicoScore)
+        self.amount = (_bound(row.minLoanAmount), _bound(row.maxLoanAmount))
+        self.reserves_months = row.reservesMonths
+        self._fragment = None
+
+    @property
+    def fragment(self) -> str:
+        """The rule as a serialized ScenarioProgramMatch, built on first use."""
+        if self._fragment is None:
+            self._fragment = json.dumps({
+                "lender": self.sort_key[0],
+                "program": self.sort_key[1],
+                "loan_program_id": self.program_id,
+                "max_ltv": self.max_ltv if self.max_ltv != math.inf else None,
+                "reserves_months": self.reserves_months,
+            }, separators=(",", ":"))
+        return self._fragment
+
+    def accepts_dscr(self, dscr: float) -> bool:
+        # Mirrors dscrRange: NULL bounds are open, an inverted pair matches nothing
+        if self.min_dscr is not None and self.max_dscr is not None and self.min_dscr > self.max_dscr:
+            return False
+        return (self.min_dscr is None or self.min_dscr <= dscr) and (self.max_dscr is None or dscr <= self.max_dscr)
+
+
+class _Group:
+    """The rules for one (occupancy, purpose), indexed by FICO and loan-amount breakpoints."""
+
+    def __init__(self, rules: List[_Rule]):
+        self.fico_bounds = sorted({v for r in rules for v in r.fico if v is not None})
+        self.amount_bounds = sorted({v for r in rules for v in r.amount if v is not None})
+        self.rules = []
+        for rule in rules:
+            (fico_lo, fico_hi), (amount_lo, amount_hi) = rule.fico, rule.amount
+            # Like the generated range columns: no lower bound or an inverted pair never matches
+            if fico_lo is None or amount_lo is None:
+                continue
+            if (fico_hi is not None and fico_lo > fico_hi) or (amount_hi is not None and amount_lo > amount_hi):
+                continue
+            self.rules.append((
+                rule,
+                bisect_left(self.fico_bounds, fico_lo),
+                bisect_left(self.fico_bounds, fico_hi) if fico_hi is not None else len(self.fico_bounds),
+                bisect_left(self.amount_bounds, amount_lo),
+                bisect_left(self.amount_bounds, amount_hi) if amount_hi is not None else len(self.amount_bounds),
+            ))
+        self._by_fico: Dict[int, list] = {}
+        self._cells: Dict[tuple, Tuple[List[float], List[_Rule]]] = {}
+
+    def _fico_rules(self, fico_region: int) -> list:
+        rules = self._by_fico.get(fico_region)
+        if rules is None:
+            j, point = fico_region // 2, fico_region % 2
+            rules = self._by_fico[fico_region] = [
+                (rule, amount_lo, amount_hi)
+                for rule, fico_lo, fico_hi, amount_lo, amount_hi in self.rules
+                if (fico_lo <= j if point else fico_lo < j) and j <= fico_hi
+            ]
+        return rules
+
+    def cell(self, fico: int, amount: float, dscr: Optional[float]) -> Tuple[List[float], List[_Rule]]:
+        """
+        Best rule per program for the scenario's regions, ordered by max LTV
+        (highest first), with the negated max LTVs for bisecting.
+        """
+        key = (_region(self.fico_bounds, fico), _region(self.amount_bounds, amount), dscr)
+        cached = self._cells.get(key)
+        if cached is not None:
+            return cached
+        if len(self._cells) >= MAX_CACHED_CELLS:
+            self._cells.clear()
+        fico_region, amount_region, _ = key
+        j, point = amount_region // 2, amount_region % 2
+        best: Dict[str, _Rule] = {}
+        for rule, amount_lo, amount_hi in self._fico_rules(fico_region):
+            if not ((amount_lo <= j if point else amount_lo < j) and j <= amount_hi):
+                continue
+            if dscr is not None and not rule.accepts_dscr(dscr):
+                continue
+            current = best.get(rule.program_id)
+            if current is None or rule.max_ltv > current.max_ltv:
+                best[rule.program_id] = rule
+        ordered = sorted(best.values(), key=lambda r: -r.max_ltv)
+        cached = self._cells[key] = ([-r.max_ltv for r in ordered], ordered)
+        return cached
+
+
+class MatrixIndex:
+    """The whole eligibility matrix, shared by batches while the catalog is unchanged."""
+
+    def __init__(self, rows):
+        grouped: Dict[Tuple[str, str], List[_Rule]] = {}
+        for row in rows:
+            if row.occupancyType is None or row.loanPurpose is None:
+                continue
+            grouped.setdefault((row.occupancyType.value, row.loanPurpose.value), []).append(_Rule(row))
+        self.groups = {key: _Group(rules) for key, rules in grouped.items()}
+
+    @classmethod
+    async def load(cls, session: AsyncSession) -> "MatrixIndex":
+        v = scenario_search.c
+        result = await session.execute(select(
+            v.loanProgramId, v.lenderName, v.programName, v.occupancyType, v.loanPurpose,
+            v.minFicoScore, v.maxFicoScore, v.minLoanAmount, v.maxLoanAmount,
+            v.minDscr, v.maxDscr, v.maxLtv, v.reservesMonths,
+        ))
+        return cls(result.all())
+
+    @classmethod
+    async def current(cls, session: AsyncSession) -> "MatrixIndex":
+        """The resident index, rebuilt when the catalog snapshot has changed since it was loaded."""
+        global _resident
+        snapshot = await catalog.get()
+        if _resident is None or _resident[0] is not snapshot:
+            _resident = (snapshot, await cls.load(session))
+        return _resident[1]
+
+    def match(self, scenario: ScenarioInput) -> List[_Rule]:
+        """The scenario's programs (best rule each), ordered by lender and program."""
+        group = self.groups.get((scenario.occupancy, scenario.loan_purpose))
+        if group is None:
+            return []
+        neg_ltvs, rules = group.cell(scenario.fico_score, scenario.loan_amount, scenario.dscr)
+        accepted = rules[:bisect_right(neg_ltvs, -scenario.ltv)]
+        return sorted(accepted, key=lambda r: r.sort_key)
+
+
+# The resident index and the catalog snapshot it was built under
+_resident: Optional[Tuple[catalog.CatalogSnapshot, MatrixIndex]] = None
+
+
+# --- Evaluation ---
+
+def _result_line(index: int, scenario: ScenarioInput, matches: List[_Rule]) -> str:
+    # Same shape as StreamScenarioResult, assembled from pre-serialized matches
+    id_part = f',"id":{json.dumps(scenario.id)}' if scenario.id is not None else ""
+    return (
+        f'{{"type":"result","index":{index}{id_part},"eligible":{"true" if matches else "false"},'
+        f'"matches":[{",".join(r.fragment for r in matches)}]}}'
+    )
+
+
+async def evaluate_scenarios(session: AsyncSession, parsed: List[ParsedScenario]) -> AsyncGenerator[str, None]:
+    """Yields NDJSON 'result' lines (one per scenario, in input order) in groups, then a 'summary' line."""
+    start = time.perf_counter()
+    index = await MatrixIndex.current(session) if any(s is not None for _, s, _ in parsed) else None
+    eligible = invalid = 0
+
+    lines = []
+    for i, scenario, error in parsed:
+        if scenario is None:
+            invalid += 1
+            lines.append(StreamScenarioResult(index=i, error=error).model_dump_json(exclude_none=True))
+        else:
+            matches = index.match(scenario)
+            eligible += bool(matches)
+            lines.append(_result_line(i, scenario, matches))
+        if len(lines) >= FLUSH_EVERY:
+            yield "\n".join(lines)
+            lines = []
+    if lines:
+        yield "\n".join(lines)
+
+    elapsed = time.perf_counter() - start
+    yield StreamScenarioSummary(
+        scenarios=len(parsed),
+        eligible=eligible,
+        invalid=invalid,
+        duration_ms=round(elapsed * 1000, 2),
+        scenarios_per_second=round(len(parsed) / elapsed, 1) if elapsed > 0 else 0.0,
+    ).model_dump_json()
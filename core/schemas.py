@@ -6,6 +6,8 @@ from db.models import ChatMessageRole # Import the enum
 class ChatRequest(BaseModel):
     message: str
     conversation_id: Optional[str] = None
+    # Adds 'timing' events with per-step durations to the stream
+    include_timing: bool = False
 
 class ChatResponse(BaseModel):
     response: str
@@ -53,4 +55,89 @@ class StreamResponseInfo(BaseModel):
 class StreamResponseChunk(BaseModel):
     """Payload for a 'chunk' message in a stream."""
     type: str = "chunk"
-    content: str
\ No newline at end of file
+    content: str
+
+class StreamResponseTiming(BaseModel):
+    """
+    Payload for a 'timing' message, sent when the request sets include_timing.
+    'step' is "llm", "tool" or "total"; times are in milliseconds and
+    elapsed_ms is measured from the start of the turn.
+    """
+    type: str = "timing"
+    step: str
+    name: Optional[str] = None
+    duration_ms: float
+    db_ms: float = 0.0
+    elapsed_ms: float
+    input_tokens: Optional[int] = None
+    output_tokens: Optional[int] = None
+    llm_ms: Optional[float] = None
+    tool_ms: Optional[float] = None
+    error: Optional[str] = None
+
+# --- Schemas for batch scenario evaluation ---
+
+class ScenarioInput(BaseModel):
+    """One borrower scenario in a POST /scenarios/batch request (JSON object or CSV row)."""
+    id: Optional[str] = None
+    fico_score: int
+    loan_amount: float
+    ltv: float
+    occupancy: str
+    loan_purpose: str
+    dscr: Optional[float] = None
+
+class ScenarioProgramMatch(BaseModel):
+    """A program that accepts the scenario, with its most generous matching rule."""
+    lender: str
+    program: str
+    loan_program_id: str
+    max_ltv: Optional[float] = None
+    reserves_months: Optional[int] = None
+
+class StreamScenarioResult(BaseModel):
+    """Payload for a 'result' line: the programs matching one input scenario."""
+    type: str = "result"
+    index: int
+    id: Optional[str] = None
+    eligible: bool = False
+    matches: List[ScenarioProgramMatch] = []
+    error: Optional[str] = None
+
+class StreamScenarioSummary(BaseModel):
+    """Payload for the final 'summary' line of a batch evaluation."""
+    type: str = "summary"
+    scenarios: int
+    eligible: int
+    invalid: int
+    duration_ms: float
+    scenarios_per_second: float
+
+# --- Schemas for eligibility sensitivity curves ---
+
+class SensitivityBand(BaseModel):
+    """A FICO or loan-amount band; both bounds inclusive, max is None when open-ended."""
+    min: float
+    max: Optional[float] = None
+    label: str
+
+class SensitivityCell(BaseModel):
+    """The most generous rule for a (FICO band, loan-amount band); max_ltv None means no limit."""
+    max_ltv: Optional[float] = None
+    reserves_months: Optional[int] = None
+
+class SensitivityCurveResponse(BaseModel):
+    """
+    Response for GET /programs/{program_id}/sensitivity. cells[i][j] is the
+    FICO band i / loan-amount band j cell, or None when no rule covers it.
+    """
+    program_id: str
+    program: str
+    lender: str
+    occupancy: str
+    loan_purpose: str
+    dscr: Optional[float] = None
+    rules: int
+    fico_bands: List[SensitivityBand]
+    loan_amount_bands: List[SensitivityBand]
+    cells: List[List[Optional[SensitivityCell]]]
@@ -0,0 +1,195 @@
+# core/sensitivity.py
+"""
+Eligibility sensitivity curves: how a program's max LTV and reserves change
+across FICO and loan-amount breakpoints for one occupancy and purpose.
+
+`load_curve()` reads the program's matrix rules in a single query and
+`build_curve()` turns them into a step function. Every rule bound is a
+breakpoint, so FICO and loan amount split into bands, and each
+(FICO band, amount band) cell keeps the most generous rule that covers the
+whole cell. Adjacent bands with identical cells are merged, so the table
+only shows the steps the borrower can actually move across. This answers
+"what if the FICO were 20 points higher" without one find_eligibility_rules
+call per value.
+
+Coverage follows the generated range columns: a rule with no lower bound or
+an inverted pair never matches, and a missing upper bound is open.
+"""
+import math
+from typing import List, Optional, Tuple
+
+from sqlalchemy import Numeric, cast, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.models import EligibilityMatrixRule, LoanPurposeType, OccupancyType
+
+# Smallest step on each axis: FICO scores are whole points, loan amounts cents
+FICO_STEP = 1
+AMOUNT_STEP = 0.01
+
+# (max LTV, reserves months); None when no rule covers the cell
+Cell = Optional[Tuple[Optional[float], Optional[int]]]
+
+
+class Band:
+    """A half-open range [start, end) on one axis; end is None when unbounded."""
+
+    def __init__(self, start: float, end: Optional[float]):
+        self.start = start
+        self.end = end
+
+
+class SensitivityCurve:
+    """Max LTV / reserves for each (FICO band, loan-amount band)."""
+
+    def __init__(self, fico_bands: List[Band], amount_bands: List[Band], cells: List[List[Cell]], rule_count: int,
+                 dscr_applied: bool, has_dscr_rules: bool):
+        self.fico_bands = fico_bands
+        self.amount_bands = amount_bands
+        self.cells = cells  # cells[fico band][amount band]
+        self.rule_count = rule_count
+        self.dscr_applied = dscr_applied
+        self.has_dscr_rules = has_dscr_rules
+
+
+# --- Step function ---
+
+def _bound(value) -> Optional[float]:
+    return float(value) if value is not None else None
+
+
+def _breakpoints(bounds: List[Tuple[float, Optional[float]]], step: float) -> List[float]:
+    # Each band starts at a rule's lower bound or just past a rule's upper bound
+    starts = {lo for lo, _ in bounds} | {round(hi + step, 2) for _, hi in bounds if hi is not None}
+    return sorted(starts)
+
+
+def _covering(lo: float, hi: Optional[float], starts: List[float], step: float) -> range:
+    # Indices of the bands [starts[i], starts[i+1]) that lie inside [lo, hi]
+    first = starts.index(lo)
+    last = len(starts) - 1 if hi is None else starts.index(round(hi + step, 2)) - 1
+    return range(first, last + 1)
+
+
+def _better(candidate: Tuple[float, Optional[int]], current: Cell) -> bool:
+    # Higher max LTV wins; on a tie, fewer months of reserves
+    if current is None:
+        return True
+    if candidate[0] != current[0]:
+        return candidate[0] > current[0]
+    return (candidate[1] if candidate[1] is not None else math.inf) < (current[1] if current[1] is not None else math.inf)
+
+
+def _merge(bands: List[Band], rows: List[List[Cell]]) -> Tuple[List[Band], List[List[Cell]]]:
+    # Joins adjacent bands whose rows are identical; drops uncovered bands at the ends
+    merged_bands, merged_rows = [], []
+    for band, row in zip(bands, rows):
+        if merged_rows and merged_rows[-1] == row:
+            merged_bands[-1].end = band.end
+            continue
+        merged_bands.append(Band(band.start, band.end))
+        merged_rows.append(row)
+    while merged_rows and all(c is None for c in merged_rows[-1]):
+        merged_bands.pop()
+        merged_rows.pop()
+    while merged_rows and all(c is None for c in merged_rows[0]):
+        merged_bands.pop(0)
+        merged_rows.pop(0)
+    return merged_bands, merged_rows
+
+
+def _transpose(rows: List[List[Cell]]) -> List[List[Cell]]:
+    return [list(column) for column in zip(*rows)] if rows else []
+
+
+def build_curve(rules, dscr: Optional[float] = None) -> SensitivityCurve:
+    """
+    Builds the step function from matrix rules (rows with minFicoScore,
+    maxFicoScore, minLoanAmount, maxLoanAmount, minDscr, maxDscr, maxLtv,
+    reservesMonths) already filtered to one program, occupancy and purpose.
+    """
+    usable = []
+    has_dscr_rules = False
+    for rule in rules:
+        fico = (rule.minFicoScore, rule.maxFicoScore)
+        amount = (_bound(rule.minLoanAmount), _bound(rule.maxLoanAmount))
+        if fico[0] is None or amount[0] is None:
+            continue
+        if (fico[1] is not None and fico[0] > fico[1]) or (amount[1] is not None and amount[0] > amount[1]):
+            continue
+        has_dscr_rules = has_dscr_rules or rule.minDscr is not None or rule.maxDscr is not None
+        # NULL max LTV means no limit
+        ltv = _bound(rule.maxLtv) if rule.maxLtv is not None else math.inf
+        usable.append((fico, amount, (ltv, rule.reservesMonths)))
+
+    fico_starts = _breakpoints([f for f, _, _ in usable], FICO_STEP)
+    amount_starts = _breakpoints([a for _, a, _ in usable], AMOUNT_STEP)
+    cells: List[List[Cell]] = [[None] * len(amount_starts) for _ in fico_starts]
+    for (fico_lo, fico_hi), (amount_lo, amount_hi), value in usable:
+        amount_range = _covering(amount_lo, amount_hi, amount_starts, AMOUNT_STEP)
+        for i in _covering(fico_lo, fico_hi, fico_starts, FICO_STEP):
+            row = cells[i]
+            for j in amount_range:
+                if _better(value, row[j]):
+                    row[j] = value
+
+    def bands(starts: List[float]) -> List[Band]:
+        return [Band(s, starts[k + 1] if k + 1 < len(starts) else None) for k, s in enumerate(starts)]
+
+    # Merge FICO rows, then amount columns (working on the transpose)
+    fico_bands, rows = _merge(bands(fico_starts), cells)
+    amount_bands, columns = _merge(bands(amount_starts), _transpose(rows))
+    rows = _transpose(columns)
+    rows = [[(None if c[0] == math.inf else c[0], c[1]) if c is not None else None for c in row] for row in rows]
+    return SensitivityCurve(fico_bands, amount_bands, rows, len(usable), dscr is not None, has_dscr_rules)
+
+
+async def load_curve(
+    session: AsyncSession, program_id: str, occupancy: OccupancyType, loan_purpose: LoanPurposeType,
+    dscr: Optional[float] = None,
+) -> SensitivityCurve:
+    """Reads the program's rules for the occupancy and purpose in one query and builds the curve."""
+    r = EligibilityMatrixRule
+    query = select(
+        r.minFicoScore, r.maxFicoScore, r.minLoanAmount, r.maxLoanAmount,
+        r.minDscr, r.maxDscr, r.maxLtv, r.reservesMonths,
+    ).where(r.loanProgramId == program_id, r.occupancyType == occupancy, r.loanPurpose == loan_purpose)
+    if dscr is not None:
+        query = query.where(r.dscrRange.contains(cast(dscr, Numeric)))
+    rules = (await session.execute(query)).all()
+    return build_curve(rules, dscr)
+
+
+# --- Formatting ---
+
+def _money(value: float) -> str:
+    return f"${value:,.0f}" if value == int(value) else f"${value:,.2f}"
+
+
+def fico_label(band: Band) -> str:
+    if band.end is None:
+        return f"{band.start:.0f}+"
+    return f"{band.start:.0f}-{band.end - FICO_STEP:.0f}"
+
+
+def amount_label(band: Band) -> str:
+    if band.end is None:
+        return f"{_money(band.start)}+"
+    return f"{_money(band.start)}-{_money(round(band.end - AMOUNT_STEP, 2))}"
+
+
+def cell_label(cell: Cell) -> str:
+    if cell is None:
+        return "-"
+    ltv, reserves = cell
+    ltv_part = f"{ltv:g}%" if ltv is not None else "no max"
+    return ltv_part + (f" / {reserves}mo" if reserves is not None else "")
+
+
+def format_table(curve: SensitivityCurve) -> str:
+    """Markdown table: FICO bands as rows, loan-amount bands as columns, 'max LTV / reserves' cells."""
+    header = ["FICO \\ Loan amount"] + [amount_label(b) for b in curve.amount_bands]
+    lines = ["| " + " | ".join(header) + " |", "|" + "---|" * len(header)]
+    for band, row in zip(curve.fico_bands, curve.cells):
+        lines.append("| " + " | ".join([fico_label(band)] + [cell_label(c) for c in row]) + " |")
+    return "\n".join(lines)
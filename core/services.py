@@ -1,5 +1,6 @@
 # core/services.py
 import json
+import time
 from sqlalchemy.ext.asyncio import AsyncSession
 from core.schemas import ChatRequest, StreamResponseInfo, StreamResponseChunk
 from db.crud import (
@@ -12,7 +13,9 @@ from db.crud import (
 )
 from db.models import ChatMessageRole
 
-from core.agent import chain, llm, system_prompt
+from core.agent import chain, system_prompt
+from core.llm import get_chat_model, SUMMARIZER
+from core import metrics, timing, tracing
 from langchain_core.messages import SystemMessage, HumanMessage
 from langchain_core.callbacks import StdOutCallbackHandler
 
@@ -23,9 +26,14 @@ async def stream_chat_message(
     """
     Streams AI responses chunk by chunk from the agent (chain.astream).
     """
+    turn_start = time.perf_counter()
+    # Per-step 'timing' events are streamed alongside the answer when requested
+    timer = timing.start_turn() if request.include_timing else None
+
     # 1. Get or create conversation
     conversation = await get_or_create_conversation(db, request.conversation_id)
     conversation_id = conversation.id
+    tracing.current_span().set_attribute("chat.conversation_id", conversation_id)
 
     # 2. Save user's message
     await add_message_to_conversation(
@@ -41,11 +49,19 @@ async def stream_chat_message(
     yield info_payload
 
     handler = StdOutCallbackHandler()
+    callbacks = [handler]  # <-- This enables verbose logging
+    if tracing.enabled():
+        # Spans for each graph node, tool and LLM call under the request span
+        callbacks.append(tracing.TracingCallbackHandler())
+    if metrics.enabled():
+        callbacks.append(metrics.MetricsCallbackHandler())
+    if timer:
+        callbacks.append(timing.TimingCallbackHandler(timer))
 
     # Define the config for the stream, now including the callback
     stream_config = {
         "configurable": {"conversation_id": conversation_id},
-        "callbacks": [handler],  # <-- This enables verbose logging
+        "callbacks": callbacks,
         "recursion_limit": 100
     }
 
@@ -66,6 +82,10 @@ async def stream_chat_message(
         final_content = None
 
         async for chunk in chain.astream({"messages": messages_input}, stream_config):
+            if timer:
+                for event in timer.drain():
+                    yield event.model_dump_json(exclude_none=True)
+
             if "agent" in chunk:
                 agent_output = chunk["agent"]
                 if "messages" in agent_output:
@@ -77,19 +97,32 @@ async def stream_chat_message(
         if final_content:
             full_ai_content = final_content # Save for DB
             chunk_payload = StreamResponseChunk(content=full_ai_content).model_dump_json()
+            metrics.CHAT_FIRST_CHUNK_SECONDS.observe(time.perf_counter() - turn_start)
             yield chunk_payload
         else:
             print("[STREAM WARNING] Graph finished without a final AI message.")
 
+        if timer:
+            yield timer.total().model_dump_json(exclude_none=True)
+
     except Exception as e:
         print(f"[STREAM ERROR] {e}")
+        metrics.CHAT_ERRORS.inc()
         error_payload = json.dumps({
             "type": "error",
             "content": "Error during streaming."
         })
         yield error_payload
 
+        if timer:
+            for event in timer.drain():
+                yield event.model_dump_json(exclude_none=True)
+            yield timer.total().model_dump_json(exclude_none=True)
+
     finally:
+        if timer:
+            timing.finish_turn()
+
         # 6. Save final AI message
         if full_ai_content:
             await add_message_to_conversation(
@@ -97,11 +130,21 @@ async def stream_chat_message(
             )
 
         # 7. Update summary asynchronously
-        background_tasks.add_task(generate_and_update_summary, db, conversation_id, llm)
+        metrics.SUMMARIZER_QUEUE_DEPTH.inc()
+        background_tasks.add_task(
+            generate_and_update_summary, db, conversation_id, get_chat_model(SUMMARIZER)
+        )
 
 
 async def generate_and_update_summary(db: AsyncSession, conversation_id: str, llm):
     """Generates a new summary for the conversation."""
+    try:
+        await _generate_and_update_summary(db, conversation_id, llm)
+    finally:
+        metrics.SUMMARIZER_QUEUE_DEPTH.dec()
+
+
+async def _generate_and_update_summary(db: AsyncSession, conversation_id: str, llm):
     # Fetch current conversation to include the current summary
     conversation = await get_conversation_by_id(db, conversation_id)
     conversation_summary = conversation.summary if conversation and conversation.summary else "No summary yet."
@@ -163,8 +206,14 @@ async def generate_and_update_summary(db: AsyncSession, conversation_id: str, ll
     # --- END NEW SUMMARY PROMPT ---
 
     try:
-        summary_response = await llm.ainvoke(summary_prompt)
-        new_summary = summary_response.content
-        await update_conversation_summary(db, conversation_id, new_summary)
+        with tracing.span("chat.summarize", **{"chat.conversation_id": conversation_id}):
+            callbacks = []
+            if tracing.enabled():
+                callbacks.append(tracing.TracingCallbackHandler())
+            if metrics.enabled():
+                callbacks.append(metrics.MetricsCallbackHandler())
+            summary_response = await llm.ainvoke(summary_prompt, config={"callbacks": callbacks})
+            new_summary = summary_response.content
+            await update_conversation_summary(db, conversation_id, new_summary)
     except Exception as e:
         print(f"Error updating summary: {e}")
\ No newline at end of file
@@ -0,0 +1,302 @@
+# core/sql_templates.py
+"""
+Pre-written, parameterized SQL for the analytics questions that most often
+reach `query_database_assistant`: max LTV by lender, program counts by
+occupancy or name, and minimum FICO per program.
+
+`match_template()` recognizes the shape of a question and pulls out its
+parameters (lender, occupancy, purpose, aggregate and grouping). The tool runs
+the matched template directly and only asks the LLM to write SQL when nothing
+matches. Matching is conservative: every extractor blanks out the words it
+used, and a template is only returned when nothing but filler words ("what",
+"the", "loans", ...) is left. A qualifier no extractor understands ("DSCR
+loans", "no prepayment penalty", a program name) sends the question to the
+LLM instead of being silently dropped. So do questions with numbers or
+comparisons ("above 80% LTV").
+
+Rule-level templates read the scenario_search materialized view, so the
+occupancy/purpose filters use its composite index. Every value is a bind
+parameter.
+"""
+import re
+from typing import Dict, List, Optional, Sequence
+
+from thefuzz import fuzz
+
+from db.models import LoanPurposeType, OccupancyType
+
+LENDER_MATCH_THRESHOLD = 90
+
+# Phrases that mean the question needs a filter or shape no template has
+_UNSUPPORTED = re.compile(
+    r"\d|\b(above|below|over|under|between|greater|less|more than|fewer|at least|at most|"
+    r"exceed\w*|without|except|not|top|median|percent\w*|sum)\b"
+)
+
+# Words that never change the answer; anything else must be used by an extractor
+_FILLER = frozenset("""
+    a an the what which is are was do does can could would i we my our me you your
+    for of on in at to from with and across among all any there have has that who
+    show give list tell get find return display please
+    loan loans program programs lender lenders property properties total overall
+    need needed required requirement requirements offered offer offers available
+    allow allows allowed allowing permit permits permitted accept accepts accepted
+    score scores value values
+""".split())
+
+_OCCUPANCY_TERMS = [
+    (r"\binvest(ment|or)s?\b|\bnon[- ]owner([- ]occupied)?\b", [OccupancyType.INVESTMENT, OccupancyType.INVESTOR]),
+    (r"\bsecond[- ]homes?\b", [OccupancyType.SECOND_HOME]),
+    (r"\bprimary\b|\bowner[- ]occupied\b", [OccupancyType.PRIMARY]),
+]
+# "investment occupancy": only used up together with an occupancy term
+_OCCUPANCY_WORD = r"\b(occupancy|occupancies)\b"
+
+
+_PURPOSE_TERMS = [
+    (r"\bpurchases?\b", LoanPurposeType.PURCHASE),
+    (r"\brate[- /]?(and[- ])?term\b(\s+refi(nance)?s?\b)?", LoanPurposeType.RATE_TERM),
+    (r"\bcash[- ]?out\b(\s+refi(nance)?s?\b)?", LoanPurposeType.CASH_OUT),
+    (r"\bsecond[- ]liens?\b", LoanPurposeType.SECOND_LIEN),
+]
+
+_AGGREGATE_TERMS = [
+    ("AVG", r"\b(average|avg|mean|typical)\b"),
+    ("MIN", r"\b(min|minimum|lowest|smallest)\b"),
+    ("MAX", r"\b(max|maximum|highest|largest|biggest)\b"),
+]
+
+# Column/description prefix for each aggregate ("highest max LTV", not "max max LTV")
+_AGGREGATE_LABELS = {"AVG": "avg", "MIN": "lowest", "MAX": "highest"}
+
+_BY_PROGRAM = re.compile(r"\b(per|by|each|every) (loan )?programs?\b")
+_BY_LENDER = re.compile(r"\b(per|by|each|every) lenders?\b|\b(all|list( all)?) lenders\b")
+_LENDER_SUFFIX = re.compile(r"[,.]?\s*\b(llc|inc|corp|corporation|co|ltd)\b\.?", re.IGNORECASE)
+
+
+class _Words:
+    """The lowercased question, with the words an extractor has used blanked out."""
+
+    def __init__(self, lowered: str):
+        # Keep hyphens and slashes ("cash-out", "rate/term"); drop possessives and other punctuation
+        self.text = " " + re.sub(r"[^\w\s&/-]", " ", re.sub(r"['’]s\b", "", lowered)) + " "
+
+    def take(self, pattern) -> Optional[re.Match]:
+        """Searches for the pattern and blanks out the match."""
+        match = re.search(pattern, self.text)
+        if match:
+            self.text = self.text[:match.start()] + " " * (match.end() - match.start()) + self.text[match.end():]
+        return match
+
+    def leftover(self) -> List[str]:
+        return [word for word in re.findall(r"[\w&]+", self.text) if word not in _FILLER]
+
+
+class TemplateMatch:
+    """A template with its extracted parameters, ready to run."""
+
+    def __init__(self, name: str, sql: str, params: Dict[str, object], description: str):
+        self.name = name
+        self.sql = sql
+        self.params = params
+        self.description = description
+
+
+# --- Parameter extraction ---
+
+def _normalize_name(name: str) -> str:
+    return " ".join(re.sub(r"[^\w\s&]", " ", name).lower().split())
+
+
+def _extract_lender(original: str, lender_names: Sequence[str], words: _Words) -> Optional[str]:
+    """
+    Finds the lender named in the question, ignoring case, punctuation and
+    corporate suffixes, and uses up its words. Returns the name as stored, or None.
+    """
+    text = _normalize_name(original)
+    best_name, best_normalized, best_score = None, "", 0
+    for name in lender_names:
+        normalized = _normalize_name(_LENDER_SUFFIX.sub("", name))
+        if not normalized:
+            continue
+        score = fuzz.partial_ratio(normalized, text) if len(normalized) <= len(text) else 0
+        if score > best_score:
+            best_name, best_normalized, best_score = name, normalized, score
+    if best_score < LENDER_MATCH_THRESHOLD:
+        return None
+    name_words = best_normalized.split()
+    for word in set(re.findall(r"[\w&]+", words.text)):
+        # Near-misses too, as the name itself matched fuzzily
+        if any(fuzz.ratio(word, name_word) >= LENDER_MATCH_THRESHOLD for name_word in name_words):
+            words.take(rf"(?<![\w&]){re.escape(word)}(?![\w&])")
+    words.take(r"\b(llc|inc|corp|corporation|co|ltd)\b")
+    return best_name
+
+
+def _extract_occupancies(words: _Words) -> Optional[List[str]]:
+    for pattern, occupancies in _OCCUPANCY_TERMS:
+        if words.take(pattern):
+            words.take(_OCCUPANCY_WORD)
+            return [o.value for o in occupancies]
+    return None
+
+
+def _extract_purpose(words: _Words) -> Optional[str]:
+    for pattern, purpose in _PURPOSE_TERMS:
+        if words.take(pattern):
+            return purpose.value
+    return None
+
+
+def _extract_aggregate(words: _Words, default: str) -> str:
+    for aggregate, pattern in _AGGREGATE_TERMS:
+        if words.take(pattern):
+            return aggregate
+    return default
+
+
+def _extract_name_filter(original: str, words: _Words) -> Optional[str]:
+    """
+    A quoted term ('DSCR') or an acronym right before "programs" (ITIN
+    programs), unless it names an occupancy or purpose.
+    """
+    match = re.search(r"['\"‘“]([^'\"’”]{2,40})['\"’”]", original) \
+        or re.search(r"\b([A-Z]{2,})\s+(loan\s+)?programs?\b", original)
+    if not match:
+        return None
+    term = match.group(1).strip()
+    if _extract_occupancies(_Words(term.lower())) or _extract_purpose(_Words(term.lower())):
+        return None
+    for word in re.findall(r"[\w&]+", term.lower()):
+        words.take(rf"\b{re.escape(word)}\b")
+    return term
+
+
+def _extract_grouping(words: _Words):
+    """(by program, by lender) as asked for in the question."""
+    return bool(words.take(_BY_PROGRAM)), bool(words.take(_BY_LENDER))
+
+
+def _rule_filters(params: Dict[str, object], occupancies, purpose, lender) -> List[str]:
+    where = []
+    if occupancies:
+        where.append('"occupancyType" = ANY(CAST(:occupancies AS occupancytype[]))')
+        params["occupancies"] = occupancies
+    if purpose:
+        where.append('"loanPurpose" = CAST(:purpose AS loanpurposetype)')
+        params["purpose"] = purpose
+    if lender:
+        where.append('"lenderName" = :lender')
+        params["lender"] = lender
+    return where
+
+
+def _where_clause(where: List[str]) -> str:
+    return ("WHERE " + " AND ".join(where)) if where else ""
+
+
+def _describe(metric: str, lender, occupancies, purpose, group: str) -> str:
+    parts = [metric]
+    if lender:
+        parts.append(f"lender={lender}")
+    if occupancies:
+        parts.append(f"occupancy={'/'.join(occupancies)}")
+    if purpose:
+        parts.append(f"purpose={purpose}")
+    parts.append(f"grouped by {group}" if group else "overall")
+    return ", ".join(parts)
+
+
+# --- Templates ---
+
+def _ltv_template(words: _Words, lender, occupancies, purpose) -> TemplateMatch:
+    # "max LTV" names the column (already used up); a bare "max LTV" means its maximum
+    aggregate = _extract_aggregate(words, "MAX")
+    by_program, by_lender = _extract_grouping(words)
+    params: Dict[str, object] = {}
+    where = _rule_filters(params, occupancies, purpose, lender)
+    group = "program" if by_program else ("lender" if not lender or by_lender else "")
+    keys = {"program": ['"lenderName" AS lender', '"programName" AS program'], "lender": ['"lenderName" AS lender'], "": []}[group]
+    group_sql = {"program": 'GROUP BY "lenderName", "programName" ORDER BY "lenderName", "programName"',
+                 "lender": 'GROUP BY "lenderName" ORDER BY "lenderName"', "": ""}[group]
+    label = _AGGREGATE_LABELS[aggregate]
+    column = f'ROUND({aggregate}("maxLtv"), 2) AS {label}_max_ltv'
+    sql = f"SELECT {', '.join(keys + [column])} FROM scenario_search {_where_clause(where)} {group_sql}"
+    return TemplateMatch("max_ltv", " ".join(sql.split()), params,
+                         _describe(f"{label} max LTV", lender, occupancies, purpose, group))
+
+
+def _fico_template(words: _Words, lender, occupancies, purpose) -> TemplateMatch:
+    aggregate = _extract_aggregate(words, "MIN")
+    by_program, by_lender = _extract_grouping(words)
+    params: Dict[str, object] = {}
+    where = _rule_filters(params, occupancies, purpose, lender)
+    group = "lender" if by_lender and not by_program else "program"
+    keys = ['"lenderName" AS lender'] + (['"programName" AS program'] if group == "program" else [])
+    group_cols = '"lenderName"' + (', "programName"' if group == "program" else "")
+    label = _AGGREGATE_LABELS[aggregate]
+    value = f'{aggregate}("minFicoScore")' if aggregate != "AVG" else 'ROUND(AVG("minFicoScore"), 0)'
+    sql = (
+        f"SELECT {', '.join(keys)}, {value} AS {label}_min_fico FROM scenario_search "
+        f"{_where_clause(where)} GROUP BY {group_cols} ORDER BY {group_cols}"
+    )
+    return TemplateMatch("min_fico", " ".join(sql.split()), params,
+                         _describe(f"{label} min FICO", lender, occupancies, purpose, group))
+
+
+def _program_count_template(words: _Words, original: str, lender, occupancies, purpose) -> TemplateMatch:
+    name_filter = _extract_name_filter(original, words)
+    by_lender = _extract_grouping(words)[1] and not lender
+    params: Dict[str, object] = {}
+    if occupancies or purpose:
+        # Programs with at least one matching matrix rule
+        where = _rule_filters(params, occupancies, purpose, lender)
+        if name_filter:
+            where.append('"programName" ILIKE :name_pattern')
+        source, lender_col, program_col = "scenario_search", '"lenderName"', '"loanProgramId"'
+    else:
+        where = []
+        if lender:
+            where.append("l.name = :lender")
+            params["lender"] = lender
+        if name_filter:
+            where.append("p.name ILIKE :name_pattern")
+        source, lender_col, program_col = 'loan_program p JOIN lender l ON l.id = p."lenderId"', "l.name", "p.id"
+    if name_filter:
+        params["name_pattern"] = f"%{name_filter}%"
+
+    count = f"COUNT(DISTINCT {program_col}) AS program_count"
+    if by_lender:
+        sql = f"SELECT {lender_col} AS lender, {count} FROM {source} {_where_clause(where)} GROUP BY {lender_col} ORDER BY {lender_col}"
+    else:
+        sql = f"SELECT {count} FROM {source} {_where_clause(where)}"
+    metric = "program count" + (f" (name like '{name_filter}')" if name_filter else "")
+    return TemplateMatch("program_count", " ".join(sql.split()), params,
+                         _describe(metric, lender, occupancies, purpose, "lender" if by_lender else ""))
+
+
+def match_template(question: str, lender_names: Sequence[str] = ()) -> Optional[TemplateMatch]:
+    """
+    Returns the template that answers the question with its parameters, or
+    None when the question should go to LLM SQL generation.
+    """
+    original = question.strip()
+    lowered = original.lower()
+    if not lowered or _UNSUPPORTED.search(lowered):
+        return None
+
+    words = _Words(lowered)
+    lender = _extract_lender(original, lender_names, words) if lender_names else None
+    occupancies = _extract_occupancies(words)
+    purpose = _extract_purpose(words)
+
+    if words.take(r"\b(max|maximum)\s+ltv\b|\bltv\b"):
+        match = _ltv_template(words, lender, occupancies, purpose)
+    elif words.take(r"\b(min|minimum)\s+fico(\s+scores?)?\b|\bfico(\s+scores?)?\b"):
+        match = _fico_template(words, lender, occupancies, purpose)
+    elif words.take(r"\b(count|how many|number of)\b") and words.take(r"\bprograms?\b"):
+        match = _program_count_template(words, original, lender, occupancies, purpose)
+    else:
+        return None
+    # Anything no extractor used is a qualifier the template would silently drop
+    return None if words.leftover() else match
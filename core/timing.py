@@ -0,0 +1,163 @@
+# core/timing.py
+"""
+Per-turn step timings for the chat stream.
+
+When a chat request sets `include_timing`, a TurnTimer is attached to the turn
+and the stream carries `timing` events (core.schemas.StreamResponseTiming) as
+steps finish: one per LLM call, one per tool call (with the SQL time spent
+inside it) and a final `total`. This lets the browser show why a turn was slow
+without access to server logs or a trace backend.
+
+SQL time is attributed through a ContextVar, so the statement handler installed
+by `instrument_engine()` (on the shared hook, db/statement_hooks.py) costs a
+single lookup for turns that don't ask for timing.
+"""
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import AsyncCallbackHandler
+
+from core.schemas import StreamResponseTiming
+
+_current_timer: ContextVar[Optional["TurnTimer"]] = ContextVar("current_turn_timer", default=None)
+_current_step: ContextVar[Optional["_Step"]] = ContextVar("current_timing_step", default=None)
+_installed = False
+
+
+class _Step:
+    def __init__(self, step: str, name: str):
+        self.step = step
+        self.name = name
+        self.start = time.perf_counter()
+        self.db_ms = 0.0
+
+
+class TurnTimer:
+    """Collects finished steps for one chat turn until the stream drains them."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.db_ms = 0.0
+        self.llm_ms = 0.0
+        self.tool_ms = 0.0
+        self._pending: List[StreamResponseTiming] = []
+
+    def elapsed_ms(self) -> float:
+        return round((time.perf_counter() - self.start) * 1000, 2)
+
+    def record(self, step: _Step, **extra) -> float:
+        duration_ms = (time.perf_counter() - step.start) * 1000
+        self._pending.append(StreamResponseTiming(
+            step=step.step,
+            name=step.name,
+            duration_ms=round(duration_ms, 2),
+            db_ms=round(step.db_ms, 2),
+            elapsed_ms=self.elapsed_ms(),
+            **extra,
+        ))
+        return duration_ms
+
+    def drain(self) -> List[StreamResponseTiming]:
+        pending, self._pending = self._pending, []
+        return pending
+
+    def total(self) -> StreamResponseTiming:
+        elapsed = self.elapsed_ms()
+        return StreamResponseTiming(
+            step="total",
+            duration_ms=elapsed,
+            db_ms=round(self.db_ms, 2),
+            llm_ms=round(self.llm_ms, 2),
+            tool_ms=round(self.tool_ms, 2),
+            elapsed_ms=elapsed,
+        )
+
+
+def start_turn() -> TurnTimer:
+    """Creates a timer and makes it the current one for SQL attribution."""
+    timer = TurnTimer()
+    _current_timer.set(timer)
+    return timer
+
+
+def finish_turn():
+    """Stops attributing SQL time (e.g. from background tasks) to the turn."""
+    _current_timer.set(None)
+
+
+class TimingCallbackHandler(AsyncCallbackHandler):
+    """Records LLM and tool calls on a TurnTimer. Runs inline so SQL lands on the running tool."""
+
+    run_inline = True
+
+    def __init__(self, timer: TurnTimer):
+        self.timer = timer
+        self.steps: Dict[UUID, Tuple[_Step, Optional[_Step]]] = {}
+
+    def _start(self, run_id: UUID, step: str, name: str):
+        new_step = _Step(step, name)
+        self.steps[run_id] = (new_step, _current_step.get())
+        _current_step.set(new_step)
+
+    def _end(self, run_id: UUID, **extra) -> Optional[Tuple[_Step, float]]:
+        entry = self.steps.pop(run_id, None)
+        if entry is None:
+            return None
+        step, previous = entry
+        if _current_step.get() is step:
+            _current_step.set(previous)
+        return step, self.timer.record(step, **extra)
+
+    async def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        self._start(run_id, "tool", (serialized or {}).get("name") or kwargs.get("name") or "tool")
+
+    async def on_tool_end(self, output, *, run_id, **kwargs):
+        ended = self._end(run_id)
+        if ended:
+            self.timer.tool_ms += ended[1]
+
+    async def on_tool_error(self, error, *, run_id, **kwargs):
+        ended = self._end(run_id, error=f"{type(error).__name__}: {error}")
+        if ended:
+            self.timer.tool_ms += ended[1]
+
+    async def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        self._start(run_id, "llm", (metadata or {}).get("ls_model_name") or (serialized or {}).get("name") or "llm")
+
+    async def on_llm_start(self, serialized, prompts, *, run_id, metadata=None, **kwargs):
+        self._start(run_id, "llm", (metadata or {}).get("ls_model_name") or "llm")
+
+    async def on_llm_end(self, response, *, run_id, **kwargs):
+        from core.tracing import llm_usage
+
+        ended = self._end(run_id, **llm_usage(response))
+        if ended:
+            self.timer.llm_ms += ended[1]
+
+    async def on_llm_error(self, error, *, run_id, **kwargs):
+        ended = self._end(run_id, error=f"{type(error).__name__}: {error}")
+        if ended:
+            self.timer.llm_ms += ended[1]
+
+
+def instrument_engine(engine):
+    """Adds statement time to the current turn (and step) when timing was requested."""
+    global _installed
+    if _installed:
+        return
+    _installed = True
+
+    from db import statement_hooks
+
+    def _record(statement, elapsed_ms, rowcount, error, executemany):
+        timer = _current_timer.get()
+        if timer is None or error is not None:
+            return
+        timer.db_ms += elapsed_ms
+        step = _current_step.get()
+        if step is not None:
+            step.db_ms += elapsed_ms
+
+    statement_hooks.add_handler(engine, _record)
@@ -2,16 +2,24 @@
 import re
 from typing import List, Optional
 from langchain_core.tools import tool
-from langchain_groq import ChatGroq
 from sqlalchemy.future import select
-from sqlalchemy import text, and_, or_
+from sqlalchemy import and_, or_, cast, func, literal, Numeric
+from sqlalchemy.dialects.postgresql import REGCONFIG
 from thefuzz import process
 from db.session import AsyncSessionFactory
 from db.models import (
-    Lender, LoanProgram, Guideline, EligibilityMatrixRule,
-    GuidelineCategory, OccupancyType, LoanPurposeType
+    Lender, LoanProgram, Guideline, GuidelineDigest, EligibilityMatrixRule,
+    GuidelineCategory, OccupancyType, LoanPurposeType, GUIDELINE_TS_CONFIG
 )
+from db.views import scenario_search
 from db.crud import get_messages_for_conversation, get_conversation_by_id
+from db.query_stats import query_origin
+from db.sql_guard import QueryRejected, check_statement, run_readonly
+from db import analytics_replica, catalog
+from core.llm import get_chat_model, SQL_GENERATOR
+from core.sql_templates import match_template
+from core.sensitivity import load_curve, format_table
+from core.metrics import SQL_ASSISTANT_QUERIES
 from config.settings import settings
 
 # --- Private Helper Functions ---
@@ -28,6 +36,19 @@ def _normalize_string(input_str: str) -> str:
     # normalized = re.sub(r'[^\w\s]', '', normalized)
     return normalized.strip()
 
+def _format_query_result(columns, rows, truncated: bool, title: str = "**Query Result:**") -> str:
+    """
+    Formats guarded SQL results as a header line plus one comma-separated row per line.
+    """
+    header = ", ".join(columns)
+    result_str = f"{title}\n{header}\n"
+    result_str += "-" * max(len(header), 16) + "\n"
+    for row in rows:
+        result_str += ", ".join(map(str, row)) + "\n"
+    if truncated:
+        result_str += f"_Only the first {len(rows)} rows are shown; narrow the question for the rest._\n"
+    return result_str
+
 async def _get_db_schema_for_llm() -> str:
     """
     Generates a simplified schema description for the LLM to use.
@@ -77,67 +98,148 @@ Here are the available tables and their most important columns:
 * **LoanPurposeType**: [PURCHASE, RATE_TERM, CASH_OUT, SECOND_LIEN]
 """
 
-async def _find_program_by_name(session, program_name: str) -> Optional[LoanProgram]:
+# Minimum fuzzy score for program and lender name lookups
+NAME_MATCH_THRESHOLD = 85
+
+
+async def _find_program_by_name(program_name: str) -> Optional[catalog.CatalogProgram]:
     """
-    Finds a loan program using fuzzy string matching.
+    Finds a loan program using fuzzy string matching against the catalog snapshot
+    (see _find_programs_by_names).
     """
-    CONFIDENCE_THRESHOLD = 85
+    resolved, _ = await _find_programs_by_names([program_name])
+    return resolved[0][1] if resolved else None
 
-    normalized_name = _normalize_string(program_name)
-    
-    query = select(LoanProgram.id, LoanProgram.name)
-    result = await session.execute(query)
-    all_programs = result.fetchall()
-    
-    if not all_programs:
-        return None
 
-    # Create a mapping of {name: id}
-    choices = {prog.name: prog.id for prog in all_programs}
-    
-    best_match = process.extractOne(normalized_name, choices.keys())
-    
-    if best_match and best_match[1] >= CONFIDENCE_THRESHOLD:
-        program_id = choices[best_match[0]]
-        # Fetch the full program object
-        query = select(LoanProgram).where(LoanProgram.id == program_id)
-        result = await session.execute(query)
-        return result.scalar_one_or_none()
-    
-    return None
-
-async def _find_lender_by_name(session, name: str) -> Optional[Lender]:
+async def _find_programs_by_names(program_names: List[str]):
+    """
+    Resolves several program names against the catalog snapshot. Returns
+    ([(requested name, program)], [unmatched names]). When a name is shared
+    by several lenders, the lender mentioned in the request (e.g.
+    "ARC Home Edge DSCR") picks the program.
+    """
+    snapshot = await catalog.get()
+    by_name = snapshot.programs_by_name
+
+    resolved, unmatched, seen = [], [], set()
+    for requested in program_names:
+        normalized_name = _normalize_string(requested)
+        best_match = process.extractOne(normalized_name, by_name.keys()) if normalized_name and by_name else None
+        if not best_match or best_match[1] < NAME_MATCH_THRESHOLD:
+            unmatched.append(requested)
+            continue
+        candidates = by_name[best_match[0]]
+        if len(candidates) > 1:
+            labels = {f"{p.lender_name} {p.name}": p for p in candidates}
+            program = labels[process.extractOne(normalized_name, labels.keys())[0]]
+        else:
+            program = candidates[0]
+        if program.id not in seen:
+            seen.add(program.id)
+            resolved.append((requested, program))
+    return resolved, unmatched
+
+
+async def _find_lender_by_name(name: str) -> Optional[catalog.CatalogLender]:
     """
-    Finds a lender by name using fuzzy matching.
+    Finds a lender by name using fuzzy matching against the catalog snapshot.
     """
-    CONFIDENCE_THRESHOLD = 85
     normalized_name = _normalize_string(name)
 
-    
     if not normalized_name:
         return None
 
-    query = select(Lender)
-    result = await session.execute(query)
-    all_lenders = result.scalars().all()
-
-    if not all_lenders:
+    snapshot = await catalog.get()
+    if not snapshot.lenders:
         return None
 
-    # Create a mapping of choice (Lender Name) to the actual Lender object
-    choices = {lender.name: lender for lender in all_lenders}
-
-    # --- UPDATE THIS LINE ---
-    # Use the normalized_name for matching
+    # Create a mapping of choice (Lender Name) to the lender
+    choices = {lender.name: lender for lender in snapshot.lenders}
     best_match = process.extractOne(normalized_name, choices.keys())
-    # ------------------------
 
-    if best_match and best_match[1] >= CONFIDENCE_THRESHOLD:
-        # Return the Lender object from the choices map
+    if best_match and best_match[1] >= NAME_MATCH_THRESHOLD:
         return choices[best_match[0]]
 
     return None
 
+
+async def _run_sql_template(question: str) -> Optional[str]:
+    """
+    Answers the question with a pre-written analytics template when one
+    matches (see core/sql_templates.py). Returns None to fall back to LLM SQL.
+    """
+    lender_names = [lender.name for lender in (await catalog.get()).lenders]
+    match = match_template(question, lender_names)
+    if match is None:
+        return None
+
+    async with AsyncSessionFactory() as session:
+        try:
+            # Templates are written against indexed columns, so skip the cost check
+            column_names, rows, truncated = await run_readonly(session, match.sql, params=match.params, max_cost=0)
+        except Exception as e:
+            print(f"⚠️  SQL template '{match.name}' failed, falling back to LLM SQL: {e}")
+            return None
+    SQL_ASSISTANT_QUERIES.labels(match.name).inc()
+
+    if not rows:
+        return f"The query executed successfully, but returned no results ({match.description})."
+    return _format_query_result(column_names, rows, truncated, f"**Query Result ({match.description}):**")
+
+
+def _scenario_query(
+    fico_score: int, loan_amount: float, ltv: float, occ_enum: OccupancyType, lp_enum: LoanPurposeType,
+    dscr: Optional[float] = None
+):
+    """
+    Builds the scenario-search query against the scenario_search materialized
+    view (rules denormalized with lender and program names). FICO, loan amount
+    and DSCR are matched by range containment (GiST indexed), occupancy and
+    purpose via the composite index.
+    """
+    v = scenario_search.c
+    query = (
+        select(
+            v.lenderName.label("lender_name"),
+            v.programName.label("program_name"),
+            v.maxLtv,
+            v.reservesMonths,
+            v.notes,
+            v.minFicoScore,
+            v.maxFicoScore,
+            v.minLoanAmount,
+            v.maxLoanAmount,
+            v.dscrValue
+        )
+        .where(
+            and_(
+                v.occupancyType == occ_enum,
+                v.loanPurpose == lp_enum,
+                v.ficoRange.contains(fico_score),
+                v.loanAmountRange.contains(cast(loan_amount, Numeric)),
+                or_(v.maxLtv.is_(None), v.maxLtv >= ltv)
+            )
+        )
+        .order_by(v.lenderName, v.programName, v.maxLtv.desc())
+    )
+    if dscr is not None:
+        query = query.where(v.dscrRange.contains(cast(dscr, Numeric)))
+    return query
+
+
+def _format_amount(value) -> str:
+    return f"${value:,.0f}" if value is not None else "no limit"
+
+
+def _format_amount_range(low, high) -> str:
+    if low is None and high is None:
+        return "any"
+    if low is None:
+        return f"up to {_format_amount(high)}"
+    if high is None:
+        return f"{_format_amount(low)}+"
+    return f"{_format_amount(low)}-{_format_amount(high)}"
+
 # --- Specialized Tools ---
 
 # @tool
@@ -163,37 +265,24 @@ async def _find_lender_by_name(session, name: str) -> Optional[Lender]:
 @tool
 async def get_available_lenders() -> str:
     """
-    Retrieves a list of all available lenders.
-    This version does not query the database but returns a predefined list
-    of lenders with their IDs and names.
-    """
-    lenders = [
-        {
-            "id": "11111111-1111-1111-1111-111111111111",
-            "name": "Champions Funding, LLC"
-        },
-        {
-            "id": "11111111-2222-2222-2222-111111111111",
-            "name": "NQM FUNDING"
-        },
-        {
-            "id": "11111111-3333-3333-3333-111111111111",
-            "name": "ARC Home"
-        }
-    ]
-
-    if not lenders:
+    Retrieves a list of all available lenders with their IDs.
+    Use this when the user asks "who are your lenders?" or "list all lenders".
+    Served from the in-memory catalog snapshot.
+    """
+    snapshot = await catalog.get()
+    if not snapshot.lenders:
         return "No lenders found."
 
     # Format as a readable string
     lender_list = "\n".join(
-        [f"- {lender['name']} (ID: {lender['id']})" for lender in lenders]
+        f"- {lender.name} (ID: {lender.id}, {len(lender.programs)} programs)" for lender in snapshot.lenders
     )
 
     return f"Available Lenders:\n{lender_list}"
 
 
 @tool
+@query_origin
 async def get_conversation_history(conversation_id: str, max_messages: Optional[int] = None) -> str:
     """
     Returns the past messages for a conversation ID in chronological order.
@@ -237,6 +326,7 @@ async def get_conversation_history(conversation_id: str, max_messages: Optional[
 
 
 @tool
+@query_origin
 async def get_loan_programs_by_lender(lenderId: str) -> str:
     """
     Retrieves all loan programs offered by a specific lender.
@@ -245,92 +335,97 @@ async def get_loan_programs_by_lender(lenderId: str) -> str:
     Args:
         lenderId (str): The id of the lender to search for.
     """
-    async with AsyncSessionFactory() as session:
-        try:
-            # --- 1. Fetch Lender to get the name (FIXED) ---
-            lender_query = select(Lender.name).where(Lender.id == lenderId)
-            lender_result = await session.execute(lender_query)
-            lender_name = lender_result.scalar_one_or_none()
-
-            if not lender_name:
-                 return f"No lender found with ID '{lenderId}'."
-
-            # --- 2. Fetch Programs (FIXED) ---
-            # Use '==' for an exact ID match
-            query = select(LoanProgram.id, LoanProgram.name, LoanProgram.programCode, LoanProgram.description) \
-                    .where(LoanProgram.lenderId == lenderId) \
-                    .order_by(LoanProgram.name)
-            
-            result = await session.execute(query)
-            programs = result.fetchall()
-            
-            if not programs:
-                return f"No loan programs found for lender '{lender_name}'."
-            
-            # --- 3. Format Output (CLEANED) ---
-            # This formatting is much clearer for the LLM and user
-            result_str = f"Loan Programs for lender '{lender_name}':\n"
-            for prog in programs:
-                result_str += f"\n- **{prog.name}**\n"
-                result_str += f"  - ID: {prog.id}\n"
-                result_str += f"  - Code: {prog.programCode}\n"
-                result_str += f"  - Description: {prog.description}\n"
-            
-            return result_str
-        
-        except Exception as e:
-            print(f"[get_loan_programs_by_lender ERROR] {e}")
-            return f"Error retrieving loan programs: {e}"
+    try:
+        # --- 1. Look up the lender in the catalog snapshot ---
+        lender = (await catalog.get()).lenders_by_id.get(lenderId)
+        if not lender:
+            return f"No lender found with ID '{lenderId}'."
+
+        if not lender.programs:
+            return f"No loan programs found for lender '{lender.name}'."
+
+        # --- 2. Format Output ---
+        result_str = f"Loan Programs for lender '{lender.name}':\n"
+        for prog in lender.programs:
+            result_str += f"\n- **{prog.name}**\n"
+            result_str += f"  - ID: {prog.id}\n"
+            result_str += f"  - Code: {prog.program_code}\n"
+            result_str += f"  - Description: {prog.description}\n"
+
+        return result_str
+
+    except Exception as e:
+        print(f"[get_loan_programs_by_lender ERROR] {e}")
+        return f"Error retrieving loan programs: {e}"
+
 @tool
-async def get_program_guidelines(program_id: str, category: Optional[str] = None) -> str:
+@query_origin
+async def get_program_guidelines(program_id: str, category: Optional[str] = None, full_text: bool = False) -> str:
     """
     Retrieves guidelines for a given loan program by ID, optionally filtered by category.
     This avoids fuzzy name issues and ensures enum-safe filtering.
+    Returns a compact digest: one line per category, or the digest of the
+    requested category. Pass full_text=True when the user needs the exact wording.
 
     Args:
         program_id (str): The UUID of the loan program.
         category (Optional[str]): Optional guideline category (e.g., 'OCCUPANCY', 'LOAN_AMOUNTS').
                                   Must match one of GuidelineCategory names.
+        full_text (bool): Return the guidelines (of the category, if given) in full instead of the digest.
     """
     async with AsyncSessionFactory() as session:
         try:
-            # --- 1. Fetch the program (FIXED) ---
-            # We are looking for an exact ID, so we use '=='
-            query = select(LoanProgram).where(LoanProgram.id == program_id)
-            result = await session.execute(query)
-            
-            # Use .scalar_one_or_none() for a simpler way to get a single item
-            program = result.scalar_one_or_none()
+            # --- 1. Look up the program in the catalog snapshot ---
+            program = (await catalog.get()).programs_by_id.get(program_id)
 
             if not program:
                 return f"❌ Could not find a loan program with ID '{program_id}'."
 
-            # --- 2. Base query for guidelines ---
-            query = (
-                select(Guideline.category, Guideline.content)
-                .where(Guideline.loanProgramId == program.id)
-                .order_by(Guideline.category)
-            )
-
-            # --- 3. Filter by category if provided ---
+            # --- 2. Validate the category ---
+            cat_enum = None
             if category:
                 try:
                     cat_enum = GuidelineCategory[category.upper()]
-                    query = query.where(Guideline.category == cat_enum)
                 except KeyError:
                     valid_cats = ', '.join([e.name for e in GuidelineCategory])
                     return f"❌ Invalid category '{category}'. Valid categories: {valid_cats}"
 
-            # --- 4. Execute query ---
+            # --- 3. Serve the precomputed digest (program overview or one category) ---
+            if not full_text:
+                digest = await session.get(GuidelineDigest, program.id)
+                if digest is not None and cat_enum is None:
+                    return (
+                        f"📘 Guideline digest for Program: **{program.name}** "
+                        f"({digest.guidelineCount} guidelines)\n{digest.content}\n"
+                        "\n*Digest only: ask for a category for its digest, or full_text=True for the complete wording.*"
+                    )
+                category_digest = (digest.categories or {}).get(cat_enum.name) if digest is not None else None
+                if category_digest:
+                    return (
+                        f"📘 Guideline digest for Program: **{program.name}**, category **{cat_enum.name}**\n"
+                        f"{category_digest}\n"
+                        "\n*Digest only: ask with full_text=True for the complete wording.*"
+                    )
+
+            # --- 4. Base query for guidelines ---
+            query = (
+                select(Guideline.category, Guideline.content)
+                .where(Guideline.loanProgramId == program.id)
+                .order_by(Guideline.category)
+            )
+            if cat_enum is not None:
+                query = query.where(Guideline.category == cat_enum)
+
+            # --- 5. Execute query ---
             result = await session.execute(query)
             guidelines = result.fetchall()
 
-            # --- 5. Handle no results ---
+            # --- 6. Handle no results ---
             if not guidelines:
                 filter_msg = f" in category '{category}'" if category else ""
                 return f"⚠️ No guidelines found for program '{program.name}'{filter_msg}."
 
-            # --- 6. Format results ---
+            # --- 7. Format results ---
             result_str = f"📘 Guidelines for Program: **{program.name}**\n"
             current_cat = None
             for g in guidelines:
@@ -345,14 +440,212 @@ async def get_program_guidelines(program_id: str, category: Optional[str] = None
             # Provide a more detailed error log for debugging
             print(f"[get_program_guidelines ERROR] {e}")
             return f"💥 Error retrieving guidelines: {e}"
+
+
+def _guidelines_query(program_ids: Optional[List[str]], lender_id: Optional[str], categories: Optional[list]):
+    """
+    One query for the guidelines of many programs (or all of a lender's
+    programs) and categories, served by idx_guideline_program_category.
+    """
+    query = (
+        select(Guideline.loanProgramId, Guideline.category, Guideline.content, LoanProgram.name.label("program_name"))
+        .join(LoanProgram, LoanProgram.id == Guideline.loanProgramId)
+        .order_by(Guideline.category, LoanProgram.name)
+    )
+    if program_ids:
+        query = query.where(Guideline.loanProgramId.in_(program_ids))
+    if lender_id:
+        query = query.where(LoanProgram.lenderId == lender_id)
+    if categories:
+        query = query.where(Guideline.category.in_(categories))
+    return query
+
+
+@tool
+@query_origin
+async def get_guidelines_for_programs(
+    program_ids: Optional[List[str]] = None,
+    lender_id: Optional[str] = None,
+    categories: Optional[List[str]] = None
+) -> str:
+    """
+    Retrieves guidelines for several loan programs and categories in one call,
+    e.g. "gift fund rules for all ARC Home programs". Pass program IDs, or a
+    lender ID for all of that lender's programs. Text shared by several
+    programs is shown once with the programs it applies to.
+    Use this instead of calling get_program_guidelines once per program.
+
+    Args:
+        program_ids (List[str], optional): UUIDs of the loan programs.
+        lender_id (str, optional): UUID of a lender; covers all of its programs.
+        categories (List[str], optional): Guideline categories (e.g. 'GIFT_FUNDS', 'RESERVES').
+                                          Must match GuidelineCategory names.
+    """
+    if not program_ids and not lender_id:
+        return "❌ Provide program_ids or a lender_id."
+
+    cat_enums = []
+    for category in categories or []:
+        try:
+            cat_enums.append(GuidelineCategory[category.strip().upper()])
+        except KeyError:
+            valid_cats = ', '.join([e.name for e in GuidelineCategory])
+            return f"❌ Invalid category '{category}'. Valid categories: {valid_cats}"
+
+    async with AsyncSessionFactory() as session:
+        try:
+            result = await session.execute(_guidelines_query(program_ids, lender_id, cat_enums))
+            guidelines = result.fetchall()
+
+            filter_msg = f" in {', '.join(c.name for c in cat_enums)}" if cat_enums else ""
+            if not guidelines:
+                return f"⚠️ No guidelines found for the requested programs{filter_msg}."
+
+            # Group by category, then by identical content -> the programs sharing it
+            grouped = {}
+            program_names = {}
+            for g in guidelines:
+                program_names[g.loanProgramId] = g.program_name
+                programs = grouped.setdefault(g.category.name, {}).setdefault(g.content.strip(), [])
+                if g.program_name not in programs:
+                    programs.append(g.program_name)
+
+            total = len(program_names)
+            result_str = f"📘 Guidelines for {total} program(s){filter_msg}:\n"
+            for category, contents in grouped.items():
+                result_str += f"\n**--- {category} ---**\n"
+                for content, programs in contents.items():
+                    applies_to = f"all {total} programs" if len(programs) == total and total > 1 else ", ".join(programs)
+                    result_str += f"- {content}\n  *Applies to: {applies_to}*\n"
+            return result_str
+
+        except Exception as e:
+            print(f"[get_guidelines_for_programs ERROR] {e}")
+            return f"💥 Error retrieving guidelines: {e}"
+
+
+def _guideline_search_query(
+    search: str, lender_id: Optional[str] = None, program_name: Optional[str] = None,
+    category: Optional[GuidelineCategory] = None, limit: int = 10
+):
+    """
+    Ranked full-text search over guideline.contentTsv (GIN indexed). The
+    query string uses web-search syntax: quoted phrases, OR and -exclusions.
+    Highlighted snippets are only built for the top `limit` hits.
+    """
+    ts_config = cast(literal(GUIDELINE_TS_CONFIG), REGCONFIG)
+    ts_query = func.websearch_to_tsquery(ts_config, search)
+    rank = func.ts_rank_cd(Guideline.contentTsv, ts_query).label("rank")
+    hits = (
+        select(
+            Guideline.category, Guideline.content, rank,
+            LoanProgram.name.label("program_name"), Lender.name.label("lender_name"),
+        )
+        .join(LoanProgram, LoanProgram.id == Guideline.loanProgramId)
+        .join(Lender, Lender.id == LoanProgram.lenderId)
+        .where(Guideline.contentTsv.bool_op("@@")(ts_query))
+        .order_by(rank.desc(), LoanProgram.name)
+        .limit(limit)
+    )
+    if lender_id:
+        hits = hits.where(LoanProgram.lenderId == lender_id)
+    if program_name:
+        hits = hits.where(LoanProgram.name == program_name)
+    if category:
+        hits = hits.where(Guideline.category == category)
+    hits = hits.subquery()
+    snippet = func.ts_headline(
+        ts_config, hits.c.content, ts_query, "StartSel=**, StopSel=**, MaxWords=40, MinWords=15, MaxFragments=2"
+    ).label("snippet")
+    return select(hits, snippet).order_by(hits.c.rank.desc(), hits.c.program_name)
+
+
+@tool
+@query_origin
+async def search_guidelines(
+    query: str,
+    lender_name: Optional[str] = None,
+    program_name: Optional[str] = None,
+    category: Optional[str] = None,
+    limit: int = 10
+) -> str:
+    """
+    Ranked keyword search over all guideline text, optionally limited to a
+    lender, a program or a category. Use it for keyword-heavy questions
+    ("which programs allow non-warrantable condos?", "ITIN gift funds") when
+    you don't know the program. It is exact and faster than
+    query_document_vector_store. Supports "quoted phrases", OR and -exclusions.
+
+    Args:
+        query (str): Keywords to search for.
+        lender_name (str, optional): Only search this lender's programs (fuzzy matched).
+        program_name (str, optional): Only search programs with this name (fuzzy matched).
+        category (str, optional): Guideline category (e.g. 'GIFT_FUNDS'); must match a GuidelineCategory name.
+        limit (int, optional): Maximum number of hits (default 10).
+    """
+    async with AsyncSessionFactory() as session:
+        try:
+            filters_applied = [f"Query: {query}"]
+
+            cat_enum = None
+            if category:
+                try:
+                    cat_enum = GuidelineCategory[category.strip().upper()]
+                except KeyError:
+                    valid_cats = ', '.join([e.name for e in GuidelineCategory])
+                    return f"❌ Invalid category '{category}'. Valid categories: {valid_cats}"
+                filters_applied.append(f"Category: {cat_enum.name}")
+
+            lender_id = None
+            if lender_name:
+                lender = await _find_lender_by_name(lender_name)
+                if not lender:
+                    return f"Could not find a lender matching '{lender_name}'."
+                lender_id = lender.id
+                filters_applied.append(f"Lender: {lender.name}")
+
+            matched_program = None
+            if program_name:
+                program = await _find_program_by_name(program_name)
+                if not program:
+                    return f"Could not find a loan program matching '{program_name}'."
+                matched_program = program.name
+                filters_applied.append(f"Program: {matched_program}")
+
+            query_obj = _guideline_search_query(query, lender_id, matched_program, cat_enum, max(1, min(limit, 50)))
+            hits = (await session.execute(query_obj)).fetchall()
+            if not hits:
+                return "😕 No guidelines matched:\n" + "\n".join(filters_applied)
+
+            # The same text is often shared by several programs; show it once
+            grouped = {}
+            for hit in hits:
+                entry = grouped.setdefault(hit.content.strip(), {"hit": hit, "programs": []})
+                label = f"{hit.lender_name} - {hit.program_name}"
+                if label not in entry["programs"]:
+                    entry["programs"].append(label)
+
+            result_str = f"🔎 {len(hits)} guideline match(es) for " + ", ".join(filters_applied) + ":\n"
+            for i, entry in enumerate(grouped.values(), 1):
+                hit = entry["hit"]
+                result_str += f"\n**{i}. {hit.category.name}** (rank {hit.rank:.3f})\n"
+                result_str += f"- {hit.snippet}\n"
+                result_str += f"  *Programs: {', '.join(entry['programs'])}*\n"
+            return result_str
+
+        except Exception as e:
+            print(f"[search_guidelines ERROR] {e}")
+            return f"💥 Error searching guidelines: {e}"
         
 @tool
+@query_origin
 async def find_eligibility_rules(
     program_name: str, 
     fico_score: Optional[int] = None, 
     loan_amount: Optional[float] = None, 
     occupancy: Optional[str] = None, 
-    loan_purpose: Optional[str] = None
+    loan_purpose: Optional[str] = None,
+    dscr: Optional[float] = None
 ) -> str:
     """
     Finds matching eligibility matrix rules (e.g., max LTV, reserves) for a loan program 
@@ -367,10 +660,11 @@ async def find_eligibility_rules(
                                    Must be one of {', '.join([e.name for e in OccupancyType])}.
         loan_purpose (str, optional): The purpose of the loan. 
                                       Must be one of {', '.join([e.name for e in LoanPurposeType])}.
+        dscr (float, optional): The property's DSCR; keeps rules whose DSCR requirement it meets.
     """
     async with AsyncSessionFactory() as session:
         try:
-            program = await _find_program_by_name(session, program_name)
+            program = await _find_program_by_name(program_name)
             if not program:
                 return f"Could not find a loan program matching '{program_name}'."
 
@@ -391,18 +685,16 @@ async def find_eligibility_rules(
             filters_applied = [f"Program: {program.name}"]
             
             if fico_score:
-                query = query.where(
-                    EligibilityMatrixRule.minFicoScore <= fico_score,
-                    EligibilityMatrixRule.maxFicoScore >= fico_score
-                )
+                query = query.where(EligibilityMatrixRule.ficoRange.contains(fico_score))
                 filters_applied.append(f"FICO >= {fico_score}")
                 
             if loan_amount:
-                query = query.where(
-                    EligibilityMatrixRule.minLoanAmount <= loan_amount,
-                    EligibilityMatrixRule.maxLoanAmount >= loan_amount
-                )
+                query = query.where(EligibilityMatrixRule.loanAmountRange.contains(cast(loan_amount, Numeric)))
                 filters_applied.append(f"Loan Amount: {loan_amount}")
+
+            if dscr is not None:
+                query = query.where(EligibilityMatrixRule.dscrRange.contains(cast(dscr, Numeric)))
+                filters_applied.append(f"DSCR: {dscr}")
             
             if occupancy:
                 try:
@@ -456,9 +748,181 @@ async def find_eligibility_rules(
             return f"Error finding eligibility rules: {e}"
 
 
+@tool
+@query_origin
+async def get_eligibility_curve(
+    program_name: str,
+    occupancy: str,
+    loan_purpose: str,
+    dscr: Optional[float] = None
+) -> str:
+    """
+    Shows how a loan program's max LTV and reserves change across FICO and
+    loan-amount bands for one occupancy and purpose, as a single table.
+    Use it for "what if" questions ("what if the FICO were 20 points higher?",
+    "how much LTV do I gain under $1M?") instead of calling
+    find_eligibility_rules once per FICO score or loan amount.
+
+    Args:
+        program_name (str): The name of the loan program (fuzzy matched).
+        occupancy (str): One of PRIMARY, SECOND_HOME, INVESTMENT, INVESTOR.
+        loan_purpose (str): One of PURCHASE, RATE_TERM, CASH_OUT, SECOND_LIEN.
+        dscr (float, optional): The property's DSCR; keeps rules whose DSCR requirement it meets.
+    """
+    async with AsyncSessionFactory() as session:
+        try:
+            try:
+                occ_enum = OccupancyType[occupancy.upper()]
+            except KeyError:
+                valid_occs = ', '.join([e.name for e in OccupancyType])
+                return f"Invalid occupancy '{occupancy}'. Valid types are: {valid_occs}"
+            try:
+                lp_enum = LoanPurposeType[loan_purpose.upper()]
+            except KeyError:
+                valid_lps = ', '.join([e.name for e in LoanPurposeType])
+                return f"Invalid loan purpose '{loan_purpose}'. Valid types are: {valid_lps}"
+
+            program = await _find_program_by_name(program_name)
+            if not program:
+                return f"Could not find a loan program matching '{program_name}'."
+
+            curve = await load_curve(session, program.id, occ_enum, lp_enum, dscr)
+            scenario = f"{program.name} | Occupancy: {occ_enum.name} | Purpose: {lp_enum.name}"
+            if dscr is not None:
+                scenario += f" | DSCR: {dscr}"
+            if not curve.cells:
+                return f"No eligibility rules found for {scenario}."
+
+            result_str = (
+                f"Max LTV / reserves by FICO and loan amount for {scenario} "
+                f"({curve.rule_count} rules; '-' = not eligible):\n\n{format_table(curve)}\n"
+            )
+            if curve.has_dscr_rules and not curve.dscr_applied:
+                result_str += "\n*Some rules have DSCR requirements; pass `dscr` to apply them.*\n"
+            return result_str
+
+        except Exception as e:
+            return f"Error building eligibility curve: {e}"
+
+
+@tool
+@query_origin
+async def compare_programs(
+    program_names: List[str],
+    fico_score: Optional[int] = None,
+    loan_amount: Optional[float] = None,
+    occupancy: Optional[str] = None,
+    loan_purpose: Optional[str] = None,
+    dscr: Optional[float] = None
+) -> str:
+    """
+    Compares several loan programs side by side in one call (e.g. "DSCR Plus
+    vs Flex Select vs Non-QM Select at 700 FICO"). Use it instead of calling
+    find_eligibility_rules once per program. Program names are fuzzy matched;
+    include the lender name to pick between programs with the same name.
+
+    Args:
+        program_names (List[str]): The programs to compare (2 or more).
+        fico_score (int, optional): The borrower's FICO score.
+        loan_amount (float, optional): The loan amount.
+        occupancy (str, optional): One of PRIMARY, SECOND_HOME, INVESTMENT, INVESTOR.
+        loan_purpose (str, optional): One of PURCHASE, RATE_TERM, CASH_OUT, SECOND_LIEN.
+        dscr (float, optional): The property's DSCR; keeps rules whose DSCR requirement it meets.
+    """
+    async with AsyncSessionFactory() as session:
+        try:
+            v = scenario_search.c
+            filters_applied, conditions = [], []
+            if fico_score:
+                conditions.append(v.ficoRange.contains(fico_score))
+                filters_applied.append(f"FICO: {fico_score}")
+            if loan_amount:
+                conditions.append(v.loanAmountRange.contains(cast(loan_amount, Numeric)))
+                filters_applied.append(f"Loan Amount: {_format_amount(loan_amount)}")
+            if occupancy:
+                try:
+                    occ_enum = OccupancyType[occupancy.upper()]
+                except KeyError:
+                    valid_occs = ', '.join([e.name for e in OccupancyType])
+                    return f"Invalid occupancy '{occupancy}'. Valid types are: {valid_occs}"
+                conditions.append(v.occupancyType == occ_enum)
+                filters_applied.append(f"Occupancy: {occ_enum.name}")
+            if loan_purpose:
+                try:
+                    lp_enum = LoanPurposeType[loan_purpose.upper()]
+                except KeyError:
+                    valid_lps = ', '.join([e.name for e in LoanPurposeType])
+                    return f"Invalid loan purpose '{loan_purpose}'. Valid types are: {valid_lps}"
+                conditions.append(v.loanPurpose == lp_enum)
+                filters_applied.append(f"Purpose: {lp_enum.name}")
+            if dscr is not None:
+                conditions.append(v.dscrRange.contains(cast(dscr, Numeric)))
+                filters_applied.append(f"DSCR: {dscr}")
+
+            # --- 1. Resolve every name against one catalog read ---
+            resolved, unmatched = await _find_programs_by_names(program_names)
+            if not resolved:
+                return f"Could not find loan programs matching: {', '.join(program_names)}."
+
+            # --- 2. One query for all programs' matching rules ---
+            query = select(
+                v.loanProgramId, v.maxLtv, v.reservesMonths, v.minFicoScore,
+                v.minLoanAmount, v.maxLoanAmount, v.minDscr
+            ).where(v.loanProgramId.in_([program.id for _, program in resolved]), *conditions)
+            rules_by_program = {}
+            for rule in (await session.execute(query)).fetchall():
+                rules_by_program.setdefault(rule.loanProgramId, []).append(rule)
+
+            # --- 3. One column per program ---
+            columns = []
+            for _, program in resolved:
+                rules = rules_by_program.get(program.id, [])
+                if not rules:
+                    columns.append([program.lender_name, "0", "-", "-", "-", "-", "-"])
+                    continue
+                # Most generous rule: no LTV cap beats any cap, then fewest reserves
+                best = max(rules, key=lambda r: (
+                    r.maxLtv is None, r.maxLtv or 0, -(r.reservesMonths if r.reservesMonths is not None else 999)
+                ))
+                min_ficos = [r.minFicoScore for r in rules if r.minFicoScore is not None]
+                min_amounts = [r.minLoanAmount for r in rules if r.minLoanAmount is not None]
+                max_amounts = [r.maxLoanAmount for r in rules]
+                min_dscrs = [r.minDscr for r in rules if r.minDscr is not None]
+                columns.append([
+                    program.lender_name,
+                    str(len(rules)),
+                    f"{best.maxLtv:g}%" if best.maxLtv is not None else "no max",
+                    f"{best.reservesMonths} months" if best.reservesMonths is not None else "-",
+                    str(min(min_ficos)) if min_ficos else "-",
+                    _format_amount_range(
+                        min(min_amounts) if min_amounts else None,
+                        None if None in max_amounts else max(max_amounts),
+                    ),
+                    f"{min(min_dscrs):g}" if min_dscrs else "none",
+                ])
+
+            labels = ["Lender", "Matching rules", "Best max LTV", "Reserves (at best LTV)",
+                      "Lowest min FICO", "Loan amounts", "Lowest min DSCR"]
+            header = [""] + [program.name for _, program in resolved]
+            lines = ["| " + " | ".join(header) + " |", "|" + "---|" * len(header)]
+            for i, label in enumerate(labels):
+                lines.append("| " + " | ".join([f"**{label}**"] + [column[i] for column in columns]) + " |")
+
+            result_str = f"Comparison of {len(resolved)} program(s)"
+            result_str += (f" for {', '.join(filters_applied)}" if filters_applied else "") + ":\n\n"
+            result_str += "\n".join(lines) + "\n"
+            if unmatched:
+                result_str += f"\nCould not find: {', '.join(unmatched)}\n"
+            return result_str
+
+        except Exception as e:
+            return f"Error comparing programs: {e}"
+
+
 # --- Fallback "Backup" Tool ---
 
 @tool
+@query_origin
 async def query_database_assistant(question: str) -> str:
     """
     Use this tool **ONLY** as a last resort for complex analytical questions
@@ -474,17 +938,24 @@ async def query_database_assistant(question: str) -> str:
     Args:
         question (str): The full natural language question from the user.
     """
-    # 1. Initialize the LLM for SQL generation
+    # 1. Answer common analytics questions from a parameterized template
+    if settings.SQL_TEMPLATES_ENABLED:
+        template_result = await _run_sql_template(question)
+        if template_result is not None:
+            return template_result
+    SQL_ASSISTANT_QUERIES.labels("llm").inc()
+
+    # 2. Initialize the LLM for SQL generation
     try:
-        # Using a powerful model for reliable SQL generation
-        llm = ChatGroq(temperature=0, groq_api_key=settings.GROQ_API_KEY, model_name="openai/gpt-oss-20b")
+        # The shared SQL-generator model from the configured provider
+        llm = get_chat_model(SQL_GENERATOR)
     except Exception as e:
         return f"Error initializing LLM: {e}"
 
-    # 2. Get the database schema
+    # 3. Get the database schema
     db_schema = await _get_db_schema_for_llm()
 
-    # 3. Create the prompt for the LLM to generate SQL
+    # 4. Create the prompt for the LLM to generate SQL
     # Note: We specify PostgreSQL as the dialect, matching the asyncpg driver.
     prompt_template = f"""
     You are an expert PostgreSQL query writer. Given a database schema and a user's question, 
@@ -510,9 +981,9 @@ async def query_database_assistant(question: str) -> str:
     **SQL Query:**
     """
 
-    # 4. Get the SQL query from the LLM
+    # 5. Get the SQL query from the LLM
     try:
-        sql_query = llm.invoke(prompt_template).content.strip()
+        sql_query = (await llm.ainvoke(prompt_template)).content.strip()
         # Clean up potential markdown formatting
         if sql_query.startswith("```sql"):
             sql_query = sql_query[6:]
@@ -523,29 +994,38 @@ async def query_database_assistant(question: str) -> str:
     except Exception as e:
         return f"Error generating SQL query: {e}"
 
-    # 5. **Security Check**: Only allow SELECT statements.
-    if not sql_query.lstrip().upper().startswith("SELECT"):
-        return "Error: For security reasons, only SELECT queries are allowed."
+    # 6. **Security Check**: Only allow a single SELECT statement.
+    try:
+        sql_query = check_statement(sql_query)
+    except QueryRejected as e:
+        return f"Error: {e}"
 
-    # 6. Execute the query and return the result
+    # 7. Prefer the columnar analytics replica, when one has been built
+    if analytics_replica.available():
+        try:
+            column_names, rows, truncated = await analytics_replica.run_query(sql_query)
+        except QueryRejected as e:
+            return f"Error: {e} The generated query was: {sql_query}"
+        except Exception as e:
+            # Usually Postgres-only syntax; the primary can still answer it
+            print(f"⚠️  Analytics replica couldn't run the query, using Postgres: {e}")
+        else:
+            if not rows:
+                return "The query executed successfully, but returned no results."
+            return _format_query_result(column_names, rows, truncated)
+
+    # 8. Execute the query on Postgres (read-only, time- and cost-limited, row-capped) and return the result
     async with AsyncSessionFactory() as session:
         try:
-            # Use sqlalchemy.text() to execute the raw SQL
-            query_result = await session.execute(text(sql_query))
-            rows = query_result.fetchall()
+            column_names, rows, truncated = await run_readonly(session, sql_query)
 
             if not rows:
                 return "The query executed successfully, but returned no results."
 
-            # Format the results into a readable string
-            column_names = query_result.keys()
-            result_str = "**Query Result:**\n"
-            result_str += ", ".join(column_names) + "\n"
-            result_str += "-" * (len(result_str) - 20) + "\n"
-            for row in rows:
-                result_str += ", ".join(map(str, row)) + "\n"
-                
-            return result_str
+            return _format_query_result(column_names, rows, truncated)
+
+        except QueryRejected as e:
+            return f"Error: {e} The generated query was: {sql_query}"
 
         except Exception as e:
             # If Postgres complains about an undefined column, it is often due to
@@ -580,15 +1060,8 @@ async def query_database_assistant(question: str) -> str:
 
                 if candidates:
                     repaired_sql = sql_query
-                    # If a previous statement failed, Postgres will mark the
-                    # transaction as aborted and further commands will raise
-                    # InFailedSQLTransactionError until a rollback occurs. Roll
-                    # back the session so we can safely retry the repaired SQL.
-                    try:
-                        await session.rollback()
-                    except Exception:
-                        # If rollback itself fails, continue to attempt the retry
-                        pass
+                    # run_readonly rolled back the failed transaction, so the
+                    # retry starts a fresh guarded one.
                     for ident in sorted(candidates, key=len, reverse=True):
                         lower_ident = ident.lower()
                         if lower_ident in sql_keywords:
@@ -600,20 +1073,17 @@ async def query_database_assistant(question: str) -> str:
                         repaired_sql = re.sub(rf"\b{re.escape(ident)}\b", f'"{ident}"', repaired_sql)
 
                     try:
-                        query_result = await session.execute(text(repaired_sql))
-                        rows = query_result.fetchall()
+                        column_names, rows, truncated = await run_readonly(session, repaired_sql)
 
                         if not rows:
                             return "The query executed successfully (after quoting), but returned no results."
 
-                        column_names = query_result.keys()
-                        result_str = "**Query Result (after quoting identifiers):**\n"
-                        result_str += ", ".join(column_names) + "\n"
-                        result_str += "-" * (len(result_str) - 20) + "\n"
-                        for row in rows:
-                            result_str += ", ".join(map(str, row)) + "\n"
+                        return _format_query_result(
+                            column_names, rows, truncated, "**Query Result (after quoting identifiers):**"
+                        )
 
-                        return result_str
+                    except QueryRejected as e2:
+                        return f"Error: {e2} The generated query was: {repaired_sql}"
 
                     except Exception as e2:
                         # Return original error plus attempted repaired SQL for debugging
@@ -623,15 +1093,19 @@ async def query_database_assistant(question: str) -> str:
             return f"Database error: {e}. The generated query was: {sql_query}"
         
 @tool
+@query_origin
 async def find_programs_by_scenario(
     fico_score: int, 
     loan_amount: float, 
     ltv: float, 
     loan_purpose: str, 
-    occupancy: str
+    occupancy: str,
+    dscr: Optional[float] = None
 ) -> str:
     """
     Finds all loan programs from all lenders that match a specific borrower scenario.
+    Pass `dscr` (the property's debt service coverage ratio, e.g. 1.1) for
+    investor DSCR scenarios to keep only rules whose DSCR requirement it meets.
     """
 
     async with AsyncSessionFactory() as session:
@@ -649,34 +1123,8 @@ async def find_programs_by_scenario(
                 valid_lps = ', '.join([e.name for e in LoanPurposeType])
                 return f"❌ Invalid loan purpose '{loan_purpose}'. Valid types are: {valid_lps}"
 
-            # --- 2. Build Query (ORM-safe, no case issues) ---
-            query = (
-                select(
-                    Lender.name.label("lender_name"),
-                    LoanProgram.name.label("program_name"),
-                    EligibilityMatrixRule.maxLtv,
-                    EligibilityMatrixRule.reservesMonths,
-                    EligibilityMatrixRule.notes,
-                    EligibilityMatrixRule.minFicoScore,
-                    EligibilityMatrixRule.maxFicoScore,
-                    EligibilityMatrixRule.minLoanAmount,
-                    EligibilityMatrixRule.maxLoanAmount
-                )
-                .join(LoanProgram, EligibilityMatrixRule.loanProgramId == LoanProgram.id)
-                .join(Lender, LoanProgram.lenderId == Lender.id)
-                .where(
-                    and_(
-                        EligibilityMatrixRule.minFicoScore <= fico_score,
-                        or_(EligibilityMatrixRule.maxFicoScore.is_(None), EligibilityMatrixRule.maxFicoScore >= fico_score),
-                        EligibilityMatrixRule.minLoanAmount <= loan_amount,
-                        or_(EligibilityMatrixRule.maxLoanAmount.is_(None), EligibilityMatrixRule.maxLoanAmount >= loan_amount),
-                        or_(EligibilityMatrixRule.maxLtv.is_(None), EligibilityMatrixRule.maxLtv >= ltv),
-                        EligibilityMatrixRule.occupancyType == occ_enum,
-                        EligibilityMatrixRule.loanPurpose == lp_enum
-                    )
-                )
-                .order_by(Lender.name, LoanProgram.name, EligibilityMatrixRule.maxLtv.desc())
-            )
+            # --- 2. Build Query (range containment on indexed columns) ---
+            query = _scenario_query(fico_score, loan_amount, ltv, occ_enum, lp_enum, dscr)
 
             # --- 3. Execute Query ---
             result = await session.execute(query)
@@ -691,6 +1139,8 @@ async def find_programs_by_scenario(
                     f"Occupancy: {occ_enum.name}",
                     f"Purpose: {lp_enum.name}"
                 ]
+                if dscr is not None:
+                    filters_applied.append(f"DSCR: {dscr}")
                 return (
                     "😕 No loan programs found matching this scenario:\n"
                     + "\n".join(filters_applied)
@@ -711,7 +1161,9 @@ async def find_programs_by_scenario(
                     result_str += f"  - *Notes:* {rule.notes}\n"
                 result_str += (
                     f"  - *Rule Range:* FICO {rule.minFicoScore}-{rule.maxFicoScore}, "
-                    f"Loan ${rule.minLoanAmount:,.0f}-${rule.maxLoanAmount:,.0f}\n"
+                    f"Loan {_format_amount(rule.minLoanAmount)}-{_format_amount(rule.maxLoanAmount)}"
+                    + (f", DSCR {rule.dscrValue}" if rule.dscrValue else "")
+                    + "\n"
                 )
 
             return result_str
@@ -1,9 +1,9 @@
 # ... other imports
+import asyncio
 from typing import List, Optional, Dict, Any
-from langchain_chroma import Chroma
-from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_core.tools import tool
 from config.settings import settings # Assuming your config has the VSTORE_DIR, etc.
+from core.vector_store import VectorStore, open_vector_store
 
 # --- Vector Store Tool ---
 
@@ -11,44 +11,31 @@ from config.settings import settings # Assuming your config has the VSTORE_DIR,
 # We cache this so we don't re-load the model and DB connection on every call
 _vector_store = None
 
-def _get_vector_store():
+def _get_vector_store() -> Optional[VectorStore]:
     """
-    Initializes and returns a connection to the *persistent* Chroma vector store
-    based on the configuration in settings.py.
-    Caches the connection globally to avoid re-loading on every call.
+    Initializes and returns the vector store backend selected by
+    VECTOR_BACKEND (core/vector_store.py): the persistent Chroma collection
+    or the memory-mapped exact-search index.
+    Caches it globally to avoid re-loading on every call.
     """
     global _vector_store
     
-    # If already initialized, return the cached connection
+    # If already initialized, return the cached store
     if _vector_store is not None:
         return _vector_store
 
     try:
-        # --- CRITICAL FIX ---
-        # We must ensure these settings are in your `config/settings.py` file.
-        # Based on your snippet, these are the correct values.
-        
         # 1. Check if settings are present
         if not all([settings.VSTORE_DIR, settings.COLLECTION_NAME, settings.EMBEDDING_MODEL]):
             raise ValueError("Vector store environment variables (VSTORE_DIR, COLLECTION_NAME, EMBEDDING_MODEL) are not set in settings.")
 
-        print(f"Initializing vector store from: {settings.VSTORE_DIR}")
-        
-        # 2. Initialize the embedding model
-        # This model MUST match the one used to *create* the database
-        embeddings = HuggingFaceEmbeddings(
-            model_name=settings.EMBEDDING_MODEL
-        )
+        print(f"Initializing '{settings.VECTOR_BACKEND}' vector store")
         
-        # 3. Connect to the existing persistent database
-        # This does NOT build a new DB. It loads the existing one.
-        _vector_store = Chroma(
-            collection_name=settings.COLLECTION_NAME,
-            embedding_function=embeddings,
-            persist_directory=settings.VSTORE_DIR
-        )
+        # 2. Open the existing store with the embedding model it was built with.
+        # This does NOT build a new store (see ingest_data.py).
+        _vector_store = open_vector_store()
         
-        print(f"Successfully connected to persistent vector store. Collection: '{settings.COLLECTION_NAME}'")
+        print(f"Successfully opened '{_vector_store.name}' vector store ({_vector_store.count()} chunks)")
         return _vector_store
     
     except Exception as e:
@@ -60,7 +47,7 @@ def _get_vector_store():
 @tool
 async def query_document_vector_store(query: str, k: int = 5) -> str:
     """
-    Searches the full-text document vector store (ChromaDB) for detailed context,
+    Searches the full-text document vector store for detailed context,
     definitions, and specific guidelines. Use this to find the "fine print"
     or to get more detail on a topic.
 
@@ -85,9 +72,8 @@ async def query_document_vector_store(query: str, k: int = 5) -> str:
         if vstore is None:
             return "Error: The document vector store is not available or failed to initialize. Please check server logs."
 
-        # 3. Get the retriever and search for documents
-        retriever = vstore.as_retriever(search_kwargs={"k": k})
-        docs = retriever.invoke(query)
+        # 3. Search for documents (embedding and scoring are CPU-bound; keep them off the event loop)
+        docs = await asyncio.to_thread(vstore.search, query, k)
 
         if not docs:
             return f"No detailed documents found matching the query: '{query}'"
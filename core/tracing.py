@@ -0,0 +1,456 @@
+# core/tracing.py
+"""
+Span-based tracing for chat turns.
+
+A trace covers one chat request and nests spans for each LangGraph node, tool
+invocation, LLM call (with token counts) and SQL statement, so the critical
+path of a slow turn is visible in one tree.
+
+Spans are exported in the OpenTelemetry OTLP/JSON format, either appended to a
+local file (one export request per line) or POSTed to an OTLP/HTTP collector
+such as the OpenTelemetry Collector or Jaeger. Tracing is off unless
+settings.TRACING_ENABLED is set, in which case `setup_tracing()` (called from
+main.py) installs the exporter and the SQLAlchemy hooks.
+
+`python -m bench.trace_view traces.jsonl` prints exported traces as a tree.
+"""
+import json
+import os
+import queue
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import AsyncCallbackHandler
+
+from config.settings import settings
+
+SCOPE_NAME = "mortgage_chatbot"
+MAX_ATTRIBUTE_LENGTH = 2000
+
+# OTLP span kinds and status codes
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+_processor: Optional["BatchSpanProcessor"] = None
+
+
+# --- Spans ---
+
+class Span:
+    """A single timed operation. Ended spans are handed to the active processor."""
+
+    def __init__(
+        self,
+        name: str,
+        parent: Optional["Span"] = None,
+        kind: int = SPAN_KIND_INTERNAL,
+        attributes: Optional[Dict[str, Any]] = None,
+    ):
+        self.name = name
+        self.kind = kind
+        self.trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent else ""
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.status_code = STATUS_OK
+        self.status_message = ""
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def record_error(self, error: BaseException):
+        self.status_code = STATUS_ERROR
+        self.status_message = f"{type(error).__name__}: {error}"[:MAX_ATTRIBUTE_LENGTH]
+
+    def end(self):
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        if _processor is not None:
+            _processor.on_end(self)
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or self.start_ns),
+            "attributes": [_otlp_attribute(k, v) for k, v in self.attributes.items() if v is not None],
+            "status": {"code": self.status_code},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        if self.status_message:
+            span["status"]["message"] = self.status_message
+        return span
+
+
+class _NoopSpan(Span):
+    """Returned when tracing is disabled so callers never need to check."""
+
+    def __init__(self):
+        self.name = ""
+        self.attributes = {}
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def record_error(self, error: BaseException):
+        pass
+
+    def end(self):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)[:MAX_ATTRIBUTE_LENGTH]}
+    return {"key": key, "value": typed}
+
+
+def enabled() -> bool:
+    return _processor is not None
+
+
+def current_span() -> Span:
+    """The innermost active span, or a no-op span outside any trace."""
+    return _current_span.get() or NOOP_SPAN
+
+
+def start_span(
+    name: str,
+    parent: Optional[Span] = None,
+    kind: int = SPAN_KIND_INTERNAL,
+    attributes: Optional[Dict[str, Any]] = None,
+) -> Span:
+    """Starts a span without making it current. Defaults to the current span as parent."""
+    if not enabled():
+        return NOOP_SPAN
+    if parent is None:
+        parent = _current_span.get()
+    return Span(name, parent=parent, kind=kind, attributes=attributes)
+
+
+@contextmanager
+def span(name: str, kind: int = SPAN_KIND_INTERNAL, **attributes):
+    """Runs the enclosed block inside a new current span."""
+    if not enabled():
+        yield NOOP_SPAN
+        return
+
+    new_span = start_span(name, kind=kind, attributes=attributes)
+    token = _current_span.set(new_span)
+    try:
+        yield new_span
+    except BaseException as e:
+        new_span.record_error(e)
+        raise
+    finally:
+        new_span.end()
+        try:
+            _current_span.reset(token)
+        except ValueError:
+            # Async generators may be finalized in a different context
+            _current_span.set(None)
+
+
+# --- Export ---
+
+class FileSpanExporter:
+    """Appends each batch as one OTLP/JSON ExportTraceServiceRequest line."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def export(self, payload: Dict[str, Any]):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(payload) + "\n")
+
+
+class OtlpHttpSpanExporter:
+    """POSTs batches to an OTLP/HTTP collector endpoint (JSON encoding)."""
+
+    def __init__(self, endpoint: str):
+        import httpx
+
+        self.endpoint = endpoint
+        self.client = httpx.Client(timeout=5.0)
+
+    def export(self, payload: Dict[str, Any]):
+        self.client.post(self.endpoint, json=payload)
+
+
+class BatchSpanProcessor:
+    """
+    Queues ended spans and exports them from a daemon thread, so request
+    handling never waits on file or network I/O.
+    """
+
+    def __init__(self, exporter, service_name: str, max_batch: int = 512, interval_s: float = 1.0):
+        self.exporter = exporter
+        self.resource = {"attributes": [
+            _otlp_attribute("service.name", service_name),
+            _otlp_attribute("process.pid", os.getpid()),
+        ]}
+        self.max_batch = max_batch
+        self.interval_s = interval_s
+        self.queue: "queue.Queue[Span]" = queue.Queue(maxsize=100_000)
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def on_end(self, span: Span):
+        try:
+            self.queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _drain(self) -> List[Span]:
+        batch = []
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def flush(self):
+        while True:
+            batch = self._drain()
+            if not batch:
+                return
+            payload = {"resourceSpans": [{
+                "resource": self.resource,
+                "scopeSpans": [{"scope": {"name": SCOPE_NAME}, "spans": [s.to_otlp() for s in batch]}],
+            }]}
+            try:
+                self.exporter.export(payload)
+            except Exception as e:
+                print(f"[tracing ERROR] Span export failed: {e}")
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval_s)
+            self.flush()
+
+
+# --- LangChain / LangGraph Instrumentation ---
+
+class TracingCallbackHandler(AsyncCallbackHandler):
+    """
+    Turns LangChain callbacks into spans: one per LangGraph node execution,
+    tool invocation and LLM call. Runs inline so the current span is visible to
+    the SQL hooks while a tool executes.
+    """
+
+    run_inline = True
+
+    def __init__(self, root: Optional[Span] = None):
+        self.root = root or _current_span.get()
+        self.spans: Dict[UUID, Span] = {}
+        self.span_parents: Dict[UUID, Optional[Span]] = {}
+        # Runs we don't trace (internal runnables) resolve to their nearest traced ancestor
+        self.aliases: Dict[UUID, Span] = {}
+
+    def _parent(self, parent_run_id: Optional[UUID]) -> Optional[Span]:
+        if parent_run_id is None:
+            return self.root
+        return self.spans.get(parent_run_id) or self.aliases.get(parent_run_id) or self.root
+
+    def _start(self, run_id: UUID, parent_run_id: Optional[UUID], name: str, kind: int, attributes: Dict[str, Any]):
+        parent = self._parent(parent_run_id)
+        new_span = start_span(name, parent=parent, kind=kind, attributes=attributes)
+        self.spans[run_id] = new_span
+        self.span_parents[run_id] = parent
+        _current_span.set(new_span)
+
+    def _end(self, run_id: UUID, error: Optional[BaseException] = None) -> Optional[Span]:
+        ended = self.spans.pop(run_id, None)
+        parent = self.span_parents.pop(run_id, None)
+        self.aliases.pop(run_id, None)
+        if ended is None:
+            return None
+        if _current_span.get() is ended:
+            _current_span.set(parent)
+        if error is not None:
+            ended.record_error(error)
+        ended.end()
+        return ended
+
+    # Chains (graph runs and nodes)
+
+    async def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, tags=None, metadata=None, **kwargs):
+        metadata = metadata or {}
+        name = kwargs.get("name") or ""
+        node = metadata.get("langgraph_node")
+        if parent_run_id is None:
+            self._start(run_id, None, f"graph.run {name}".strip(), SPAN_KIND_INTERNAL, {"graph.name": name})
+        elif node and name == node:
+            self._start(run_id, parent_run_id, f"graph.node {node}", SPAN_KIND_INTERNAL, {
+                "graph.node": node,
+                "graph.step": metadata.get("langgraph_step"),
+            })
+        else:
+            self.aliases[run_id] = self._parent(parent_run_id)
+
+    async def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end(run_id)
+
+    async def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
+
+    # Tools
+
+    async def on_tool_start(self, serialized, input_str, *, run_id, parent_run_id=None, **kwargs):
+        name = (serialized or {}).get("name") or kwargs.get("name") or "tool"
+        self._start(run_id, parent_run_id, f"tool {name}", SPAN_KIND_INTERNAL, {
+            "tool.name": name,
+            "tool.input": input_str,
+        })
+
+    async def on_tool_end(self, output, *, run_id, **kwargs):
+        ended = self.spans.get(run_id)
+        if ended is not None:
+            ended.set_attribute("tool.output_chars", len(str(getattr(output, "content", output))))
+        self._end(run_id)
+
+    async def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
+
+    # LLM calls
+
+    async def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        metadata = metadata or {}
+        model = metadata.get("ls_model_name") or (serialized or {}).get("name") or "llm"
+        self._start(run_id, parent_run_id, f"llm {model}", SPAN_KIND_CLIENT, {
+            "gen_ai.system": metadata.get("ls_provider"),
+            "gen_ai.request.model": model,
+            "gen_ai.request.message_count": sum(len(batch) for batch in messages),
+        })
+
+    async def on_llm_start(self, serialized, prompts, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        metadata = metadata or {}
+        model = metadata.get("ls_model_name") or "llm"
+        self._start(run_id, parent_run_id, f"llm {model}", SPAN_KIND_CLIENT, {
+            "gen_ai.system": metadata.get("ls_provider"),
+            "gen_ai.request.model": model,
+        })
+
+    async def on_llm_end(self, response, *, run_id, **kwargs):
+        ended = self.spans.get(run_id)
+        if ended is not None:
+            usage = llm_usage(response)
+            ended.set_attribute("gen_ai.usage.input_tokens", usage.get("input_tokens"))
+            ended.set_attribute("gen_ai.usage.output_tokens", usage.get("output_tokens"))
+            tool_calls = [
+                call["name"]
+                for gens in response.generations
+                for gen in gens
+                for call in getattr(getattr(gen, "message", None), "tool_calls", None) or []
+            ]
+            if tool_calls:
+                ended.set_attribute("gen_ai.response.tool_calls", ", ".join(tool_calls))
+        self._end(run_id)
+
+    async def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
+
+
+def llm_usage(response) -> Dict[str, int]:
+    """Extracts input/output token counts from an LLMResult, whichever way the provider reports them."""
+    input_tokens = output_tokens = 0
+    for gens in response.generations:
+        for gen in gens:
+            usage = getattr(getattr(gen, "message", None), "usage_metadata", None)
+            if usage:
+                input_tokens += usage.get("input_tokens", 0)
+                output_tokens += usage.get("output_tokens", 0)
+    if not (input_tokens or output_tokens):
+        token_usage = (response.llm_output or {}).get("token_usage") or {}
+        input_tokens = token_usage.get("prompt_tokens", 0)
+        output_tokens = token_usage.get("completion_tokens", 0)
+    return {"input_tokens": input_tokens, "output_tokens": output_tokens}
+
+
+# --- SQLAlchemy Instrumentation ---
+
+def instrument_engine(engine):
+    """Records a client span for every statement executed through the engine."""
+    from db import statement_hooks
+
+    db_system = engine.sync_engine.dialect.name
+
+    def _record(statement, elapsed_ms, rowcount, error, executemany):
+        if not enabled():
+            return
+        # The statement is timed by the shared hook; the span is created when it ends, backdated to its start
+        stmt_span = start_span(
+            f"db {statement.split(None, 1)[0].upper() if statement else 'SQL'}",
+            kind=SPAN_KIND_CLIENT,
+            attributes={
+                "db.system": db_system,
+                "db.statement": statement,
+                "db.executemany": executemany,
+            },
+        )
+        stmt_span.start_ns = time.time_ns() - int(elapsed_ms * 1e6)
+        if rowcount >= 0:
+            stmt_span.set_attribute("db.rowcount", rowcount)
+        if error is not None:
+            stmt_span.record_error(error)
+        stmt_span.end()
+
+    statement_hooks.add_handler(engine, _record)
+
+
+# --- Setup ---
+
+def setup_tracing(engine=None):
+    """Installs the exporter and engine hooks when settings.TRACING_ENABLED is set."""
+    global _processor
+    if not settings.TRACING_ENABLED or _processor is not None:
+        return
+
+    if settings.TRACE_EXPORTER == "otlp":
+        exporter = OtlpHttpSpanExporter(settings.TRACE_OTLP_ENDPOINT)
+        target = settings.TRACE_OTLP_ENDPOINT
+    else:
+        exporter = FileSpanExporter(settings.TRACE_FILE)
+        target = settings.TRACE_FILE
+
+    _processor = BatchSpanProcessor(exporter, settings.TRACE_SERVICE_NAME)
+    if engine is not None:
+        instrument_engine(engine)
+    print(f"✅ Tracing enabled. Exporting spans to {target}")
+
+
+def shutdown_tracing():
+    """Flushes any queued spans. Call on application shutdown."""
+    if _processor is not None:
+        _processor.flush()
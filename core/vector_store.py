@@ -0,0 +1,280 @@
+# core/vector_store.py
+"""
+Vector store backends behind query_document_vector_store.
+
+VECTOR_BACKEND selects one:
+
+- "chroma": the persistent Chroma collection in VSTORE_DIR (HNSW on SQLite),
+  as built by ingest_data.py.
+- "memmap": an exact-search index in VECTOR_INDEX_DIR. Our guideline corpus
+  is tens of thousands of chunks, so a brute-force scan of a float16 matrix
+  is fast and has perfect recall. The files:
+
+    vectors.npy   float16 (N, dim), L2-normalized, opened with mmap_mode="r"
+                  so every worker shares one copy through the page cache
+    chunks.jsonl  one {"text", "metadata"} line per row, also memory-mapped
+    offsets.npy   int64 byte offset of each line, so only the top-k chunks
+                  are ever read
+    manifest.json embedding model, dimension, row count
+
+  Search embeds the query, scores the matrix block by block (cosine similarity
+  is a dot product on normalized vectors) and takes the top k with
+  argpartition. Nothing is loaded at startup beyond the manifest. The three
+  data files are mapped together when the store is opened, so a rebuild
+  swapping in a new directory doesn't mix old offsets with new chunks; a
+  worker keeps serving the index it opened until it is restarted.
+
+Both backends answer `search(query, k)` with LangChain Documents (the memmap
+backend adds the score to the metadata). `build_memmap_index()` writes the
+index: ingest_data.py embeds the PDF chunks into it, and
+`python -m core.vector_store` copies an existing Chroma collection without
+re-embedding.
+
+NumPy is an optional dependency of the memmap backend (`pip install numpy`).
+"""
+import argparse
+import json
+import mmap
+import os
+import shutil
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from config.settings import settings
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+INDEX_FORMAT = 1
+# Rows scored per block; small enough that the block's float32 copy stays in cache
+SEARCH_BLOCK_ROWS = 256
+EMBED_BATCH = 256
+
+
+class VectorStore:
+    """Common interface of the backends."""
+
+    name = ""
+
+    def search(self, query: str, k: int) -> List[Document]:
+        raise NotImplementedError
+
+    def count(self) -> int:
+        raise NotImplementedError
+
+
+# --- Chroma ---
+
+class ChromaVectorStore(VectorStore):
+    name = "chroma"
+
+    def __init__(self, embeddings: Optional[Embeddings], directory: Optional[str] = None, collection: Optional[str] = None):
+        from langchain_chroma import Chroma
+
+        self._store = Chroma(
+            collection_name=collection or settings.COLLECTION_NAME,
+            embedding_function=embeddings,
+            persist_directory=directory or settings.VSTORE_DIR,
+        )
+
+    def search(self, query: str, k: int) -> List[Document]:
+        return self._store.similarity_search(query, k=k)
+
+    def count(self) -> int:
+        return self._store._collection.count()
+
+    def iter_rows(self, batch: int = 1000) -> Iterable[Tuple[Sequence[float], str, dict]]:
+        """(embedding, text, metadata) for every stored chunk, read in pages."""
+        collection = self._store._collection
+        for offset in range(0, collection.count(), batch):
+            page = collection.get(include=["embeddings", "documents", "metadatas"], limit=batch, offset=offset)
+            for embedding, text, metadata in zip(page["embeddings"], page["documents"], page["metadatas"]):
+                yield embedding, text, metadata or {}
+
+
+# --- Memory-mapped exact search ---
+
+def _require_numpy() -> None:
+    if np is None:
+        raise RuntimeError("The memmap vector backend needs NumPy: pip install numpy")
+
+
+_HALF_EXPONENT_REBIAS = np.float32(2.0 ** 112) if np is not None else None
+
+
+def _to_float32(block, bits, signs):
+    """
+    float16 -> float32 into the preallocated uint32 buffers. NumPy's own cast
+    is a scalar loop that costs ~10x the dot product; this is the same exact
+    conversion as integer ops: move sign and exponent/mantissa to their float32
+    positions, then rebias the exponent by multiplying by 2**112 (which also
+    handles subnormals). Finite values only, as normalized vectors are.
+    """
+    np.copyto(bits, block.view(np.uint16), casting="unsafe")
+    np.bitwise_and(bits, 0x8000, out=signs)
+    np.left_shift(signs, 16, out=signs)
+    np.bitwise_and(bits, 0x7FFF, out=bits)
+    np.left_shift(bits, 13, out=bits)
+    np.bitwise_or(bits, signs, out=bits)
+    values = bits.view(np.float32)
+    np.multiply(values, _HALF_EXPONENT_REBIAS, out=values)
+    return values
+
+
+class MemmapVectorStore(VectorStore):
+    name = "memmap"
+
+    def __init__(self, embeddings: Embeddings, directory: Optional[str] = None):
+        _require_numpy()
+        self._embeddings = embeddings
+        self.directory = Path(directory or settings.VECTOR_INDEX_DIR)
+        self.manifest = json.loads((self.directory / "manifest.json").read_text())
+        if self.manifest.get("format") != INDEX_FORMAT:
+            raise RuntimeError(f"Unsupported vector index format {self.manifest.get('format')} in {self.directory}")
+        if self.manifest["model"] != settings.EMBEDDING_MODEL:
+            raise RuntimeError(
+                f"Vector index in {self.directory} was built with '{self.manifest['model']}', "
+                f"but EMBEDDING_MODEL is '{settings.EMBEDDING_MODEL}'. Rebuild it."
+            )
+        self._vectors = np.load(self.directory / "vectors.npy", mmap_mode="r")
+        self._offsets = np.load(self.directory / "offsets.npy", mmap_mode="r")
+        with open(self.directory / "chunks.jsonl", "rb") as f:
+            self._chunk_file = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def count(self) -> int:
+        return self._vectors.shape[0]
+
+    def top_k(self, query_vector, k: int) -> Tuple[List[int], List[float]]:
+        """Row indices and cosine similarities of the k best rows, best first."""
+        query_vector = np.array(query_vector, dtype=np.float32)
+        query_vector /= np.linalg.norm(query_vector) or 1.0
+        rows = self._vectors.shape[0]
+        k = min(k, rows)
+        if k <= 0:
+            return [], []
+        scores = np.empty(rows, dtype=np.float32)
+        shape = (min(rows, SEARCH_BLOCK_ROWS), self._vectors.shape[1])
+        bits, signs = np.empty(shape, dtype=np.uint32), np.empty(shape, dtype=np.uint32)
+        for start in range(0, rows, SEARCH_BLOCK_ROWS):
+            block = self._vectors[start:start + SEARCH_BLOCK_ROWS]
+            np.dot(_to_float32(block, bits[:len(block)], signs[:len(block)]), query_vector,
+                   out=scores[start:start + len(block)])
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return best.tolist(), scores[best].tolist()
+
+    def _chunks(self, indices: List[int]) -> List[dict]:
+        chunks = []
+        for index in indices:
+            start = int(self._offsets[index])
+            chunks.append(json.loads(self._chunk_file[start:self._chunk_file.find(b"\n", start)]))
+        return chunks
+
+    def search(self, query: str, k: int) -> List[Document]:
+        indices, scores = self.top_k(self._embeddings.embed_query(query), k)
+        return [
+            Document(page_content=chunk["text"], metadata={**chunk["metadata"], "score": round(score, 4)})
+            for chunk, score in zip(self._chunks(indices), scores)
+        ]
+
+
+def build_memmap_index(rows: Iterable[Tuple[Sequence[float], str, dict]], total: int,
+                       directory: Optional[str] = None) -> int:
+    """
+    Writes an index from (embedding, text, metadata) rows into a temporary
+    directory and swaps it in, so readers never see a half-built index.
+    Vectors are streamed to disk, not held in memory. Returns the row count.
+    """
+    _require_numpy()
+    path = Path(directory or settings.VECTOR_INDEX_DIR)
+    tmp_path = path.with_name(path.name + ".tmp")
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    tmp_path.mkdir(parents=True)
+
+    vectors = None
+    offsets = np.lib.format.open_memmap(tmp_path / "offsets.npy", mode="w+", dtype=np.int64, shape=(total,))
+    count = 0
+    with open(tmp_path / "chunks.jsonl", "wb") as chunks:
+        for embedding, text, metadata in rows:
+            vector = np.asarray(embedding, dtype=np.float32)
+            if vectors is None:
+                vectors = np.lib.format.open_memmap(
+                    tmp_path / "vectors.npy", mode="w+", dtype=np.float16, shape=(total, vector.shape[0])
+                )
+            vectors[count] = vector / (np.linalg.norm(vector) or 1.0)
+            offsets[count] = chunks.tell()
+            chunks.write(json.dumps({"text": text, "metadata": metadata}, ensure_ascii=False).encode() + b"\n")
+            count += 1
+    if count != total:
+        shutil.rmtree(tmp_path)
+        raise ValueError(f"Expected {total} vectors, got {count}")
+    if vectors is None:
+        shutil.rmtree(tmp_path)
+        raise ValueError("No vectors to index")
+    vectors.flush()
+    offsets.flush()
+    dim = vectors.shape[1]
+    del vectors, offsets
+    (tmp_path / "manifest.json").write_text(json.dumps({
+        "format": INDEX_FORMAT, "model": settings.EMBEDDING_MODEL, "dim": dim, "count": count,
+    }))
+
+    old_path = path.with_name(path.name + ".old")
+    shutil.rmtree(old_path, ignore_errors=True)
+    if path.exists():
+        os.replace(path, old_path)
+    os.replace(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+    return count
+
+
+def embed_documents(documents: List[Document], embeddings: Embeddings) -> Iterable[Tuple[Sequence[float], str, dict]]:
+    """(embedding, text, metadata) rows for documents, embedded in batches."""
+    for start in range(0, len(documents), EMBED_BATCH):
+        batch = documents[start:start + EMBED_BATCH]
+        vectors = embeddings.embed_documents([doc.page_content for doc in batch])
+        for doc, vector in zip(batch, vectors):
+            yield vector, doc.page_content, doc.metadata
+
+
+# --- Selection ---
+
+BACKENDS = {"chroma": ChromaVectorStore, "memmap": MemmapVectorStore}
+
+
+def get_embeddings() -> Embeddings:
+    # The model MUST match the one used to build the store
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    return HuggingFaceEmbeddings(model_name=settings.EMBEDDING_MODEL)
+
+
+def open_vector_store(backend: Optional[str] = None, embeddings: Optional[Embeddings] = None) -> VectorStore:
+    """Opens the configured backend (VECTOR_BACKEND by default)."""
+    backend = (backend or settings.VECTOR_BACKEND).lower()
+    store_class = BACKENDS.get(backend)
+    if store_class is None:
+        raise ValueError(f"Unknown VECTOR_BACKEND '{backend}'. Valid backends are: {', '.join(BACKENDS)}")
+    return store_class(embeddings or get_embeddings())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Build the memory-mapped vector index from the Chroma collection in VSTORE_DIR (no re-embedding)."
+    )
+    parser.add_argument("--output", default=None, help="Index directory (default: VECTOR_INDEX_DIR).")
+    args = parser.parse_args(argv)
+
+    # Stored embeddings are copied as-is, so the embedding model isn't needed
+    source = ChromaVectorStore(None)
+    count = build_memmap_index(source.iter_rows(), source.count(), args.output)
+    print(f"✅ Wrote {count} vectors from Chroma to {args.output or settings.VECTOR_INDEX_DIR}.")
+
+
+if __name__ == "__main__":
+    main()
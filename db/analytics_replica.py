@@ -0,0 +1,179 @@
+# db/analytics_replica.py
+"""
+Optional in-process columnar replica of the catalog tables, for analytics SQL.
+
+`rebuild()` copies lender, loan_program, eligibility_matrix_rule and guideline
+from Postgres into a DuckDB file (ANALYTICS_REPLICA_PATH). It builds a
+temporary file and swaps it in atomically, so readers never see a half-built
+replica. db/import_data.py rebuilds it after every import. To rebuild by hand:
+
+    python -m db.analytics_replica
+
+When ANALYTICS_REPLICA_ENABLED is set and the file exists,
+query_database_assistant runs LLM-generated SQL here instead of on the
+primary. Aggregates are vectorized, and ad-hoc scans stay off the database
+that serves chat writes.
+
+DuckDB is an optional dependency (`pip install duckdb`). Without it the
+replica is reported as unavailable and queries go to Postgres.
+"""
+import asyncio
+import os
+import time
+import tempfile
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+from sqlalchemy import DateTime, Integer, Numeric
+
+from config.settings import settings
+from db.models import EligibilityMatrixRule, Guideline, Lender, LoanProgram
+from db.session import engine
+from db.sql_guard import QueryRejected, check_statement, limit_statement
+
+try:
+    import duckdb
+except ImportError:  # optional dependency
+    duckdb = None
+
+REPLICATED_MODELS = (Lender, LoanProgram, EligibilityMatrixRule, Guideline)
+NULL_MARKER = r"\N"
+
+
+def enabled() -> bool:
+    return settings.ANALYTICS_REPLICA_ENABLED and duckdb is not None
+
+
+def available() -> bool:
+    """True when the replica is enabled, DuckDB is installed and a replica has been built."""
+    return enabled() and Path(settings.ANALYTICS_REPLICA_PATH).exists()
+
+
+# --- Build ---
+
+def _replicated_columns(model) -> list:
+    # Generated range columns have no DuckDB equivalent; their bounds are replicated
+    return [c for c in model.__table__.columns if c.computed is None]
+
+
+def _duckdb_type(column) -> str:
+    if isinstance(column.type, Integer):
+        return "INTEGER"
+    if isinstance(column.type, Numeric):
+        return "DOUBLE"
+    if isinstance(column.type, DateTime):
+        return "TIMESTAMP"
+    return "VARCHAR"
+
+
+async def rebuild(path: Optional[str] = None) -> dict:
+    """
+    Snapshots the catalog tables into a fresh DuckDB file and atomically
+    replaces the replica. Returns the row count per table.
+
+    Each table is streamed out of Postgres with COPY ... TO (CSV) and loaded
+    with DuckDB's COPY FROM, so rows never pass through Python objects.
+    """
+    if duckdb is None:
+        raise RuntimeError("The analytics replica needs DuckDB: pip install duckdb")
+    path = Path(path or settings.ANALYTICS_REPLICA_PATH)
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.unlink(missing_ok=True)
+
+    started = time.perf_counter()
+    counts = {}
+    duck = duckdb.connect(str(tmp_path))
+    try:
+        with tempfile.TemporaryDirectory() as export_dir:
+            async with engine.connect() as conn:
+                raw = (await conn.get_raw_connection()).driver_connection
+                for model in REPLICATED_MODELS:
+                    table = model.__tablename__
+                    columns = _replicated_columns(model)
+                    csv_path = Path(export_dir) / f"{table}.csv"
+                    column_list = ", ".join(f'"{c.name}"' for c in columns)
+                    await raw.copy_from_query(
+                        f'SELECT {column_list} FROM "{table}"',
+                        output=str(csv_path), format="csv", null=NULL_MARKER,
+                    )
+                    duck.execute(
+                        f'CREATE TABLE "{table}" ('
+                        + ", ".join(f'"{c.name}" {_duckdb_type(c)}' for c in columns)
+                        + ")"
+                    )
+                    duck.execute(f"""COPY "{table}" FROM '{csv_path}' (FORMAT csv, HEADER false, NULLSTR '{NULL_MARKER}')""")
+                    counts[table] = duck.execute(f'SELECT count(*) FROM "{table}"').fetchone()[0]
+        duck.execute("CHECKPOINT")
+    except BaseException:
+        duck.close()
+        tmp_path.unlink(missing_ok=True)
+        raise
+    duck.close()
+
+    os.replace(tmp_path, path)
+    elapsed = time.perf_counter() - started
+    print(f"✅ Analytics replica rebuilt at {path} in {elapsed:.1f}s: "
+          + ", ".join(f"{t}={n}" for t, n in counts.items()))
+    return counts
+
+
+# --- Query ---
+
+def _connect():
+    # read_only only protects the database file. Generated SQL must not reach files or URLs either
+    # (read_text('.env'), read_parquet('https://...')), nor SET its way back to them.
+    return duckdb.connect(
+        settings.ANALYTICS_REPLICA_PATH,
+        read_only=True,
+        config={
+            "memory_limit": settings.ANALYTICS_REPLICA_MEMORY_LIMIT,
+            "threads": settings.ANALYTICS_REPLICA_THREADS,
+            "enable_external_access": False,
+            "lock_configuration": True,
+        },
+    )
+
+
+def _fetch(sql: str, max_rows: int, running: dict) -> Tuple[List[str], List[Sequence]]:
+    # The worker thread owns the connection; `running` exposes it for interrupt()
+    conn = _connect()
+    running["conn"] = conn
+    try:
+        cursor = conn.execute(sql)
+        columns = [d[0] for d in cursor.description]
+        return columns, cursor.fetchmany(max_rows + 1)
+    finally:
+        running.pop("conn", None)
+        conn.close()
+
+
+async def run_query(
+    sql: str, max_rows: Optional[int] = None, timeout_ms: Optional[int] = None
+) -> Tuple[List[str], List[Sequence], bool]:
+    """
+    Runs a SELECT against the replica under the same statement check, row
+    limit and timeout as the Postgres guard (db/sql_guard.py), and returns
+    (column_names, rows, truncated). The query runs in a worker thread and is
+    interrupted when it exceeds the timeout.
+    """
+    max_rows = settings.SQL_ASSISTANT_MAX_ROWS if max_rows is None else max_rows
+    timeout_ms = settings.SQL_ASSISTANT_TIMEOUT_MS if timeout_ms is None else timeout_ms
+    limited = limit_statement(check_statement(sql), max_rows)
+
+    running: dict = {}
+    try:
+        columns, rows = await asyncio.wait_for(
+            asyncio.to_thread(_fetch, limited, max_rows, running), timeout_ms / 1000
+        )
+    except asyncio.TimeoutError:
+        conn = running.get("conn")
+        if conn is not None:
+            conn.interrupt()
+        raise QueryRejected(f"The query was cancelled after {timeout_ms} ms. Simplify it or add filters.")
+
+    truncated = len(rows) > max_rows
+    return columns, rows[:max_rows], truncated
+
+
+if __name__ == "__main__":
+    asyncio.run(rebuild())
@@ -0,0 +1,253 @@
+# db/catalog.py
+"""
+Resident, versioned snapshot of the lender/program catalog.
+
+Lenders and programs (names, codes, descriptions, amount ranges) change
+rarely but are read on almost every tool call: listing lenders, listing a
+lender's programs and fuzzy-matching program or lender names. The snapshot
+holds them in memory so those lookups never touch the database on the
+request path.
+
+A snapshot is immutable. Reloading builds a new one and swaps the reference,
+so readers never see a half-loaded catalog. Its version is the shared
+catalog_version row at load time, so it means the same in every worker.
+
+`start()` (called from the app lifespan) loads it and keeps it fresh:
+
+- writers publish changes (db/catalog_events.py) and every worker's LISTEN
+  connection applies them: only the lenders named in the notification are
+  re-read, or everything when the change wasn't narrowed down, a version
+  was missed or later versions had already committed;
+- as a safety net for writes that bypass `publish()`, a background task
+  compares a cheap catalog fingerprint every CATALOG_REFRESH_SECONDS and
+  reloads when it changed.
+
+`get()` loads lazily for scripts and benchmarks that don't run the lifespan.
+"""
+import asyncio
+import time
+from typing import Dict, List, Optional
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.settings import settings
+from db import catalog_events
+from db.models import Lender, LoanProgram
+from db.session import AsyncSessionFactory
+
+
+class CatalogProgram:
+    __slots__ = ("id", "name", "lender_id", "lender_name", "program_code", "description",
+                 "min_loan_amount", "max_loan_amount")
+
+    def __init__(self, row):
+        self.id = row.id
+        self.name = row.name
+        self.lender_id = row.lenderId
+        self.lender_name = row.lender_name
+        self.program_code = row.programCode
+        self.description = row.description
+        self.min_loan_amount = row.minLoanAmount
+        self.max_loan_amount = row.maxLoanAmount
+
+
+class CatalogLender:
+    __slots__ = ("id", "name", "programs")
+
+    def __init__(self, id: str, name: str):
+        self.id = id
+        self.name = name
+        self.programs: List[CatalogProgram] = []
+
+
+class CatalogSnapshot:
+    """One immutable load of the catalog, with the lookups the tools need."""
+
+    def __init__(self, version: int, fingerprint: str, lenders: List[CatalogLender]):
+        self.version = version
+        self.fingerprint = fingerprint
+        self.loaded_at = time.time()
+        self.lenders = lenders  # ordered by name; each lender's programs ordered by name
+        self.lenders_by_id: Dict[str, CatalogLender] = {lender.id: lender for lender in lenders}
+        self.programs: List[CatalogProgram] = [p for lender in lenders for p in lender.programs]
+        self.programs_by_id: Dict[str, CatalogProgram] = {p.id: p for p in self.programs}
+        self.programs_by_name: Dict[str, List[CatalogProgram]] = {}
+        for program in self.programs:
+            self.programs_by_name.setdefault(program.name, []).append(program)
+
+
+# --- Loading ---
+
+# Changes whenever a lender or program row is added, removed or edited
+_FINGERPRINT_SQL = text("""
+    SELECT md5(
+        coalesce((SELECT string_agg(id || '|' || name, ',' ORDER BY id) FROM lender), '')
+        || ':' ||
+        coalesce((SELECT string_agg(concat_ws('|', id, "lenderId", name, "programCode", description,
+                                              "minLoanAmount", "maxLoanAmount"), ',' ORDER BY id)
+                  FROM loan_program), '')
+    )
+""")
+
+
+async def _read_lenders(session: AsyncSession, lender_ids: Optional[List[str]] = None) -> List[CatalogLender]:
+    """The given lenders (all by default) with their programs, ordered by name."""
+    lender_query = select(Lender.id, Lender.name).order_by(Lender.name)
+    program_query = (
+        select(
+            LoanProgram.id, LoanProgram.name, LoanProgram.lenderId, LoanProgram.programCode,
+            LoanProgram.description, LoanProgram.minLoanAmount, LoanProgram.maxLoanAmount,
+            Lender.name.label("lender_name"),
+        )
+        .join(Lender, Lender.id == LoanProgram.lenderId)
+        .order_by(Lender.name, LoanProgram.name)
+    )
+    if lender_ids is not None:
+        lender_query = lender_query.where(Lender.id.in_(lender_ids))
+        program_query = program_query.where(LoanProgram.lenderId.in_(lender_ids))
+    lenders = {row.id: CatalogLender(row.id, row.name) for row in (await session.execute(lender_query)).all()}
+    for row in (await session.execute(program_query)).all():
+        lenders[row.lenderId].programs.append(CatalogProgram(row))
+    return list(lenders.values())
+
+
+async def _load(base: Optional[CatalogSnapshot] = None, lender_ids: Optional[List[str]] = None,
+                expected_version: Optional[int] = None) -> CatalogSnapshot:
+    """
+    Reads the whole catalog, or only `lender_ids` on top of `base` (lenders
+    that no longer exist are dropped). The partial read is only valid for
+    `expected_version`: when the database has moved past it (later changes
+    committed before this one was handled), everything is read instead, as
+    the snapshot is stamped with the database's version.
+    """
+    async with AsyncSessionFactory() as session:
+        # Read the version first: rows committed after it are picked up by the next change
+        version = await catalog_events.read_version(session)
+        fingerprint = (await session.execute(_FINGERPRINT_SQL)).scalar_one()
+        if base is None or lender_ids is None or version != expected_version:
+            lenders = await _read_lenders(session)
+        else:
+            changed = set(lender_ids)
+            lenders = [lender for lender in base.lenders if lender.id not in changed]
+            lenders += await _read_lenders(session, list(changed))
+            lenders.sort(key=lambda lender: lender.name)
+    return CatalogSnapshot(version, fingerprint, lenders)
+
+
+# --- Current snapshot ---
+
+_snapshot: Optional[CatalogSnapshot] = None
+_lock = asyncio.Lock()
+_refresh_task: Optional[asyncio.Task] = None
+_listener: Optional[catalog_events.CatalogListener] = None
+
+
+def _swap(snapshot: CatalogSnapshot, what: str) -> CatalogSnapshot:
+    global _snapshot
+    _snapshot = snapshot
+    print(f"✅ Catalog snapshot v{snapshot.version} loaded ({what}): "
+          f"{len(snapshot.lenders)} lenders, {len(snapshot.programs)} programs")
+    return snapshot
+
+
+async def reload(force: bool = False) -> CatalogSnapshot:
+    """
+    Loads the whole catalog and swaps it in. Unless forced, the current
+    snapshot is kept when the catalog fingerprint is unchanged.
+    """
+    async with _lock:
+        current = _snapshot
+        if current is not None and not force:
+            async with AsyncSessionFactory() as session:
+                if (await session.execute(_FINGERPRINT_SQL)).scalar_one() == current.fingerprint:
+                    return current
+        return _swap(await _load(), "full")
+
+
+async def apply_change(version: Optional[int], lender_ids: Optional[List[str]]) -> None:
+    """
+    Applies a published change (see catalog_events.publish). The named
+    lenders are re-read when the change directly follows the current
+    snapshot and is still the database's latest; a missed version, a later
+    version already committed, an unnamed change or a resync (version None)
+    with a newer database version reloads everything.
+    """
+    async with _lock:
+        current = _snapshot
+        if current is None:
+            return  # nothing loaded yet; get() will load the latest
+        if version is None:
+            async with AsyncSessionFactory() as session:
+                version = await catalog_events.read_version(session)
+        if version <= current.version:
+            return
+        if lender_ids is not None and version == current.version + 1:
+            snapshot = await _load(current, lender_ids, version)
+            _swap(snapshot, f"{len(lender_ids)} lender(s) changed" if snapshot.version == version else "full")
+        else:
+            _swap(await _load(), "full")
+
+
+async def get() -> CatalogSnapshot:
+    """The current snapshot, loading it on first use."""
+    snapshot = _snapshot
+    if snapshot is not None:
+        return snapshot
+    async with _lock:
+        if _snapshot is not None:
+            return _snapshot
+    return await reload(force=True)
+
+
+def current() -> Optional[CatalogSnapshot]:
+    return _snapshot
+
+
+async def publish_reload() -> CatalogSnapshot:
+    """Announces a full change to every worker and reloads this one."""
+    async with AsyncSessionFactory() as session:
+        await catalog_events.publish(session)
+        await session.commit()
+    return await reload(force=True)
+
+
+async def _refresh_loop(interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await reload()
+        except Exception as e:
+            snapshot = _snapshot
+            print(f"⚠️  Catalog refresh failed, keeping v{snapshot.version if snapshot else '-'}: {e}")
+
+
+async def start() -> None:
+    """
+    Loads the snapshot, subscribes to published changes (CATALOG_LISTEN_ENABLED)
+    and starts the fingerprint check (CATALOG_REFRESH_SECONDS, 0 disables it).
+    """
+    global _refresh_task, _listener
+    try:
+        await reload(force=True)
+    except Exception as e:
+        print(f"⚠️  Catalog snapshot not loaded at startup, will load on first use: {e}")
+    if settings.CATALOG_LISTEN_ENABLED and _listener is None:
+        _listener = catalog_events.CatalogListener(apply_change)
+        _listener.start()
+    if settings.CATALOG_REFRESH_SECONDS > 0 and _refresh_task is None:
+        _refresh_task = asyncio.create_task(_refresh_loop(settings.CATALOG_REFRESH_SECONDS))
+
+
+async def stop() -> None:
+    global _refresh_task, _listener
+    if _listener is not None:
+        await _listener.stop()
+        _listener = None
+    if _refresh_task is not None:
+        _refresh_task.cancel()
+        try:
+            await _refresh_task
+        except asyncio.CancelledError:
+            pass
+        _refresh_task = None
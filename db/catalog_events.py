@@ -0,0 +1,123 @@
+# db/catalog_events.py
+"""
+Cross-worker change notifications for lender data.
+
+Every uvicorn worker keeps its own in-memory catalog (db/catalog.py) and
+resident matrix index (core/scenario_batch.py). A write in one process has to
+reach all of them, so writers call `publish()` inside their transaction:
+
+- it bumps the single catalog_version row, so the version is shared by every
+  worker and survives restarts;
+- it sends a NOTIFY on the catalog_changed channel with the new version and,
+  when known, the ids of the lenders that changed.
+
+Postgres delivers the notification only when the transaction commits, so a
+worker never reloads before the new rows are visible. `CatalogListener` holds
+a LISTEN connection from the app engine in each worker and hands every
+notification to a handler. After (re)connecting it calls the handler with no
+version, so changes published while the connection was down are picked up.
+"""
+import asyncio
+import json
+from typing import Awaitable, Callable, Iterable, List, Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.models import CatalogVersion
+from db.session import engine
+
+CHANNEL = "catalog_changed"
+VERSION_ROW = 1
+
+# NOTIFY payloads are limited to 8000 bytes; larger changes are announced as "everything"
+MAX_NOTIFY_LENDERS = 100
+RECONNECT_SECONDS = 5
+
+# handler(version, lender_ids): version None means "resync"; lender_ids None means "everything changed"
+ChangeHandler = Callable[[Optional[int], Optional[List[str]]], Awaitable[None]]
+
+
+async def read_version(session: AsyncSession) -> int:
+    return (await session.execute(
+        select(CatalogVersion.version).where(CatalogVersion.id == VERSION_ROW)
+    )).scalar_one()
+
+
+async def publish(session: AsyncSession, lender_ids: Optional[Iterable[str]] = None) -> int:
+    """
+    Bumps the catalog version and queues the notification, both part of the
+    session's transaction (the caller commits). Pass the ids of the lenders
+    whose lender, program, rule or guideline rows changed, or None when the
+    change can't be narrowed down. Returns the new version.
+    """
+    version = (await session.execute(
+        update(CatalogVersion)
+        .where(CatalogVersion.id == VERSION_ROW)
+        .values(version=CatalogVersion.version + 1, updatedAt=func.now())
+        .returning(CatalogVersion.version)
+    )).scalar_one()
+    lenders = sorted(set(lender_ids)) if lender_ids is not None else None
+    if lenders is not None and len(lenders) > MAX_NOTIFY_LENDERS:
+        lenders = None
+    payload = json.dumps({"version": version, "lenders": lenders}, separators=(",", ":"))
+    await session.execute(select(func.pg_notify(CHANNEL, payload)))
+    return version
+
+
+class CatalogListener:
+    """Keeps a LISTEN connection open and feeds notifications to the handler, one at a time."""
+
+    def __init__(self, handler: ChangeHandler):
+        self._handler = handler
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self._listen()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️  Catalog listener disconnected, retrying in {RECONNECT_SECONDS}s: {e}")
+            await asyncio.sleep(RECONNECT_SECONDS)
+
+    async def _listen(self) -> None:
+        # None in the queue means the connection was lost
+        queue: asyncio.Queue = asyncio.Queue()
+
+        def on_notify(connection, pid, channel, payload):
+            queue.put_nowait(payload)
+
+        conn = await engine.connect()
+        try:
+            raw = (await conn.get_raw_connection()).driver_connection
+            raw.add_termination_listener(lambda connection: queue.put_nowait(None))
+            await raw.add_listener(CHANNEL, on_notify)
+            await self._handler(None, None)
+            while True:
+                payload = await queue.get()
+                if payload is None:
+                    raise ConnectionError("LISTEN connection closed")
+                try:
+                    message = json.loads(payload)
+                    await self._handler(int(message["version"]), message.get("lenders"))
+                except Exception as e:
+                    print(f"⚠️  Catalog change {payload!r} not applied: {e}")
+        finally:
+            # The connection carries LISTEN state; never hand it back to the pool
+            await conn.invalidate()
+            await conn.close()
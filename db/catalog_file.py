@@ -0,0 +1,186 @@
+# db/catalog_file.py
+"""
+Streaming reader for catalog files (db/data.json and db/generate_data.py output).
+
+A full multi-lender matrix runs to hundreds of MB, and `json.load` holds the
+whole document (and then every row object) in memory at once. `iter_catalog()`
+reads the file in chunks instead and yields one lender or one program
+(with its rules and guidelines) at a time, validated with the pydantic
+records below. Memory is bounded by the largest single program, not by the
+file.
+
+Only the top level is walked incrementally: each element of the "lender" and
+"loan_programs" arrays is decoded whole with `json.JSONDecoder.raw_decode`.
+Other top-level keys are skipped. Importers need the "lender" array before
+"loan_programs", which is how both files are written.
+"""
+import json
+from decimal import Decimal
+from typing import Iterator, List, Optional, TextIO, Tuple, Union
+
+from pydantic import BaseModel, ConfigDict, ValidationError
+
+from db.models import GuidelineCategory, LoanPurposeType, OccupancyType
+
+CHUNK_CHARS = 1 << 16
+_WHITESPACE = " \t\n\r"
+
+
+# --- Records ---
+
+class LenderRecord(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    id: str
+    name: str
+
+
+class RuleRecord(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    id: str
+    loanProgramId: str
+    minLoanAmount: Optional[Decimal] = None
+    maxLoanAmount: Optional[Decimal] = None
+    minFicoScore: Optional[int] = None
+    maxFicoScore: Optional[int] = None
+    occupancyType: Optional[OccupancyType] = None
+    loanPurpose: Optional[LoanPurposeType] = None
+    # Free text ("1.00-1.24", ">=1.25") or a number; parsed by import_data.parse_dscr
+    dscrValue: Optional[Union[str, float]] = None
+    minDscr: Optional[Union[str, float]] = None
+    maxLtv: Optional[Decimal] = None
+    reservesMonths: Optional[int] = None
+    notes: Optional[str] = None
+
+
+class GuidelineRecord(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    id: str
+    loanProgramId: str
+    category: GuidelineCategory
+    content: str
+    sourceReference: Optional[str] = None
+
+
+class ProgramRecord(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    id: str
+    lenderId: str
+    name: str
+    programCode: Optional[str] = None
+    description: Optional[str] = None
+    sourceDocument: Optional[str] = None
+    minLoanAmount: Optional[Decimal] = None
+    maxLoanAmount: Optional[Decimal] = None
+    eligibility_matrix_rules: List[RuleRecord] = []
+    guidelines: List[GuidelineRecord] = []
+
+
+SECTIONS = {"lender": LenderRecord, "loan_programs": ProgramRecord}
+
+
+# --- Incremental JSON ---
+
+class _Reader:
+    """A growing window over a text stream, consumed from the front."""
+
+    def __init__(self, stream: TextIO, chunk_chars: int):
+        self._stream = stream
+        self._chunk_chars = chunk_chars
+        self._decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        # Read at least as much as is buffered, so a value larger than a chunk is re-scanned O(log n) times
+        chunk = self._stream.read(max(self._chunk_chars, len(self.buffer) - self.pos))
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        self.eof = not chunk
+        return bool(chunk)
+
+    def peek(self) -> str:
+        """The next non-whitespace character ('' at the end of the stream)."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str) -> None:
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected {char!r} in catalog file, found {found or 'end of file'!r}")
+        self.pos += 1
+
+    def value(self):
+        """Decodes the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # A number at the end of the window may continue in the next chunk
+            if end == len(self.buffer) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+
+def iter_sections(stream: TextIO, chunk_chars: int = CHUNK_CHARS) -> Iterator[Tuple[str, object]]:
+    """
+    Yields (key, element) for every element of every top-level array of a
+    JSON object, in file order, without reading the whole document.
+    """
+    reader = _Reader(stream, chunk_chars)
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+    while True:
+        key = reader.value()
+        reader.expect(":")
+        if reader.peek() == "[":
+            reader.expect("[")
+            if reader.peek() == "]":
+                reader.pos += 1
+            else:
+                while True:
+                    yield key, reader.value()
+                    if reader.peek() == ",":
+                        reader.pos += 1
+                        continue
+                    reader.expect("]")
+                    break
+        else:
+            reader.value()
+        if reader.peek() == ",":
+            reader.pos += 1
+            continue
+        reader.expect("}")
+        return
+
+
+def iter_catalog(json_path: str, chunk_chars: int = CHUNK_CHARS) -> Iterator[Union[LenderRecord, ProgramRecord]]:
+    """
+    Yields the file's lenders and programs one at a time, validated. Raises
+    ValueError naming the section and position of the first invalid element.
+    """
+    with open(json_path, "r", encoding="utf-8") as f:
+        positions = {key: 0 for key in SECTIONS}
+        for key, element in iter_sections(f, chunk_chars):
+            record_type = SECTIONS.get(key)
+            if record_type is None:
+                continue
+            try:
+                yield record_type.model_validate(element)
+            except ValidationError as e:
+                problems = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+                raise ValueError(f"Invalid {key}[{positions[key]}] in {json_path}: {problems}")
+            positions[key] += 1
@@ -3,9 +3,11 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy import delete
 from db.models import Conversation, ChatMessage, ChatMessageRole
+from db.query_stats import query_origin
 from langchain_core.messages import HumanMessage, AIMessage, BaseMessage
 from typing import List
 
+@query_origin
 async def get_or_create_conversation(db: AsyncSession, conversation_id: str | None) -> Conversation:
     """Gets a conversation by ID or creates a new one."""
     if conversation_id:
@@ -23,6 +25,7 @@ async def get_or_create_conversation(db: AsyncSession, conversation_id: str | No
     await db.refresh(new_conversation)
     return new_conversation
 
+@query_origin
 async def add_message_to_conversation(
     db: AsyncSession, 
     conversation_id: str, 
@@ -38,6 +41,7 @@ async def add_message_to_conversation(
     db.add(message)
     await db.commit()
 
+@query_origin
 async def get_chat_history_messages(db: AsyncSession, conversation_id: str) -> list[BaseMessage]:
     """Fetches chat history from DB and converts to LangChain message objects."""
     result = await db.execute(
@@ -55,6 +59,7 @@ async def get_chat_history_messages(db: AsyncSession, conversation_id: str) -> l
             langchain_messages.append(AIMessage(content=msg.content))
     return langchain_messages
 
+@query_origin
 async def update_conversation_summary(db: AsyncSession, conversation_id: str, new_summary: str):
     """Updates the summary for a conversation."""
     result = await db.execute(
@@ -65,6 +70,7 @@ async def update_conversation_summary(db: AsyncSession, conversation_id: str, ne
         conversation.summary = new_summary
         await db.commit()
 
+@query_origin
 async def get_recent_messages(db: AsyncSession, conversation_id: str, limit: int = 5) -> list[ChatMessage]:
     result = await db.execute(
         select(ChatMessage)
@@ -76,6 +82,7 @@ async def get_recent_messages(db: AsyncSession, conversation_id: str, limit: int
 
 # --- NEW CRUD FUNCTIONS ADDED BELOW ---
 
+@query_origin
 async def get_all_conversations(db: AsyncSession) -> List[Conversation]:
     """Fetches all conversations, most recent first."""
     result = await db.execute(
@@ -83,6 +90,7 @@ async def get_all_conversations(db: AsyncSession) -> List[Conversation]:
     )
     return result.scalars().all()
 
+@query_origin
 async def get_conversation_by_id(db: AsyncSession, conversation_id: str) -> Conversation | None:
     """Fetches a single conversation by its ID."""
     result = await db.execute(
@@ -90,6 +98,7 @@ async def get_conversation_by_id(db: AsyncSession, conversation_id: str) -> Conv
     )
     return result.scalars().first()
 
+@query_origin
 async def get_messages_for_conversation(db: AsyncSession, conversation_id: str) -> List[ChatMessage]:
     """Fetches all messages for a specific conversation, oldest first."""
     result = await db.execute(
@@ -100,6 +109,7 @@ async def get_messages_for_conversation(db: AsyncSession, conversation_id: str)
     return result.scalars().all()
 
 
+@query_origin
 async def get_first_user_message_for_conversation(db: AsyncSession, conversation_id: str) -> str | None:
     """Fetches the first message from the user for a conversation, oldest first.
 
@@ -117,6 +127,7 @@ async def get_first_user_message_for_conversation(db: AsyncSession, conversation
     return result.scalars().first()
 
 
+@query_origin
 async def delete_conversation_by_id(db: AsyncSession, conversation_id: str) -> bool:
     """Delete all messages for the conversation and the conversation itself.
 
@@ -0,0 +1,365 @@
+"""
+Synthetic lender catalog generator for scale testing.
+
+Writes a JSON file in the same shape as `db/data.json` (lender list plus
+loan_programs with nested eligibility_matrix_rules and guidelines), so it can
+be loaded with `db.import_data`. The size is driven by a scale factor relative
+to today's catalog (3 lenders, 12 programs):
+
+    python -m db.generate_data --scale 100 --output db/data_100x.json
+    python -m db.import_data db/data_100x.json
+
+Programs are drawn from realistic product families (DSCR, Non-QM, Jumbo, ITIN,
+second liens) with FICO/loan-amount band grids, occupancy/purpose mixes and
+LTV step-downs, and the output is fully deterministic for a given seed.
+"""
+import argparse
+import json
+import math
+import random
+import uuid
+from typing import Any, Dict, Iterator, List, Optional
+
+from db.models import GuidelineCategory
+
+BASE_LENDERS = 3
+BASE_PROGRAMS = 12
+
+LENDER_PREFIXES = [
+    "Summit", "Harbor", "Keystone", "Pinnacle", "Liberty", "Meridian", "Northpoint",
+    "Cornerstone", "Evergreen", "Granite", "Beacon", "Sterling", "Redwood", "Atlas",
+    "Crescent", "Horizon", "Vantage", "Anchor", "Bluewater", "Frontier",
+]
+LENDER_SUFFIXES = ["Funding", "Home Loans", "Mortgage", "Lending", "Capital", "Wholesale"]
+PROGRAM_TIERS = ["Select", "Plus", "Flex", "Elite", "Prime", "Supreme", "Edge", "Access", "Advantage"]
+
+# Product families. Weights approximate the share of each family in a
+# wholesale Non-QM catalog; DSCR is the largest by volume.
+FAMILIES: List[Dict[str, Any]] = [
+    {
+        "name": "DSCR", "weight": 30,
+        "fico_breaks": [660, 680, 700, 720, 740, 760],
+        "amount_breaks": [100000, 500000, 1000000, 1500000, 2000000, 3000000],
+        "occupancies": ["INVESTOR", "INVESTMENT"],
+        "purposes": ["PURCHASE", "RATE_TERM", "CASH_OUT"],
+        "dscr_values": ["1.25", "1.0", "0.75"],
+        "top_ltv": 80.0,
+        "categories": ["DSCR_RULES", "DSCR_HIGHLIGHTS", "RESERVES", "FIRST_TIME_INVESTOR",
+                       "PREPAYMENT_PENALTY", "PROPERTY_TYPES", "CASH_OUT", "HOUSING_HISTORY"],
+    },
+    {
+        "name": "Non-QM", "weight": 25,
+        "fico_breaks": [620, 660, 680, 700, 720, 740, 760],
+        "amount_breaks": [100000, 1000000, 1500000, 2000000, 2500000, 3500000],
+        "occupancies": ["PRIMARY", "SECOND_HOME", "INVESTMENT"],
+        "purposes": ["PURCHASE", "RATE_TERM", "CASH_OUT"],
+        "dscr_values": [None],
+        "top_ltv": 90.0,
+        "categories": ["INCOME_DOCUMENTATION", "DTI", "RESERVES", "CREDIT_EVENT_SEASONING",
+                       "GIFT_FUNDS", "TRADELINES", "ASSET_UTILIZATION", "CASH_OUT", "DU_RULES"],
+    },
+    {
+        "name": "Jumbo", "weight": 15,
+        "fico_breaks": [680, 700, 720, 740, 760],
+        "amount_breaks": [750000, 1500000, 2000000, 3000000, 4000000],
+        "occupancies": ["PRIMARY", "SECOND_HOME"],
+        "purposes": ["PURCHASE", "RATE_TERM", "CASH_OUT"],
+        "dscr_values": [None],
+        "top_ltv": 85.0,
+        "categories": ["LOAN_AMOUNTS", "DTI", "RESERVES", "APPRAISALS", "DECLINING_MARKET",
+                       "SELLER_CONCESSIONS", "GIFT_FUNDS"],
+    },
+    {
+        "name": "Super Jumbo", "weight": 5,
+        "fico_breaks": [720, 740, 760],
+        "amount_breaks": [3000000, 4000000, 5000000],
+        "occupancies": ["PRIMARY"],
+        "purposes": ["PURCHASE", "RATE_TERM"],
+        "dscr_values": [None],
+        "top_ltv": 80.0,
+        "categories": ["LOAN_AMOUNTS", "DTI", "RESERVES", "CREDIT_EVENT_SEASONING", "ASSET_UTILIZATION"],
+    },
+    {
+        "name": "ITIN", "weight": 10,
+        "fico_breaks": [660, 680, 700, 720, 740],
+        "amount_breaks": [125000, 1000000, 1500000, 2500000],
+        "occupancies": ["PRIMARY", "SECOND_HOME", "INVESTMENT"],
+        "purposes": ["PURCHASE", "RATE_TERM", "CASH_OUT"],
+        "dscr_values": [None],
+        "top_ltv": 85.0,
+        "categories": ["ITIN_SPECIFICS", "CITIZENSHIP", "INCOME_DOCUMENTATION", "TRADELINES", "RESERVES"],
+    },
+    {
+        "name": "Closed End Second", "weight": 10,
+        "fico_breaks": [680, 700, 720, 740],
+        "amount_breaks": [50000, 250000, 350000, 500000],
+        "occupancies": ["PRIMARY", "SECOND_HOME"],
+        "purposes": ["SECOND_LIEN"],
+        "dscr_values": [None],
+        "top_ltv": 90.0,
+        "categories": ["SECOND_LIEN_LIMITS", "SUBORDINATE_FINANCING", "DTI", "INELIGIBLE_STATES"],
+    },
+    {
+        "name": "Bank Statement", "weight": 5,
+        "fico_breaks": [640, 660, 680, 700, 720, 740],
+        "amount_breaks": [100000, 1000000, 1500000, 2000000, 3000000],
+        "occupancies": ["PRIMARY", "SECOND_HOME", "INVESTMENT"],
+        "purposes": ["PURCHASE", "RATE_TERM", "CASH_OUT"],
+        "dscr_values": [None],
+        "top_ltv": 90.0,
+        "categories": ["INCOME_DOCUMENTATION", "DTI", "RESERVES", "NON_ARM_LENGTH", "GIFT_FUNDS"],
+    },
+]
+
+# Guideline text templates. `{program}` and `{lender}` are filled in; several
+# templates are deliberately lender-wide so identical text repeats across
+# programs, as it does in real lender guides.
+GUIDELINE_TEMPLATES: Dict[str, List[str]] = {
+    "RESERVES": [
+        "Reserves (PITIA-based): loans <= $1,000,000 require {r1} months; > $1,000,000 to $2,000,000 require {r2} months; > $2,000,000 require {r3} months. Cash-out proceeds may be used to satisfy reserves for {program}.",
+        "{lender} reserve policy: {r1} months PITIA for the subject property plus 2 months for each additional financed property.",
+    ],
+    "DTI": [
+        "Maximum DTI: {dti}% for {program}; up to 50% permitted with residual income of $3,500 and 12 months reserves.",
+        "{lender} standard DTI limit of {dti}% applies unless the matrix states otherwise.",
+    ],
+    "GIFT_FUNDS": [
+        "Gift funds are allowed for {program} after a {pct}% minimum borrower contribution. Gift letter and evidence of transfer required.",
+        "{lender} gift fund policy: gifts from family members permitted; gifts of equity allowed on primary residence purchases only.",
+    ],
+    "CASH_OUT": [
+        "Cash-out: if LTV <= 60% = unlimited cash in hand; if LTV > 60% = max ${cap:,} for {program}. Minimum 6 months title seasoning.",
+    ],
+    "CREDIT_EVENT_SEASONING": [
+        "Credit event seasoning (BK/FC/SS/DIL): {months} months from completion for {program}.",
+    ],
+    "PREPAYMENT_PENALTY": [
+        "Prepayment penalty options for {program}: 5/4/3/2/1, 3/2/1 or none (pricing adjustment). Not allowed in states prohibiting prepayment penalties.",
+    ],
+    "DSCR_RULES": [
+        "{program} DSCR calculation: gross rents divided by PITIA. Minimum DSCR {dscr} for standard LTVs; short-term rental income allowed with 12-month history.",
+    ],
+    "DSCR_HIGHLIGHTS": [
+        "{program} highlights: minimum FICO {fico}, housing history 1x30x12, no DTI calculation, entity vesting allowed.",
+    ],
+    "FIRST_TIME_INVESTOR": [
+        "First time investors eligible under {program} with minimum DSCR 1.25 and max LTV 75%.",
+        "{lender} first time investor policy: must own a primary residence for 12 months.",
+    ],
+    "LOAN_AMOUNTS": [
+        "Minimum loan amount ${min_amount:,}. Maximum loan amount ${max_amount:,} for {program}.",
+    ],
+    "INCOME_DOCUMENTATION": [
+        "Income documentation for {program}: 12 or 24 months personal or business bank statements, P&L with CPA letter, or 1099 income.",
+    ],
+    "INELIGIBLE_STATES": [
+        "{lender} does not lend in the following states for {program}: NY, WV, and properties in declining markets without a 5% LTV reduction.",
+    ],
+}
+GENERIC_TEMPLATE = "{category_title} requirements for {program}: refer to the {lender} program matrix and general underwriting guide."
+
+
+def _uuid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def _bands(breaks: List[float], open_top: bool, step: float) -> List[tuple]:
+    """Turns sorted breakpoints into (min, max) bands; the last band may be open-ended."""
+    bands = []
+    for i, low in enumerate(breaks):
+        if i + 1 < len(breaks):
+            bands.append((low, breaks[i + 1] - step))
+        elif open_top:
+            bands.append((low, None))
+    return bands
+
+
+def _lender_name(idx: int) -> str:
+    prefix = LENDER_PREFIXES[idx % len(LENDER_PREFIXES)]
+    suffix = LENDER_SUFFIXES[(idx // len(LENDER_PREFIXES)) % len(LENDER_SUFFIXES)]
+    cycle = idx // (len(LENDER_PREFIXES) * len(LENDER_SUFFIXES))
+    name = f"{prefix} {suffix}"
+    return f"{name} {cycle + 1}" if cycle else name
+
+
+def _make_rules(rng: random.Random, family: Dict[str, Any], program_id: str) -> List[Dict[str, Any]]:
+    """Builds a program's eligibility matrix as a grid of FICO x loan amount x occupancy x purpose."""
+    # Each program uses a random subset of the family's breakpoints, so band
+    # edges differ between programs as they do between real lender matrices
+    fico_breaks = sorted(rng.sample(family["fico_breaks"], k=min(len(family["fico_breaks"]), rng.randint(2, 4))))
+    amount_breaks = sorted(rng.sample(family["amount_breaks"], k=min(len(family["amount_breaks"]), rng.randint(2, 4))))
+    fico_bands = _bands(fico_breaks, open_top=True, step=1)
+    amount_bands = _bands(amount_breaks, open_top=False, step=0.01)
+    occupancies = [o for o in family["occupancies"] if rng.random() < 0.85] or family["occupancies"][:1]
+    dscr_values = rng.sample(family["dscr_values"], k=min(len(family["dscr_values"]), rng.randint(1, 2)))
+
+    rules = []
+    for occupancy in occupancies:
+        for purpose in family["purposes"]:
+            # Not every program offers every purpose for every occupancy
+            if rng.random() < 0.15:
+                continue
+            for dscr in dscr_values:
+                for f_idx, (min_fico, max_fico) in enumerate(fico_bands):
+                    for a_idx, (min_amount, max_amount) in enumerate(amount_bands):
+                        ltv = family["top_ltv"]
+                        ltv -= 5 * (len(fico_bands) - 1 - f_idx) // 2   # lower FICO, lower LTV
+                        ltv -= 5 * a_idx                                # larger loans, lower LTV
+                        if purpose == "CASH_OUT":
+                            ltv -= 5
+                        if occupancy in ("INVESTMENT", "INVESTOR", "SECOND_HOME"):
+                            ltv -= 5
+                        if dscr is not None and float(dscr) < 1.0:
+                            ltv -= 10
+                        # Some low-FICO / high-amount cells are simply ineligible
+                        if ltv < 50:
+                            continue
+                        reserves = [3, 6, 9, 12, 18][min(a_idx, 4)]
+                        rules.append({
+                            "id": _uuid(rng),
+                            "loanProgramId": program_id,
+                            "minLoanAmount": min_amount,
+                            "maxLoanAmount": max_amount,
+                            "minFicoScore": min_fico,
+                            "maxFicoScore": max_fico,
+                            "occupancyType": occupancy,
+                            "loanPurpose": purpose,
+                            "dscrValue": dscr,
+                            "maxLtv": float(ltv),
+                            "reservesMonths": reserves,
+                            "notes": (
+                                f"FICO {min_fico}+ / loan ${min_amount:,.0f}-${max_amount:,.0f}: "
+                                f"max {ltv:.0f}% LTV, {reserves} months reserves."
+                            ),
+                        })
+    return rules
+
+
+def _make_guidelines(
+    rng: random.Random, family: Dict[str, Any], program: Dict[str, Any], lender_name: str
+) -> List[Dict[str, Any]]:
+    valid_categories = {c.name for c in GuidelineCategory}
+    family_categories = [c for c in family["categories"] if c in valid_categories]
+    extra = rng.sample(sorted(valid_categories), 2)
+    categories = rng.sample(family_categories, k=min(len(family_categories), rng.randint(3, 6))) + extra
+
+    params = {
+        "program": program["name"],
+        "lender": lender_name,
+        "r1": rng.choice([2, 3, 6]), "r2": rng.choice([6, 9]), "r3": rng.choice([12, 18]),
+        "dti": rng.choice([43, 45, 50]),
+        "pct": rng.choice([0, 5, 10]),
+        "cap": rng.choice([500000, 1000000]),
+        "months": rng.choice([24, 36, 48]),
+        "dscr": rng.choice(["1.00", "1.10", "1.25"]),
+        "fico": family["fico_breaks"][0],
+        "min_amount": int(program["minLoanAmount"]),
+        "max_amount": int(program["maxLoanAmount"]),
+    }
+
+    guidelines = []
+    for category in dict.fromkeys(categories):
+        templates = GUIDELINE_TEMPLATES.get(category, [GENERIC_TEMPLATE])
+        for template in templates[: rng.randint(1, len(templates))]:
+            content = template.format(category_title=category.replace("_", " ").title(), **params)
+            guidelines.append({
+                "id": _uuid(rng),
+                "loanProgramId": program["id"],
+                "category": category,
+                "content": content,
+                "sourceReference": f"{program['sourceDocument']} — '{category.replace('_', ' ')}' section.",
+            })
+    return guidelines
+
+
+def generate_catalog(
+    scale: float, seed: int = 42, lenders: Optional[int] = None
+) -> tuple[List[Dict[str, Any]], Iterator[Dict[str, Any]]]:
+    """
+    Returns (lenders, programs). Programs are yielded lazily so very large
+    catalogs can be written without holding every rule in memory.
+
+    By default the lender count grows with the square root of the scale
+    (10x -> 10 lenders, 1000x -> 95) while programs grow linearly.
+    """
+    rng = random.Random(seed)
+    n_programs = max(1, round(BASE_PROGRAMS * scale))
+    n_lenders = lenders or max(1, math.ceil(BASE_LENDERS * math.sqrt(scale)))
+    n_lenders = min(n_lenders, n_programs)
+
+    lender_rows = [{"id": _uuid(rng), "name": _lender_name(i)} for i in range(n_lenders)]
+    family_weights = [f["weight"] for f in FAMILIES]
+
+    def programs() -> Iterator[Dict[str, Any]]:
+        used_names: Dict[str, set] = {lender["id"]: set() for lender in lender_rows}
+        for p_idx in range(n_programs):
+            lender = lender_rows[p_idx % n_lenders]
+            family = rng.choices(FAMILIES, weights=family_weights)[0]
+
+            base_name = f"{family['name']} {rng.choice(PROGRAM_TIERS)}"
+            name, n = base_name, 2
+            while name in used_names[lender["id"]]:
+                name, n = f"{base_name} {n}", n + 1
+            used_names[lender["id"]].add(name)
+
+            program_id = _uuid(rng)
+            code = f"{family['name'].upper().replace(' ', '_').replace('-', '')}_{p_idx:06d}"
+            amounts = family["amount_breaks"]
+            program = {
+                "id": program_id,
+                "lenderId": lender["id"],
+                "name": name,
+                "programCode": code,
+                "description": (
+                    f"{name} ({family['name']}) from {lender['name']}; minimum FICO {family['fico_breaks'][0]}, "
+                    f"loan amounts ${amounts[0]:,} to ${amounts[-1]:,}. Synthetic program for scale testing."
+                ),
+                "sourceDocument": f"{name} Guidelines {lender['name']}.pdf",
+                "minLoanAmount": amounts[0],
+                "maxLoanAmount": amounts[-1],
+            }
+            program["eligibility_matrix_rules"] = _make_rules(rng, family, program_id)
+            program["guidelines"] = _make_guidelines(rng, family, program, lender["name"])
+            yield program
+
+    return lender_rows, programs()
+
+
+def write_catalog(path: str, scale: float, seed: int = 42, lenders: Optional[int] = None) -> Dict[str, int]:
+    """Streams a generated catalog to `path` one program at a time. Returns row counts."""
+    lender_rows, programs = generate_catalog(scale, seed, lenders)
+    counts = {"lender": len(lender_rows), "loan_programs": 0, "eligibility_matrix_rules": 0, "guidelines": 0}
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{"lender": ')
+        json.dump(lender_rows, f, ensure_ascii=False)
+        f.write(', "loan_programs": [\n')
+        for i, program in enumerate(programs):
+            if i:
+                f.write(",\n")
+            json.dump(program, f, ensure_ascii=False)
+            counts["loan_programs"] += 1
+            counts["eligibility_matrix_rules"] += len(program["eligibility_matrix_rules"])
+            counts["guidelines"] += len(program["guidelines"])
+        f.write("\n]}\n")
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic lender catalog compatible with db.import_data.")
+    parser.add_argument("--scale", type=float, default=10, help="Scale factor relative to today's catalog (e.g. 10, 100, 1000).")
+    parser.add_argument("--lenders", type=int, default=None, help="Override the number of lenders.")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed; the same seed always produces the same file.")
+    parser.add_argument("--output", default=None, help="Output path (default: db/data_<scale>x.json).")
+    args = parser.parse_args(argv)
+
+    output = args.output or f"db/data_{args.scale:g}x.json"
+    counts = write_catalog(output, args.scale, args.seed, args.lenders)
+    print(
+        f"✅ Wrote {output}: {counts['lender']} lenders, {counts['loan_programs']} programs, "
+        f"{counts['eligibility_matrix_rules']} matrix rules, {counts['guidelines']} guidelines."
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+# db/guideline_digest.py
+"""
+Offline per-program guideline digests.
+
+`get_program_guidelines` without a category used to put every guideline of a
+program into the LLM context, and the model summarized it again on every
+overview question. `rebuild_digests()` precomputes a compact, extractive
+digest instead: for each category, the leading sentences of each guideline
+(up to a length budget, deduplicated), plus a one-line-per-category program
+overview. The digests are stored in guideline_digest and served by the tool
+by default.
+
+db/import_data.py rebuilds them after every import. Programs whose guidelines
+(and DIGEST_VERSION) haven't changed since the last build are skipped. To
+rebuild by hand:
+
+    python -m db.guideline_digest
+"""
+import asyncio
+import hashlib
+import re
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+
+from db.models import Guideline, GuidelineDigest
+from db.session import AsyncSessionFactory
+
+# Bump when the digest format changes so every program is rebuilt
+DIGEST_VERSION = 1
+
+# Length budget for the leading sentences kept per guideline, and per category digest
+SENTENCE_CHARS = 160
+CATEGORY_CHARS = 360
+UPSERT_BATCH = 500
+
+# Sentence ends: ". " before a capital letter (keeps "C.F.R. 1805" and "$1.5M" intact)
+_SENTENCE_END = re.compile(r"(?<=\.)\s+(?=[A-Z])")
+
+
+# --- Digest text ---
+
+def _truncate(text: str, limit: int) -> str:
+    if len(text) <= limit:
+        return text
+    cut = text[:limit].rsplit(" ", 1)[0].rstrip(",;:")
+    return cut + "…"
+
+
+def leading_sentences(content: str) -> str:
+    """As many whole leading sentences as fit in SENTENCE_CHARS (the first one truncated if it alone doesn't)."""
+    sentences = _SENTENCE_END.split(" ".join(content.split()))
+    kept = sentences[0]
+    for sentence in sentences[1:]:
+        if len(kept) + 1 + len(sentence) > SENTENCE_CHARS:
+            break
+        kept += " " + sentence
+    return _truncate(kept, SENTENCE_CHARS)
+
+
+def digest_category(contents: Iterable[str]) -> str:
+    """The leading sentences of each guideline in a category, deduplicated."""
+    parts = []
+    for content in contents:
+        part = leading_sentences(content).rstrip(".;")
+        if part and part not in parts:
+            parts.append(part)
+    if not parts:
+        return ""
+    joined = "; ".join(parts)
+    return _truncate(joined if joined.endswith("…") else joined + ".", CATEGORY_CHARS)
+
+
+def digest_program(guidelines: List[Tuple[str, str]]) -> Tuple[str, Dict[str, str]]:
+    """
+    Builds (overview, {category: digest}) from a program's (category name,
+    content) pairs, keeping the categories in the order given.
+    """
+    by_category: Dict[str, List[str]] = {}
+    for category, content in guidelines:
+        by_category.setdefault(category, []).append(content)
+    categories = {category: digest_category(contents) for category, contents in by_category.items()}
+    overview = "\n".join(f"- **{category}**: {digest}" for category, digest in categories.items() if digest)
+    return overview, categories
+
+
+def source_hash(guidelines: List[Tuple[str, str]]) -> str:
+    digest = hashlib.sha1(f"v{DIGEST_VERSION}\0".encode())
+    for category, content in guidelines:
+        digest.update(category.encode())
+        digest.update(b"\0")
+        digest.update(content.encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+# --- Pipeline ---
+
+async def rebuild_digests(program_ids: Optional[List[str]] = None) -> dict:
+    """
+    Recomputes the digests of the given programs (all programs by default)
+    and upserts the ones whose guidelines changed. Digests of programs that
+    no longer have guidelines are removed. Returns counts.
+    """
+    started = time.perf_counter()
+    async with AsyncSessionFactory() as session:
+        query = select(Guideline.loanProgramId, Guideline.category, Guideline.content).order_by(
+            Guideline.loanProgramId, Guideline.category, Guideline.id
+        )
+        existing_query = select(GuidelineDigest.loanProgramId, GuidelineDigest.sourceHash)
+        if program_ids is not None:
+            query = query.where(Guideline.loanProgramId.in_(program_ids))
+            existing_query = existing_query.where(GuidelineDigest.loanProgramId.in_(program_ids))
+
+        by_program: Dict[str, List[Tuple[str, str]]] = {}
+        for row in (await session.execute(query)).all():
+            by_program.setdefault(row.loanProgramId, []).append((row.category.name, row.content))
+        existing = dict((await session.execute(existing_query)).all())
+
+        rows = []
+        for program_id, guidelines in by_program.items():
+            hashed = source_hash(guidelines)
+            if existing.get(program_id) == hashed:
+                continue
+            overview, categories = digest_program(guidelines)
+            rows.append({
+                "loanProgramId": program_id,
+                "content": overview,
+                "categories": categories,
+                "sourceHash": hashed,
+                "guidelineCount": len(guidelines),
+                "sourceChars": sum(len(content) for _, content in guidelines),
+            })
+
+        for start in range(0, len(rows), UPSERT_BATCH):
+            stmt = insert(GuidelineDigest).values(rows[start:start + UPSERT_BATCH])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[GuidelineDigest.loanProgramId],
+                set_={
+                    "content": stmt.excluded.content,
+                    "categories": stmt.excluded.categories,
+                    "sourceHash": stmt.excluded.sourceHash,
+                    "guidelineCount": stmt.excluded.guidelineCount,
+                    "sourceChars": stmt.excluded.sourceChars,
+                    "updatedAt": stmt.excluded.updatedAt,
+                },
+            )
+            await session.execute(stmt)
+
+        stale = [program_id for program_id in existing if program_id not in by_program]
+        if stale:
+            await session.execute(delete(GuidelineDigest).where(GuidelineDigest.loanProgramId.in_(stale)))
+        await session.commit()
+
+    counts = {"built": len(rows), "unchanged": len(by_program) - len(rows), "removed": len(stale)}
+    elapsed = time.perf_counter() - started
+    print(f"✅ Guideline digests rebuilt in {elapsed:.1f}s: "
+          + ", ".join(f"{name}={count}" for name, count in counts.items()))
+    return counts
+
+
+if __name__ == "__main__":
+    asyncio.run(rebuild_digests())
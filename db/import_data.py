@@ -1,88 +1,217 @@
-import json
+import argparse
+import re
 import asyncio
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from db.session import AsyncSessionFactory
 from db.models import Lender, LoanProgram, EligibilityMatrixRule, Guideline
+from db.catalog_file import LenderRecord, ProgramRecord, iter_catalog
+from db.views import refresh_scenario_search
+from db import analytics_replica, catalog_events
+from db.guideline_digest import rebuild_digests
 
+_DSCR_NUMBER = r"\d+(?:\.\d+)?"
+_DSCR_RANGE = re.compile(rf"^\s*({_DSCR_NUMBER})\s*-\s*({_DSCR_NUMBER})\s*$")
+_DSCR_MIN = re.compile(rf"^\s*(?:>=?)?\s*({_DSCR_NUMBER})\s*\+?\s*$")
+_DSCR_MAX = re.compile(rf"^\s*<=?\s*({_DSCR_NUMBER})\s*$")
+
+
+def parse_dscr(value):
+    """
+    Parses a free-text DSCR value into (minDscr, maxDscr). A bare number is a
+    minimum ("1.0"); "1.00-1.24", ">=1.25", "1.25+" and "<1.0" are also
+    understood. Unparseable values give (None, None).
+    """
+    if value is None:
+        return None, None
+    value = str(value)
+    match = _DSCR_RANGE.match(value)
+    if match:
+        return float(match.group(1)), float(match.group(2))
+    match = _DSCR_MIN.match(value)
+    if match:
+        return float(match.group(1)), None
+    match = _DSCR_MAX.match(value)
+    if match:
+        return None, float(match.group(1))
+    return None, None
+
+
+# --- data.json rows ---
+
+def lender_row(lender: dict) -> dict:
+    return {"id": lender["id"], "name": lender["name"]}
+
+
+def program_row(program: dict) -> dict:
+    return {
+        "id": program["id"],
+        "lenderId": program["lenderId"],
+        "name": program["name"],
+        "programCode": program.get("programCode"),
+        "description": program.get("description"),
+        "sourceDocument": program.get("sourceDocument"),
+        "minLoanAmount": program.get("minLoanAmount"),
+        "maxLoanAmount": program.get("maxLoanAmount"),
+    }
+
+
+def rule_row(rule: dict) -> dict:
+    # FIX: Check for 'dscrValue' OR 'minDscr' from the JSON.
+    dscr_val = rule.get("dscrValue") or rule.get("minDscr")
+    min_dscr, max_dscr = parse_dscr(dscr_val)
+    return {
+        "id": rule["id"],
+        "loanProgramId": rule["loanProgramId"],
+        "minLoanAmount": rule.get("minLoanAmount"),
+        "maxLoanAmount": rule.get("maxLoanAmount"),
+        "minFicoScore": rule.get("minFicoScore"),
+        "maxFicoScore": rule.get("maxFicoScore"),
+        "occupancyType": rule.get("occupancyType"),
+        "loanPurpose": rule.get("loanPurpose"),
+        # FIX: Cast the value to a string if it's not None.
+        "dscrValue": str(dscr_val) if dscr_val is not None else None,
+        "minDscr": min_dscr,
+        "maxDscr": max_dscr,
+        "maxLtv": rule.get("maxLtv"),
+        "reservesMonths": rule.get("reservesMonths"),
+        "notes": rule.get("notes"),
+    }
+
+
+def guideline_row(guide: dict) -> dict:
+    return {
+        "id": guide["id"],
+        "loanProgramId": guide["loanProgramId"],
+        "category": guide.get("category"),
+        "content": guide.get("content"),
+        "sourceReference": guide.get("sourceReference"),
+    }
+
+
+# --- Import ---
+
+# Parents first, so each flush satisfies the foreign keys of the rows after it
+CATALOG_MODELS = (Lender, LoanProgram, EligibilityMatrixRule, Guideline)
+
+# Rows buffered across tables before they are written
+IMPORT_BATCH_ROWS = 5000
 
-async def import_data(json_path="db/data.json"):
-    with open(json_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
 
-    lenders_data = data.get("lender", [])
-    loan_programs_data = data.get("loan_programs", [])
+class _BatchWriter:
+    """
+    Buffers rows per table and inserts them, skipping ids that already exist,
+    once IMPORT_BATCH_ROWS are pending. Remembers which lenders and programs
+    received new rows.
+    """
 
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        self.rows = {model: [] for model in CATALOG_MODELS}
+        self.pending = 0
+        self.inserted = {model.__tablename__: 0 for model in CATALOG_MODELS}
+        self.changed_lenders = set()
+        self.guideline_programs = set()
+        # program -> lender for the programs in the current batch
+        self._program_lender = {}
+
+    async def add_lender(self, lender: LenderRecord) -> None:
+        self.rows[Lender].append(lender_row(lender.model_dump()))
+        await self._added(1)
+
+    async def add_program(self, program: ProgramRecord) -> None:
+        self.rows[LoanProgram].append(program_row(program.model_dump(exclude={"eligibility_matrix_rules", "guidelines"})))
+        self.rows[EligibilityMatrixRule].extend(rule_row(rule.model_dump()) for rule in program.eligibility_matrix_rules)
+        self.rows[Guideline].extend(guideline_row(guide.model_dump()) for guide in program.guidelines)
+        self._program_lender[program.id] = program.lenderId
+        await self._added(1 + len(program.eligibility_matrix_rules) + len(program.guidelines))
+
+    async def _added(self, count: int) -> None:
+        self.pending += count
+        if self.pending >= IMPORT_BATCH_ROWS:
+            await self.flush()
+
+    async def flush(self) -> None:
+        for model in CATALOG_MODELS:
+            rows = self.rows[model]
+            if not rows:
+                continue
+            stmt = insert(model).on_conflict_do_nothing(index_elements=[model.id]).returning(model.id)
+            new_ids = set((await self.session.execute(stmt, rows)).scalars())
+            self.inserted[model.__tablename__] += len(new_ids)
+            for row in rows:
+                if row["id"] not in new_ids:
+                    continue
+                if model is Lender:
+                    self.changed_lenders.add(row["id"])
+                elif model is LoanProgram:
+                    self.changed_lenders.add(row["lenderId"])
+                else:
+                    # None (a row of a program outside this batch) announces every lender
+                    self.changed_lenders.add(self._program_lender.get(row["loanProgramId"]))
+                    if model is Guideline:
+                        self.guideline_programs.add(row["loanProgramId"])
+            self.rows[model] = []
+        self.pending = 0
+        self._program_lender = {}
+
+
+async def import_data(json_path="db/data.json"):
+    """
+    Inserts the rows of a catalog file whose id isn't in the database yet, in
+    one transaction (see db/import_delta.py for updates and deletes). The file
+    is streamed one program at a time (db/catalog_file.py) and written in
+    batches, so memory stays flat however large it is.
+    """
     async with AsyncSessionFactory() as session:  # Use async session
-        # Insert Lenders
-        for lender in lenders_data:
-            existing = await session.get(Lender, lender["id"])
-            if not existing:
-                session.add(Lender(
-                    id=lender["id"],
-                    name=lender["name"]
-                ))
-        await session.commit()
+        writer = _BatchWriter(session)
+        for record in iter_catalog(json_path):
+            if isinstance(record, LenderRecord):
+                await writer.add_lender(record)
+            else:
+                await writer.add_program(record)
+        await writer.flush()
 
-        # Insert Loan Programs
-        for program in loan_programs_data:
-            existing = await session.get(LoanProgram, program["id"])
-            if not existing:
-                session.add(LoanProgram(
-                    id=program["id"],
-                    lenderId=program["lenderId"],
-                    name=program["name"],
-                    programCode=program.get("programCode"),
-                    description=program.get("description"),
-                    sourceDocument=program.get("sourceDocument"),
-                    minLoanAmount=program.get("minLoanAmount"),
-                    maxLoanAmount=program.get("maxLoanAmount")
-                ))
+        changed = any(writer.inserted.values())
+        if changed:
+            # Rebuild the denormalized scenario-search view from the new rows, and
+            # tell every worker which lenders changed once it commits
+            await refresh_scenario_search(session)
+            lenders = None if None in writer.changed_lenders else writer.changed_lenders
+            version = await catalog_events.publish(session, lenders)
+        else:
+            version = await catalog_events.read_version(session)
         await session.commit()
 
-        # Insert Eligibility Matrix Rules
-        for program in loan_programs_data:
-            for rule in program.get("eligibility_matrix_rules", []):
-                existing = await session.get(EligibilityMatrixRule, rule["id"])
-                if not existing:
-                    
-                    # FIX: Check for 'dscrValue' OR 'minDscr' from the JSON.
-                    dscr_val = rule.get("dscrValue") or rule.get("minDscr")
-                    
-                    session.add(EligibilityMatrixRule(
-                        id=rule["id"],
-                        loanProgramId=rule["loanProgramId"],
-                        minLoanAmount=rule.get("minLoanAmount"),
-                        maxLoanAmount=rule.get("maxLoanAmount"),
-                        minFicoScore=rule.get("minFicoScore"),
-                        maxFicoScore=rule.get("maxFicoScore"),
-                        occupancyType=rule.get("occupancyType"),
-                        loanPurpose=rule.get("loanPurpose"),
-                        
-                        # FIX: Cast the value to a string if it's not None.
-                        dscrValue=str(dscr_val) if dscr_val is not None else None,
-                        
-                        maxLtv=rule.get("maxLtv"),
-                        reservesMonths=rule.get("reservesMonths"),
-                        notes=rule.get("notes"),
-                    ))
-        await session.commit()
+        print(f"✅ Data successfully imported into PostgreSQL (async), catalog version {version}: "
+              + ", ".join(f"{table}={count}" for table, count in writer.inserted.items()) + " new rows.")
 
-        # Insert Guidelines
-        for program in loan_programs_data:
-            for guide in program.get("guidelines", []):
-                existing = await session.get(Guideline, guide["id"])
-                if not existing:
-                    session.add(Guideline(
-                        id=guide["id"],
-                        loanProgramId=guide["loanProgramId"],
-                        category=guide.get("category"),
-                        content=guide.get("content"),
-                        sourceReference=guide.get("sourceReference")
-                    ))
-        await session.commit()
+    if changed:
+        await refresh_derived(sorted(writer.guideline_programs))
+
+
+async def refresh_derived(program_ids=None):
+    """Rebuilds what is derived from the lender tables: guideline digests (for `program_ids`, default all) and the analytics replica."""
+    # Compact per-program digests served by get_program_guidelines
+    await rebuild_digests(program_ids)
+
+    if analytics_replica.enabled():
+        await analytics_replica.rebuild()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load a lender catalog JSON file into PostgreSQL.")
+    parser.add_argument("path", nargs="?", default="db/data.json", help="Catalog file (default: db/data.json).")
+    parser.add_argument("--delta", action="store_true",
+                        help="Apply inserts, updates and deletes so the database matches the file (db/import_delta.py).")
+    args = parser.parse_args(argv)
 
-        print("✅ Data successfully imported into PostgreSQL (async).")
+    if args.delta:
+        from db.import_delta import import_delta
+        asyncio.run(import_delta(args.path))
+    else:
+        asyncio.run(import_data(args.path))
 
 
 if __name__ == "__main__":
-    asyncio.run(import_data())
\ No newline at end of file
+    main()
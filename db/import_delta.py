@@ -0,0 +1,353 @@
+# db/import_delta.py
+"""
+Delta import of a catalog file.
+
+`import_data` only inserts rows whose id is missing, so changed rules and
+removed programs used to need a wipe and full reload. `import_delta()` diffs
+the file against the database instead, table by table and keyed by id:
+
+- rows only in the file are inserted, rows whose columns differ are updated
+  and rows only in the database are deleted;
+- the file is streamed (db/catalog_file.py) and diffed in batches of
+  programs: only the lender and program tables are held in memory, rules and
+  guidelines are read and compared one batch at a time, so memory doesn't
+  grow with the number of rules and guidelines;
+- everything is applied in one transaction (removed programs are deleted
+  first, parents are written before their children and removed lenders are
+  deleted last), together with a dataset_snapshot row recording the file hash, the per-table counts
+  and the resulting catalog version;
+- only what changed is refreshed downstream: the change is published for the
+  affected lenders (db/catalog_events.py), scenario_search is refreshed only
+  when lenders, programs or rules changed, and guideline digests are rebuilt
+  only for the affected programs.
+
+    python -m db.import_data --delta [path]
+"""
+import asyncio
+import enum
+import hashlib
+import time
+from decimal import Decimal
+from typing import Dict, List, Set
+
+from sqlalchemy import Enum as SAEnum, Numeric, Text, any_, bindparam, delete, insert, or_, select, update
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db import catalog_events
+from db.catalog_file import LenderRecord, ProgramRecord, iter_catalog, iter_sections
+from db.import_data import (
+    CATALOG_MODELS, IMPORT_BATCH_ROWS, guideline_row, lender_row, program_row, refresh_derived, rule_row,
+)
+from db.models import DatasetSnapshot, EligibilityMatrixRule, Guideline, Lender, LoanProgram
+from db.session import AsyncSessionFactory
+from db.views import refresh_scenario_search
+
+# Parents first; deletes run in reverse
+TABLES = CATALOG_MODELS
+CHILD_TABLES = (EligibilityMatrixRule, Guideline)
+WRITE_BATCH = 500
+
+# Unique constraints a rename can collide with midway; the last column is the one parked
+UNIQUE_KEYS = {
+    Lender: [("name",)],
+    LoanProgram: [("lenderId", "name"), ("programCode",)],
+}
+
+
+class TableDiff:
+    """Rows to insert / update (full rows) and ids to delete for one table."""
+
+    def __init__(self, inserts: List[dict], updates: List[dict], deletes: List[str]):
+        self.inserts = inserts
+        self.updates = updates
+        self.deletes = deletes
+
+    def counts(self) -> dict:
+        return {"inserted": len(self.inserts), "updated": len(self.updates), "deleted": len(self.deletes)}
+
+
+# --- Diff ---
+
+def _columns(model) -> list:
+    # Generated columns (ranges, tsvector) follow from the others
+    return [c for c in model.__table__.columns if c.computed is None]
+
+
+def _comparable(column, value):
+    # The file has JSON numbers and enum names; the database returns Decimals and enum members
+    if value is None:
+        return None
+    if isinstance(column.type, SAEnum):
+        return value.name if isinstance(value, enum.Enum) else str(value)
+    if isinstance(column.type, Numeric):
+        return Decimal(str(value))
+    return value
+
+
+def _writable(columns: list, row: dict) -> dict:
+    # Exact decimals: a bound float would be stored with its full binary expansion (0.7 -> 0.69999...)
+    return {
+        c.name: Decimal(str(row[c.name])) if isinstance(c.type, Numeric) and row[c.name] is not None else row[c.name]
+        for c in columns
+    }
+
+
+async def _existing_rows(session: AsyncSession, model, where=None) -> Dict[str, tuple]:
+    """id -> comparable column values, for every row of the table (matching `where`)."""
+    columns = _columns(model)
+    query = select(*columns)
+    if where is not None:
+        query = query.where(where)
+    result = await session.execute(query)
+    return {row[0]: tuple(_comparable(c, v) for c, v in zip(columns, row)) for row in result}
+
+
+def diff_table(model, desired: Dict[str, dict], existing: Dict[str, tuple]) -> TableDiff:
+    """Compares the file's rows (id -> row dict) with the database's (see _existing_rows)."""
+    columns = _columns(model)
+    inserts, updates = [], []
+    for row_id, row in desired.items():
+        current = existing.get(row_id)
+        if current is None:
+            inserts.append(_writable(columns, row))
+        elif tuple(_comparable(c, row[c.name]) for c in columns) != current:
+            updates.append(_writable(columns, row))
+    deletes = [row_id for row_id in existing if row_id not in desired]
+    return TableDiff(inserts, updates, deletes)
+
+
+def _position(model, column: str) -> int:
+    return [c.name for c in _columns(model)].index(column)
+
+
+def _file_hash(json_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(json_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _file_ids(json_path: str) -> Dict[type, Set[str]]:
+    """The lender and program ids in the file (a streamed pass without validation)."""
+    ids: Dict[type, Set[str]] = {Lender: set(), LoanProgram: set()}
+    sections = {"lender": Lender, "loan_programs": LoanProgram}
+    with open(json_path, "r", encoding="utf-8") as f:
+        for key, element in iter_sections(f):
+            if key in sections and isinstance(element, dict) and "id" in element:
+                ids[sections[key]].add(element["id"])
+    return ids
+
+
+# --- Apply ---
+
+class _DeltaWriter:
+    """
+    Diffs and writes a streamed catalog file one batch of programs (about
+    IMPORT_BATCH_ROWS rows) at a time. For each batch, the existing rules and
+    guidelines of its programs, plus any with the batch's ids (rows that moved
+    between programs), are read and compared. Programs missing from the file
+    are deleted first and lenders missing from it last, once no program
+    points at them. Tracks the counts per table, the affected lenders and the
+    programs whose guidelines changed.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        self.counts = {model.__tablename__: {"inserted": 0, "updated": 0, "deleted": 0} for model in TABLES}
+        self.changed_lenders: Set[str] = set()
+        self.guideline_programs: Set[str] = set()
+        self._existing: Dict[type, Dict[str, tuple]] = {}
+        self._old_lender: Dict[str, str] = {}
+        self._new_lender: Dict[str, str] = {}
+        self._lenders: Dict[str, dict] = {}
+        self._lenders_written = False
+        self._batch: List[ProgramRecord] = []
+        self._pending = 0
+        # (model, key) -> {id: unique value as stored}, for rows not yet written
+        self._held: Dict[tuple, Dict[str, tuple]] = {}
+
+    async def load(self, file_ids: Dict[type, Set[str]]) -> None:
+        """Reads the lender and program tables and deletes the programs `file_ids` no longer has."""
+        # Lenders and programs are small next to rules and guidelines; those are read per batch
+        for model in (Lender, LoanProgram):
+            self._existing[model] = await _existing_rows(self.session, model)
+        position = _position(LoanProgram, "lenderId")
+        self._old_lender = {program_id: row[position] for program_id, row in self._existing[LoanProgram].items()}
+
+        removed = [program_id for program_id in self._existing[LoanProgram] if program_id not in file_ids[LoanProgram]]
+        for start in range(0, len(removed), WRITE_BATCH):
+            ids = removed[start:start + WRITE_BATCH]
+            for model in reversed(CHILD_TABLES):
+                result = await self.session.execute(delete(model).where(model.loanProgramId.in_(ids)))
+                self.counts[model.__tablename__]["deleted"] += result.rowcount
+        await self._write(LoanProgram, TableDiff([], [], removed))
+        for program_id in removed:
+            self._touch_program(program_id)
+            del self._existing[LoanProgram][program_id]
+
+        for model, keys in UNIQUE_KEYS.items():
+            for key in keys:
+                positions = [_position(model, column) for column in key]
+                self._held[(model, key)] = {
+                    row_id: tuple(row[p] for p in positions) for row_id, row in self._existing[model].items()
+                    if all(row[p] is not None for p in positions)
+                }
+
+    async def _park(self, model, rows: Dict[str, dict]) -> None:
+        """
+        Rows are renamed in bulk, so a unique value can move from one row to
+        another (or two rows swap). Existing rows not yet written that hold a
+        value one of `rows` takes get a temporary value ("~<id>") first; their
+        own batch (or deletion) writes the final one.
+        """
+        for key in UNIQUE_KEYS[model]:
+            held = self._held[(model, key)]
+            holders = {value: row_id for row_id, value in held.items()}
+            parked = set()
+            for row_id, row in rows.items():
+                holder = holders.get(tuple(row[c] for c in key))
+                if holder is not None and holder != row_id:
+                    parked.add(holder)
+            # Written (or parked) rows no longer hold their old values
+            for row_id in list(rows) + list(parked):
+                held.pop(row_id, None)
+            column = getattr(model, key[-1])
+            for holder in parked:
+                await self.session.execute(update(model).where(model.id == holder).values({column: f"~{holder}"}))
+                if holder in self._existing[model]:
+                    # Force the final values to be written
+                    self._existing[model][holder] = ()
+
+    def add_lender(self, lender: LenderRecord) -> None:
+        if self._lenders_written:
+            raise ValueError("The lender section must come before loan_programs in a catalog file")
+        self._lenders[lender.id] = lender_row(lender.model_dump())
+
+    async def add_program(self, program: ProgramRecord) -> None:
+        if not self._lenders_written:
+            await self._write_lenders()
+        self._batch.append(program)
+        self._pending += 1 + len(program.eligibility_matrix_rules) + len(program.guidelines)
+        if self._pending >= IMPORT_BATCH_ROWS:
+            await self.flush()
+
+    async def _write(self, model, diff: TableDiff) -> None:
+        for start in range(0, len(diff.deletes), WRITE_BATCH):
+            await self.session.execute(delete(model).where(model.id.in_(diff.deletes[start:start + WRITE_BATCH])))
+        for rows in (diff.updates, diff.inserts):
+            statement = update(model) if rows is diff.updates else insert(model)
+            for start in range(0, len(rows), WRITE_BATCH):
+                # ORM bulk UPDATE by primary key / bulk INSERT
+                await self.session.execute(statement, rows[start:start + WRITE_BATCH])
+        counts = self.counts[model.__tablename__]
+        for name, count in diff.counts().items():
+            counts[name] += count
+
+    def _touch_program(self, program_id: str) -> None:
+        # Both the lender the program had and the one it has now
+        for lender_id in (self._old_lender.get(program_id), self._new_lender.get(program_id)):
+            if lender_id is not None:
+                self.changed_lenders.add(lender_id)
+
+    async def _write_lenders(self) -> None:
+        await self._park(Lender, self._lenders)
+        existing = self._existing[Lender]
+        diff = diff_table(Lender, self._lenders, {i: existing[i] for i in self._lenders if i in existing})
+        await self._write(Lender, diff)
+        self.changed_lenders |= {row["id"] for row in diff.inserts + diff.updates}
+        self._lenders_written = True
+
+    async def flush(self) -> None:
+        records, self._batch, self._pending = self._batch, [], 0
+        if not records:
+            return
+        programs = {r.id: program_row(r.model_dump(exclude={"eligibility_matrix_rules", "guidelines"})) for r in records}
+        desired: Dict[type, Dict[str, dict]] = {model: {} for model in CHILD_TABLES}
+        for record in records:
+            for rule in record.eligibility_matrix_rules:
+                desired[EligibilityMatrixRule][rule.id] = rule_row(rule.model_dump())
+            for guide in record.guidelines:
+                desired[Guideline][guide.id] = guideline_row(guide.model_dump())
+        self._new_lender.update({program_id: row["lenderId"] for program_id, row in programs.items()})
+
+        await self._park(LoanProgram, programs)
+        existing = self._existing[LoanProgram]
+        diff = diff_table(LoanProgram, programs, {i: existing[i] for i in programs if i in existing})
+        await self._write(LoanProgram, diff)
+        for row in diff.inserts + diff.updates:
+            self._touch_program(row["id"])
+
+        for model in CHILD_TABLES:
+            position = _position(model, "loanProgramId")
+            # One array parameter each: an IN list of a batch's ids is slow to render
+            current = await _existing_rows(self.session, model, or_(
+                model.loanProgramId == any_(bindparam("program_ids", list(programs), type_=ARRAY(Text))),
+                model.id == any_(bindparam("row_ids", list(desired[model]), type_=ARRAY(Text))),
+            ))
+            diff = diff_table(model, desired[model], current)
+            await self._write(model, diff)
+            # New program of inserted/updated rows, old program of updated/deleted ones
+            touched = {row["loanProgramId"] for row in diff.inserts + diff.updates}
+            touched |= {current[row["id"]][position] for row in diff.updates}
+            touched |= {current[row_id][position] for row_id in diff.deletes}
+            for program_id in touched:
+                self._touch_program(program_id)
+            if model is Guideline:
+                self.guideline_programs |= touched
+
+    async def finish(self) -> None:
+        """Writes the last batch and deletes the lenders the file no longer has (their programs are gone or moved)."""
+        if not self._lenders_written:
+            await self._write_lenders()
+        await self.flush()
+        removed = [lender_id for lender_id in self._existing[Lender] if lender_id not in self._lenders]
+        await self._write(Lender, TableDiff([], [], removed))
+        self.changed_lenders.update(removed)
+
+
+async def import_delta(json_path: str = "db/data.json") -> dict:
+    """
+    Makes the lender tables match `json_path` in one transaction and records
+    a dataset snapshot. Returns the change counts per table.
+    """
+    started = time.perf_counter()
+    source_hash, file_ids = _file_hash(json_path), _file_ids(json_path)
+
+    async with AsyncSessionFactory() as session:
+        writer = _DeltaWriter(session)
+        await writer.load(file_ids)
+        for record in iter_catalog(json_path):
+            if isinstance(record, LenderRecord):
+                writer.add_lender(record)
+            else:
+                await writer.add_program(record)
+        await writer.finish()
+        changes = writer.counts
+        changed = any(sum(counts.values()) for counts in changes.values())
+
+        if changed:
+            if any(sum(changes[m.__tablename__].values()) for m in (Lender, LoanProgram, EligibilityMatrixRule)):
+                await refresh_scenario_search(session)
+            version = await catalog_events.publish(session, writer.changed_lenders)
+        else:
+            version = await catalog_events.read_version(session)
+        session.add(DatasetSnapshot(
+            sourcePath=json_path, sourceHash=source_hash, catalogVersion=version, changes=changes,
+        ))
+        await session.commit()
+
+    elapsed = time.perf_counter() - started
+    print(f"✅ Delta import of {json_path} in {elapsed:.1f}s (catalog version {version}):")
+    for table, counts in changes.items():
+        print(f"   {table}: " + ", ".join(f"{name}={count}" for name, count in counts.items()))
+
+    if changed:
+        # Deleted programs lose their digests through the foreign key; only changed ones are rebuilt
+        await refresh_derived(sorted(writer.guideline_programs))
+    return changes
+
+
+if __name__ == "__main__":
+    asyncio.run(import_delta())
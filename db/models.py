@@ -2,8 +2,9 @@ import enum
 import uuid
 from sqlalchemy import (
     Column, String, DateTime, Enum as SAEnum, Text, ForeignKey,
-    Integer, Numeric, UniqueConstraint, Index
+    Integer, BigInteger, Numeric, UniqueConstraint, Index, Computed
 )
+from sqlalchemy.dialects.postgresql import INT4RANGE, JSONB, NUMRANGE, TSVECTOR
 from sqlalchemy.orm import declarative_base, relationship
 from sqlalchemy.sql import func
 
@@ -140,6 +141,28 @@ class EligibilityMatrixRule(Base):
     occupancyType = Column(SAEnum(OccupancyType), nullable=True)
     loanPurpose = Column(SAEnum(LoanPurposeType), nullable=True)
     dscrValue = Column(String, nullable=True)
+    # Numeric DSCR bounds parsed from dscrValue (see db/import_data.parse_dscr)
+    minDscr = Column(Numeric, nullable=True)
+    maxDscr = Column(Numeric, nullable=True)
+
+    # Generated from the bounds above for range-containment searches. A NULL
+    # lower bound gives a NULL range (never matches); a NULL upper bound is open.
+    ficoRange = Column(INT4RANGE, Computed(
+        'CASE WHEN "minFicoScore" IS NULL OR "minFicoScore" > "maxFicoScore" THEN NULL '
+        'ELSE int4range("minFicoScore", "maxFicoScore", \'[]\') END',
+        persisted=True,
+    ))
+    loanAmountRange = Column(NUMRANGE, Computed(
+        'CASE WHEN "minLoanAmount" IS NULL OR "minLoanAmount" > "maxLoanAmount" THEN NULL '
+        'ELSE numrange("minLoanAmount", "maxLoanAmount", \'[]\') END',
+        persisted=True,
+    ))
+    # Rules without DSCR bounds don't constrain DSCR, so their range is unbounded
+    dscrRange = Column(NUMRANGE, Computed(
+        'CASE WHEN "minDscr" > "maxDscr" THEN NULL '
+        'ELSE numrange("minDscr", "maxDscr", \'[]\') END',
+        persisted=True,
+    ))
     
     # Outputs
     maxLtv = Column(Numeric, nullable=True)
@@ -150,6 +173,10 @@ class EligibilityMatrixRule(Base):
     
     __table_args__ = (
         Index("idx_matrix_programId", "loanProgramId"),
+        Index("idx_matrix_fico_range", "ficoRange", postgresql_using="gist"),
+        Index("idx_matrix_loan_amount_range", "loanAmountRange", postgresql_using="gist"),
+        Index("idx_matrix_occupancy_purpose", "occupancyType", "loanPurpose"),
+        Index("idx_matrix_dscr_range", "dscrRange", postgresql_using="gist"),
         UniqueConstraint(
             "loanProgramId", "minLoanAmount", "maxLoanAmount", 
             "minFicoScore", "occupancyType", "loanPurpose", "dscrValue",
@@ -157,6 +184,9 @@ class EligibilityMatrixRule(Base):
         ),
     )
 
+# Text search configuration of guideline.contentTsv
+GUIDELINE_TS_CONFIG = "english"
+
 class Guideline(Base):
     __tablename__ = "guideline"
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
@@ -164,6 +194,55 @@ class Guideline(Base):
     category = Column(SAEnum(GuidelineCategory), nullable=False, index=True)
     content = Column(Text, nullable=False)
     sourceReference = Column(String, nullable=True)
+    # Generated for ranked keyword search; queries must use the same text search configuration
+    contentTsv = Column(TSVECTOR, Computed(f"to_tsvector('{GUIDELINE_TS_CONFIG}', content)", persisted=True))
     
     loanProgram = relationship("LoanProgram", back_populates="guidelines")
-    __table_args__ = (Index("idx_guideline_programId", "loanProgramId"),)
+    __table_args__ = (
+        Index("idx_guideline_program_category", "loanProgramId", "category"),
+        Index("idx_guideline_content_tsv", "contentTsv", postgresql_using="gin"),
+    )
+
+class GuidelineDigest(Base):
+    """
+    Compact per-program summary of its guidelines, built offline by
+    db/guideline_digest.py after each import. `categories` maps a category
+    name to its digest; `content` is the whole-program overview.
+    """
+    __tablename__ = "guideline_digest"
+    loanProgramId = Column(String, ForeignKey("loan_program.id", ondelete="CASCADE"), primary_key=True)
+    content = Column(Text, nullable=False)
+    categories = Column(JSONB, nullable=False)
+    # Hash of the source guidelines, so unchanged programs are skipped on rebuild
+    sourceHash = Column(String, nullable=False)
+    guidelineCount = Column(Integer, nullable=False)
+    sourceChars = Column(Integer, nullable=False)
+    updatedAt = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+
+class CatalogVersion(Base):
+    """
+    Single-row counter of lender data changes. Writers bump it and NOTIFY in
+    the same transaction (db/catalog_events.py); workers compare it with the
+    version of their in-memory catalog.
+    """
+    __tablename__ = "catalog_version"
+    id = Column(Integer, primary_key=True)
+    version = Column(BigInteger, nullable=False, server_default="0")
+    updatedAt = Column(DateTime, server_default=func.now())
+
+
+class DatasetSnapshot(Base):
+    """
+    One delta import of a catalog file (db/import_delta.py): which file, the
+    catalog version it produced and the per-table change counts.
+    """
+    __tablename__ = "dataset_snapshot"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    sourcePath = Column(String, nullable=False)
+    # sha256 of the imported file
+    sourceHash = Column(String, nullable=False)
+    catalogVersion = Column(BigInteger, nullable=False)
+    # {table: {"inserted": n, "updated": n, "deleted": n}}
+    changes = Column(JSONB, nullable=False)
+    createdAt = Column(DateTime, server_default=func.now())
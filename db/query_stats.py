@@ -0,0 +1,193 @@
+# db/query_stats.py
+"""
+Statement-level SQL statistics for the engine in db/session.py.
+
+Every statement is timed and aggregated by a normalized fingerprint (literals
+and bind parameters replaced with `?`), so the same query issued with
+different values is counted once. Statements slower than
+settings.SLOW_QUERY_MS are written to a structured slow-query log together
+with their origin: the CRUD function or tool that issued them, as recorded by
+the `@query_origin` decorator. This matters most for the free-form SQL
+generated by `query_database_assistant`.
+
+The top statements by total time are served by GET /api/v1/admin/queries.
+"""
+import functools
+import json
+import re
+import threading
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from config.settings import settings
+
+MAX_FINGERPRINTS = 1000
+MAX_STATEMENT_LENGTH = 2000
+
+_origin: ContextVar[Optional[str]] = ContextVar("query_origin", default=None)
+_lock = threading.Lock()
+_stats: Dict[str, "StatementStats"] = {}
+_installed = False
+
+
+# --- Origins ---
+
+def query_origin(fn):
+    """
+    Records the decorated coroutine (e.g. "crud.get_conversation_by_id") as
+    the origin of the statements it runs. Nested origins are joined with ">".
+    """
+    name = f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__name__}"
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        parent = _origin.get()
+        token = _origin.set(f"{parent} > {name}" if parent else name)
+        try:
+            return await fn(*args, **kwargs)
+        finally:
+            _origin.reset(token)
+
+    return wrapper
+
+
+def current_origin() -> Optional[str]:
+    return _origin.get()
+
+
+# --- Fingerprints ---
+
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_BIND_PARAMS = re.compile(
+    r"\$\d+(?:::\w+(?:\(\d+(?:,\s*\d+)?\))?(?:\s+WITH(?:OUT)?\s+TIME\s+ZONE)?)?"  # asyncpg: $1::VARCHAR
+    r"|%\(\w+\)s"  # pyformat
+    r"|(?<!:):(?!:)\w+"  # named
+)
+_NUMBERS = re.compile(r"(?<![\w\"$])-?\d+(?:\.\d+)?\b")
+_IN_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def fingerprint(statement: str) -> str:
+    """Normalizes a statement so queries differing only in values group together."""
+    fp = _COMMENTS.sub(" ", statement)
+    fp = _STRINGS.sub("?", fp)
+    fp = _BIND_PARAMS.sub("?", fp)
+    fp = _NUMBERS.sub("?", fp)
+    fp = _IN_LISTS.sub("(?, ...)", fp)
+    return _WHITESPACE.sub(" ", fp).strip().rstrip(";")
+
+
+# --- Aggregation ---
+
+class StatementStats:
+    """Running totals for one statement fingerprint."""
+
+    def __init__(self, fp: str):
+        self.fingerprint = fp
+        self.calls = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.origins: Counter = Counter()
+
+    def add(self, elapsed_ms: float, rowcount: int, origin: Optional[str], error: bool = False):
+        self.calls += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        if rowcount and rowcount > 0:
+            self.rows += rowcount
+        if error:
+            self.errors += 1
+        self.origins[origin or "unknown"] += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "fingerprint": self.fingerprint,
+            "calls": self.calls,
+            "errors": self.errors,
+            "total_ms": round(self.total_ms, 3),
+            "mean_ms": round(self.total_ms / self.calls, 3) if self.calls else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "rows": self.rows,
+            "origins": dict(self.origins.most_common(5)),
+        }
+
+
+def record(statement: str, elapsed_ms: float, rowcount: int = -1, error: Optional[BaseException] = None):
+    """Adds one execution to the aggregates and logs it if it was slow."""
+    origin = _origin.get()
+    fp = fingerprint(statement)
+    with _lock:
+        stats = _stats.get(fp)
+        if stats is None:
+            if len(_stats) >= MAX_FINGERPRINTS:
+                # Keep the table bounded (LLM-generated SQL rarely repeats)
+                del _stats[min(_stats, key=lambda k: _stats[k].total_ms)]
+            stats = _stats[fp] = StatementStats(fp)
+        stats.add(elapsed_ms, rowcount, origin, error is not None)
+
+    if elapsed_ms >= settings.SLOW_QUERY_MS:
+        _log_slow_query(statement, fp, elapsed_ms, rowcount, origin, error)
+
+
+def top_statements(limit: int = 20, order_by: str = "total_ms") -> List[Dict[str, Any]]:
+    """Returns the top fingerprints by total_ms, mean_ms, max_ms or calls."""
+    with _lock:
+        rows = [s.to_dict() for s in _stats.values()]
+    rows.sort(key=lambda r: r[order_by], reverse=True)
+    return rows[:limit]
+
+
+def reset():
+    with _lock:
+        _stats.clear()
+
+
+# --- Slow-Query Log ---
+
+def _log_slow_query(statement: str, fp: str, elapsed_ms: float, rowcount: int, origin: Optional[str], error):
+    entry = {
+        "ts": datetime.now(timezone.utc).isoformat(),
+        "duration_ms": round(elapsed_ms, 3),
+        "origin": origin or "unknown",
+        "fingerprint": fp,
+        "statement": statement[:MAX_STATEMENT_LENGTH],
+        "rowcount": rowcount,
+    }
+    if error is not None:
+        entry["error"] = f"{type(error).__name__}: {error}"[:MAX_STATEMENT_LENGTH]
+    line = json.dumps(entry)
+
+    if settings.SLOW_QUERY_LOG:
+        try:
+            with open(settings.SLOW_QUERY_LOG, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+            return
+        except OSError as e:
+            print(f"⚠️  Could not write slow-query log: {e}")
+    print(f"⚠️  [SLOW QUERY] {line}")
+
+
+# --- SQLAlchemy Instrumentation ---
+
+def instrument_engine(engine):
+    """Times every statement executed through the engine."""
+    global _installed
+    if not settings.QUERY_STATS_ENABLED or _installed:
+        return
+    _installed = True
+
+    from db import statement_hooks
+
+    def _record(statement, elapsed_ms, rowcount, error, executemany):
+        if statement:
+            record(statement, elapsed_ms, rowcount, error=error)
+
+    statement_hooks.add_handler(engine, _record)
+
+    print(f"✅ Query stats enabled (slow-query threshold {settings.SLOW_QUERY_MS}ms)")
@@ -0,0 +1,121 @@
+# db/sql_guard.py
+"""
+Guardrails for running LLM-generated SQL (see query_database_assistant in
+core/tools.py).
+
+Every statement runs in its own READ ONLY transaction with a local
+statement_timeout, is wrapped in a row LIMIT, has to pass an EXPLAIN cost
+ceiling before it executes, and is read through a server-side cursor so
+only the rows we keep are pulled into memory.
+"""
+import json
+import re
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.settings import settings
+
+# SQLSTATE for query_canceled, raised when statement_timeout fires
+_QUERY_CANCELED = "57014"
+
+# String literals (standard and E'' escapes), quoted identifiers, dollar-quoted bodies and
+# comments: a ";" inside them doesn't end the statement. Unterminated ones don't match,
+# so a ";" after them still counts.
+_QUOTED = re.compile(
+    r"""(?<!\w)[Ee]'(?:[^'\\]|\\.|'')*'|'(?:[^']|'')*'|"(?:[^"]|"")*"|(\$\w*\$).*?\1|--[^\n]*|/\*.*?\*/""",
+    re.DOTALL,
+)
+
+
+class QueryRejected(Exception):
+    """Generated SQL was refused by a guardrail; the message is safe to show the LLM."""
+
+
+def check_statement(sql: str) -> str:
+    """
+    Normalizes a generated statement and rejects anything that isn't a single
+    SELECT (or WITH ... SELECT). The READ ONLY transaction is what actually
+    stops writes; this keeps obviously wrong output from reaching Postgres.
+    """
+    sql = sql.strip().rstrip(";").strip()
+    if not re.match(r"^(SELECT|WITH)\b", sql, re.IGNORECASE):
+        raise QueryRejected("For security reasons, only SELECT queries are allowed.")
+    if ";" in _QUOTED.sub(" ", sql):
+        raise QueryRejected("Only a single SQL statement is allowed.")
+    return sql
+
+
+def limit_statement(sql: str, max_rows: int) -> str:
+    """
+    Wraps the statement so Postgres stops after max_rows + 1 rows; the extra
+    row tells the caller the result was truncated.
+    """
+    return f"SELECT * FROM (\n{sql}\n) AS guarded_query LIMIT {max_rows + 1}"
+
+
+def _sqlstate(error: Exception) -> Optional[str]:
+    # Errors raised while iterating the server-side cursor come straight from
+    # asyncpg (sqlstate); statement errors are wrapped in DBAPIError (orig.pgcode).
+    if isinstance(error, DBAPIError):
+        return getattr(error.orig, "pgcode", None) or getattr(error.orig, "sqlstate", None)
+    return getattr(error, "sqlstate", None)
+
+
+def _plan_cost(raw) -> float:
+    plan = json.loads(raw) if isinstance(raw, str) else raw
+    return float(plan[0]["Plan"]["Total Cost"])
+
+
+async def run_readonly(
+    session: AsyncSession,
+    sql: str,
+    params: Optional[Dict[str, Any]] = None,
+    max_rows: Optional[int] = None,
+    timeout_ms: Optional[int] = None,
+    max_cost: Optional[float] = None,
+) -> Tuple[List[str], List[Sequence], bool]:
+    """
+    Runs a SELECT (with optional bind params) under the guardrails and returns
+    (column_names, rows, truncated). Raises QueryRejected when the statement
+    is refused, too expensive or times out; other database errors propagate.
+    The transaction is always rolled back.
+    """
+    max_rows = settings.SQL_ASSISTANT_MAX_ROWS if max_rows is None else max_rows
+    timeout_ms = settings.SQL_ASSISTANT_TIMEOUT_MS if timeout_ms is None else timeout_ms
+    max_cost = settings.SQL_ASSISTANT_MAX_COST if max_cost is None else max_cost
+
+    limited = limit_statement(check_statement(sql), max_rows)
+    try:
+        # Must be the first statement of the transaction
+        await session.execute(text("SET TRANSACTION READ ONLY"))
+        await session.execute(text(f"SET LOCAL statement_timeout = {int(timeout_ms)}"))
+
+        if max_cost:
+            cost = _plan_cost((await session.execute(text(f"EXPLAIN (FORMAT JSON) {limited}"), params)).scalar())
+            if cost > max_cost:
+                raise QueryRejected(
+                    f"The query is too expensive to run (estimated cost {cost:,.0f}, limit {max_cost:,.0f}). "
+                    "Add filters or aggregate instead of joining whole tables."
+                )
+
+        result = await session.stream(text(limited), params)
+        columns = list(result.keys())
+        rows, truncated = [], False
+        async for row in result:
+            if len(rows) == max_rows:
+                truncated = True
+                break
+            rows.append(row)
+        await result.close()
+        return columns, rows, truncated
+    except Exception as e:
+        if _sqlstate(e) == _QUERY_CANCELED:
+            raise QueryRejected(
+                f"The query was cancelled after {timeout_ms} ms. Simplify it or add filters."
+            ) from e
+        raise
+    finally:
+        await session.rollback()
@@ -0,0 +1,66 @@
+# db/statement_hooks.py
+"""
+One timing hook per engine for every SQL statement.
+
+Tracing (core/tracing.py), Prometheus metrics (core/metrics.py), per-turn
+timing (core/timing.py) and statement stats (db/query_stats.py) all need the
+duration of each statement. Instead of four before/after listener pairs, each
+with its own start-time stack in conn.info, `add_handler()` installs a single
+pair on the engine the first time it is called. The statement is timed once
+and the result is handed to every registered handler, in registration order.
+
+Handlers run synchronously in the after_cursor_execute (or handle_error)
+event, so ContextVars of the calling task (current span, current turn timer)
+are visible to them.
+"""
+import time
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import event
+
+# handler(statement, elapsed_ms, rowcount, error, executemany); rowcount is -1 when unknown
+StatementHandler = Callable[[str, float, int, Optional[BaseException], bool], None]
+
+_STARTS_KEY = "statement_starts"
+_handlers: Dict[object, List[StatementHandler]] = {}
+
+
+def add_handler(engine, handler: StatementHandler) -> None:
+    """Registers a handler for every statement executed through the (async) engine."""
+    sync_engine = engine.sync_engine
+    handlers = _handlers.get(sync_engine)
+    if handlers is None:
+        handlers = _handlers[sync_engine] = []
+        _install(sync_engine, handlers)
+    if handler not in handlers:
+        handlers.append(handler)
+
+
+def _install(sync_engine, handlers: List[StatementHandler]) -> None:
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault(_STARTS_KEY, []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get(_STARTS_KEY)
+        if not starts:
+            return
+        elapsed_ms = (time.perf_counter() - starts.pop()) * 1000
+        rowcount = getattr(cursor, "rowcount", -1)
+        rowcount = rowcount if rowcount is not None else -1
+        for handler in handlers:
+            handler(statement, elapsed_ms, rowcount, None, executemany)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(exception_context):
+        conn = exception_context.connection
+        starts = conn.info.get(_STARTS_KEY) if conn is not None else None
+        if not starts:
+            return
+        elapsed_ms = (time.perf_counter() - starts.pop()) * 1000
+        context = exception_context.execution_context
+        executemany = bool(context.executemany) if context is not None else False
+        for handler in handlers:
+            handler(exception_context.statement or "", elapsed_ms, -1,
+                    exception_context.original_exception, executemany)
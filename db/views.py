@@ -0,0 +1,47 @@
+# db/views.py
+"""
+Materialized views, kept out of Base.metadata so Alembic autogenerate doesn't
+try to create them as tables. Their definitions live in the migrations.
+"""
+from sqlalchemy import (
+    Column, MetaData, String, Table, Text, Integer, Numeric, Enum as SAEnum, text
+)
+from sqlalchemy.dialects.postgresql import INT4RANGE, NUMRANGE
+
+from db.models import OccupancyType, LoanPurposeType
+
+view_metadata = MetaData()
+
+# One row per eligibility_matrix_rule, denormalized with its lender and
+# program names so scenario search reads a single relation.
+scenario_search = Table(
+    "scenario_search", view_metadata,
+    Column("id", String, primary_key=True),
+    Column("loanProgramId", String),
+    Column("lenderId", String),
+    Column("lenderName", String),
+    Column("programName", String),
+    Column("occupancyType", SAEnum(OccupancyType, name="occupancytype", create_type=False)),
+    Column("loanPurpose", SAEnum(LoanPurposeType, name="loanpurposetype", create_type=False)),
+    Column("ficoRange", INT4RANGE),
+    Column("loanAmountRange", NUMRANGE),
+    Column("minFicoScore", Integer),
+    Column("maxFicoScore", Integer),
+    Column("minLoanAmount", Numeric),
+    Column("maxLoanAmount", Numeric),
+    Column("dscrValue", String),
+    Column("minDscr", Numeric),
+    Column("maxDscr", Numeric),
+    Column("dscrRange", NUMRANGE),
+    Column("maxLtv", Numeric),
+    Column("reservesMonths", Integer),
+    Column("notes", Text),
+)
+
+
+async def refresh_scenario_search(session):
+    """
+    Rebuilds scenario_search from the base tables without blocking readers.
+    Call after any bulk change to lenders, programs or matrix rules.
+    """
+    await session.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY scenario_search"))
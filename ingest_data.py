@@ -18,6 +18,7 @@ try:
     from langchain_chroma import Chroma
     from langchain_huggingface import HuggingFaceEmbeddings
     from config.settings import settings
+    from core.vector_store import build_memmap_index, embed_documents
 except ImportError as e:
     print(f"[bold red]Error:[/bold red] Failed to import necessary modules.")
     print("Please make sure you have all requirements installed: [code]pip install -r requirements.txt[/code]")
@@ -26,7 +27,8 @@ except ImportError as e:
 
 def build_vector_store():
     """
-    Builds a new persistent Chroma vector store from all PDFs in the PDF_DIR.
+    Builds a new persistent vector store from all PDFs in the PDF_DIR: the
+    Chroma collection, or the memory-mapped index when VECTOR_BACKEND is "memmap".
     """
     # --- 1. Get Settings ---
     VSTORE_DIR = Path(settings.VSTORE_DIR)
@@ -34,14 +36,18 @@ def build_vector_store():
     EMBEDDING_MODEL = settings.EMBEDDING_MODEL
     CHUNK_SIZE = 1500
     CHUNK_OVERLAP = 150
+    MEMMAP = settings.VECTOR_BACKEND.lower() == "memmap"
+    if MEMMAP:
+        VSTORE_DIR = Path(settings.VECTOR_INDEX_DIR)
 
-    print(f"[bold]Starting Vector Store Build[/bold]")
+    print(f"[bold]Starting Vector Store Build[/bold] ({settings.VECTOR_BACKEND})")
     print(f"  Target Directory: [cyan]{VSTORE_DIR}[/cyan]")
     print(f"  Collection Name:  [cyan]{COLLECTION_NAME}[/cyan]")
     print(f"  PDF Source:       [cyan]{PDF_DIR}[/cyan]\n")
 
     # --- 2. Clean Existing Vector Store ---
-    if VSTORE_DIR.exists():
+    # (the memmap index is built next to the old one and swapped in at the end)
+    if VSTORE_DIR.exists() and not MEMMAP:
         print(f"[yellow]Warning:[/yellow] Existing vector store found. Deleting '[cyan]{VSTORE_DIR}[/cyan]' for a fresh build.")
         try:
             shutil.rmtree(VSTORE_DIR)
@@ -50,8 +56,10 @@ def build_vector_store():
             print(f"Details: {e}")
             sys.exit(1)
             
-    VSTORE_DIR.mkdir(parents=True, exist_ok=True)
-    print("Old directory cleared. Starting file processing...")
+    if not MEMMAP:
+        VSTORE_DIR.mkdir(parents=True, exist_ok=True)
+        print("Old directory cleared.")
+    print("Starting file processing...")
 
     # --- 3. Find and Process PDFs ---
     pdf_files = list(PDF_DIR.glob("*.pdf"))
@@ -103,20 +111,23 @@ def build_vector_store():
     print("Embedding model loaded.")
 
     # --- 5. Create and Persist Vector Store ---
-    print("Initializing Chroma vector store and adding documents... (This is the final step and may take time)")
+    print("Embedding documents and writing the vector store... (This is the final step and may take time)")
     try:
-        db = Chroma.from_documents(
-            all_chunks,
-            embeddings,
-            collection_name=COLLECTION_NAME,
-            persist_directory=str(VSTORE_DIR)
-        )
+        if MEMMAP:
+            build_memmap_index(embed_documents(all_chunks, embeddings), len(all_chunks), str(VSTORE_DIR))
+        else:
+            db = Chroma.from_documents(
+                all_chunks,
+                embeddings,
+                collection_name=COLLECTION_NAME,
+                persist_directory=str(VSTORE_DIR)
+            )
         
         # Note: `from_documents` with `persist_directory` handles saving.
         # No explicit `db.persist()` is needed.
         
     except Exception as e:
-        print(f"[bold red]Error:[/bold red] Failed to create Chroma database.")
+        print(f"[bold red]Error:[/bold red] Failed to create the vector store.")
         print(f"Details: {e}")
         sys.exit(1)
 
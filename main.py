@@ -1,14 +1,37 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request, HTTPException
 from api.routers import chat as chat_router
+from api.routers import admin as admin_router
+from api.routers import scenarios as scenarios_router
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, PlainTextResponse
 from pathlib import Path
 
+from core import metrics, timing, tracing
+from db import catalog, query_stats
+from db.session import engine
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Span tracing is a no-op unless TRACING_ENABLED is set
+    tracing.setup_tracing(engine)
+    metrics.setup_metrics(engine)
+    timing.instrument_engine(engine)
+    query_stats.instrument_engine(engine)
+    # Lenders/programs are served from memory; load them before the first request
+    await catalog.start()
+    yield
+    await catalog.stop()
+    tracing.shutdown_tracing()
+
+
 app = FastAPI(
     title="Mortgage AI Chatbot",
     description="A chatbot for querying mortgage guidelines.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Define your allowed origins
@@ -26,6 +49,16 @@ app.add_middleware(
 # Include your chat router
 # API routes are registered first
 app.include_router(chat_router.router, prefix="/api/v1", tags=["Chat"])
+app.include_router(scenarios_router.router, prefix="/api/v1", tags=["Scenarios"])
+app.include_router(admin_router.router, prefix="/api/v1/admin", tags=["Admin"])
+
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus scrape endpoint."""
+    if not metrics.enabled():
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
 
 # --- Static File Serving Logic ---
 
@@ -10,21 +10,20 @@ if str(PROJECT_ROOT) not in sys.path:
 # ---------------------------
 
 try:
-    from langchain_chroma import Chroma
-    from langchain_huggingface import HuggingFaceEmbeddings
     from config.settings import settings
+    from core.vector_store import VectorStore, open_vector_store
 except ImportError as e:
     print(f"[bold red]Error:[/bold red] Failed to import necessary modules.")
     print("Please make sure you have all requirements installed: [code]pip install -r requirements.txt[/code]")
     print(f"Details: {e}")
     sys.exit(1)
 
-def run_query(vstore: Chroma, query: str, k: int = 3):
+def run_query(vstore: VectorStore, query: str, k: int = 3):
     """Helper function to run and print a query."""
     print(f"\n[bold]Running query:[/bold] [yellow]'{query}'[/yellow] (k={k})")
     
     try:
-        docs = vstore.similarity_search(query, k=k)
+        docs = vstore.search(query, k)
 
         if not docs:
             print("[bold yellow]Query ran successfully, but no matching documents were found.[/bold yellow]")
@@ -50,31 +49,23 @@ def run_query(vstore: Chroma, query: str, k: int = 3):
 
 def test_vector_store():
     """
-    Connects to the persistent ChromaDB, checks the document count,
-    and runs test queries.
+    Opens the configured vector store (VECTOR_BACKEND), checks the document
+    count, and runs test queries.
     """
-    print(f"Attempting to connect to vector store at: [cyan]{settings.VSTORE_DIR}[/cyan]")
+    location = settings.VECTOR_INDEX_DIR if settings.VECTOR_BACKEND.lower() == "memmap" else settings.VSTORE_DIR
+    print(f"Attempting to open the [cyan]{settings.VECTOR_BACKEND}[/cyan] vector store at: [cyan]{location}[/cyan]")
     print(f"Using collection: [cyan]{settings.COLLECTION_NAME}[/cyan]")
     print(f"Loading embedding model: [cyan]{settings.EMBEDDING_MODEL}[/cyan]\n")
 
     try:
-        # 1. Initialize the embedding model
-        embeddings = HuggingFaceEmbeddings(
-            model_name=settings.EMBEDDING_MODEL
-        )
-        
-        # 2. Connect to the existing persistent database
-        vstore = Chroma(
-            collection_name=settings.COLLECTION_NAME,
-            embedding_function=embeddings,
-            persist_directory=settings.VSTORE_DIR
-        )
+        # 1-2. Load the embedding model and open the existing store
+        vstore = open_vector_store()
         
         print("[bold green]Successfully connected to vector store.[/bold green]")
 
         # --- NEW DIAGNOSTIC STEP ---
         # 3. Get the total count of documents
-        collection_count = vstore._collection.count()
+        collection_count = vstore.count()
         
         print(Panel(
             f"[bold]Total document chunks in collection:[/bold] [bright_magenta]{collection_count}[/bright_magenta]",
@@ -105,7 +96,7 @@ def test_vector_store():
         print(f"[bold red]An error occurred during the test:[/bold red]")
         print(e)
         print("\n[bold yellow]Debug Tips:[/bold yellow]")
-        print(f"1. Make sure the path '[code]{settings.VSTORE_DIR}[/code]' is correct.")
+        print(f"1. Make sure the path '[code]{location}[/code]' is correct.")
         print(f"2. Ensure the collection '[code]{settings.COLLECTION_NAME}[/code]' exists in that database.")
 
 if __name__ == "__main__":